@@ -0,0 +1,69 @@
+"""
+JWT authentication for plain async Django views.
+
+DRF authentication classes are synchronous; this validates the same bearer
+tokens, refuses the ones revoked by a token version bump, and loads the user
+with the async ORM.
+"""
+
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+
+from asgiref.sync import sync_to_async
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from .tokens import ACTIVE_CLAIM, TOKEN_VERSION_CLAIM, get_token_version
+
+User = get_user_model()
+
+
+async def aauthenticate(request):
+    """Return the active user of the request's bearer token, or None"""
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    if header is None:
+        return None
+    raw_token = authentication.get_raw_token(header)
+    if raw_token is None:
+        return None
+    try:
+        token = authentication.get_validated_token(raw_token)
+        user_id = token[api_settings.USER_ID_CLAIM]
+    except (InvalidToken, TokenError, KeyError):
+        return None
+    # Refuse revoked tokens like StatelessJWTAuthentication does
+    if TOKEN_VERSION_CLAIM in token:
+        if not token.get(ACTIVE_CLAIM, False):
+            return None
+        version = await sync_to_async(get_token_version)(user_id)
+        if token[TOKEN_VERSION_CLAIM] != version:
+            return None
+
+    try:
+        user = await User.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+    except User.DoesNotExist:
+        return None
+    return user if user.is_active else None
+
+
+def async_jwt_required(view):
+    """Set ``request.user`` from the bearer token or answer 401"""
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await aauthenticate(request)
+        if user is None:
+            response = JsonResponse(
+                {"detail": "Authentication credentials were not provided."},
+                status=401,
+            )
+            response["WWW-Authenticate"] = 'Bearer realm="api"'
+            return response
+        request.user = user
+        return await view(request, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from . import async_views
+
+app_name = "authentication_async"
+
+urlpatterns = [
+    path("login/", async_views.login, name="login"),
+]
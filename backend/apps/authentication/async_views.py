@@ -0,0 +1,53 @@
+"""
+Async login for ASGI deployments.
+
+Password hashes are checked on the bounded hashing pool, so logins neither
+block the event loop nor run more hashes at once than the pool allows. Logins
+draw from the same ``auth`` throttle bucket as the DRF login.
+"""
+
+import json
+
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from asgiref.sync import sync_to_async
+
+from trello_backend.throttling import throttle_async_view
+
+from .hashing import amake_password
+from .views import login_response
+
+User = get_user_model()
+
+
+def _error(message):
+    return JsonResponse({"non_field_errors": [message]}, status=400)
+
+
+@csrf_exempt
+@require_POST
+@throttle_async_view("auth")
+async def login(request):
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return _error("Invalid JSON")
+    email = data.get("email") if isinstance(data, dict) else None
+    password = data.get("password") if isinstance(data, dict) else None
+    if not email or not password:
+        return _error("Must include email and password")
+
+    user = await User.objects.filter(email=email).afirst()
+    if user is None:
+        # Hash anyway so unknown emails take as long as wrong passwords
+        await amake_password(password)
+        return _error("Invalid credentials")
+    if not await user.acheck_password(password):
+        return _error("Invalid credentials")
+    if not user.is_active:
+        return _error("User account is disabled")
+
+    return JsonResponse(await sync_to_async(login_response)(user))
@@ -0,0 +1,118 @@
+"""
+JWT authentication that trusts the signed claims instead of loading the user.
+"""
+
+from django.contrib.auth import get_user_model
+from django.utils.functional import SimpleLazyObject, empty
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from trello_backend import activity
+
+from .tokens import (
+    ACTIVE_CLAIM,
+    EMAIL_CLAIM,
+    TOKEN_VERSION_CLAIM,
+    get_token_version,
+)
+
+User = get_user_model()
+
+
+class _Claim:
+    """Attribute answered from the token until the user row is loaded"""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        if instance._wrapped is not empty:
+            return getattr(instance._wrapped, self.name)
+        return instance.__dict__["_claims"][self.name]
+
+
+class LazyUser(SimpleLazyObject):
+    """
+    The user of a token, loaded from the database on first use of a field that
+    the token does not carry.
+
+    Comparisons with users, hashing and ORM lookups such as
+    ``Project.objects.filter(owner=request.user)`` only need the id and do not
+    load the row.
+    """
+
+    pk = _Claim()
+    id = _Claim()
+    email = _Claim()
+    is_active = _Claim()
+
+    is_authenticated = True
+    is_anonymous = False
+    _meta = User._meta
+
+    def __init__(self, user_id, email):
+        user_id = User._meta.pk.to_python(user_id)
+        super().__init__(lambda: User.objects.get(pk=user_id))
+        self.__dict__["_claims"] = {
+            "pk": user_id,
+            "id": user_id,
+            "email": email,
+            "is_active": True,
+        }
+
+    @property
+    def __class__(self):
+        return User
+
+    def __eq__(self, other):
+        return isinstance(other, User) and self.pk == other.pk
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __bool__(self):
+        return True
+
+    def __str__(self):
+        return self.email
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    Authenticate from the claims of the token without a database lookup.
+
+    Tokens carry the user's email, ``is_active`` flag and token version. The
+    version is compared with the user's current one, read from the cache, so
+    tokens issued before a password change or deactivation are refused.
+    ``request.user`` is a ``LazyUser``. Tokens issued without these claims
+    fall back to loading the user. The request is buffered as the user's
+    ``last_active_at``.
+    """
+
+    def get_user(self, validated_token):
+        user = self.get_token_user(validated_token)
+        activity.record(User, "last_active_at", user.pk)
+        return user
+
+    def get_token_user(self, validated_token):
+        if TOKEN_VERSION_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            ) from e
+
+        if not validated_token.get(ACTIVE_CLAIM, False):
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if validated_token[TOKEN_VERSION_CLAIM] != get_token_version(user_id):
+            raise AuthenticationFailed(
+                _("Token has been revoked"), code="token_not_valid"
+            )
+        return LazyUser(user_id, validated_token.get(EMAIL_CLAIM, ""))
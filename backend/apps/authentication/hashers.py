@@ -0,0 +1,36 @@
+"""
+Password hashers whose cost is read from the settings.
+
+Django rehashes a password at the next successful login when it was hashed
+by another hasher than the first of ``PASSWORD_HASHERS``, or with another
+cost. Raising these settings therefore upgrades stored hashes transparently.
+"""
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return getattr(settings, "ARGON2_TIME_COST", super().time_cost)
+
+    @property
+    def memory_cost(self):
+        """Memory in KiB"""
+        return getattr(settings, "ARGON2_MEMORY_COST", super().memory_cost)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, "ARGON2_PARALLELISM", super().parallelism)
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return getattr(settings, "SCRYPT_WORK_FACTOR", super().work_factor)
+
+    @property
+    def maxmem(self):
+        # The OpenSSL default of 32 MiB is too small beyond a work factor of 2**14
+        return 256 * self.block_size * self.work_factor
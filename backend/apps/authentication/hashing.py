@@ -0,0 +1,44 @@
+"""
+Password hashing off the event loop for async views.
+
+Argon2 and scrypt are CPU bound and release the GIL while hashing. Async
+views run them on a pool of ``PASSWORD_HASHING_WORKERS`` threads, so a burst
+of logins neither blocks the event loop nor hashes more passwords at once
+than there are cores; further logins queue for a free thread.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password, verify_password
+
+_executor = None
+_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            workers = getattr(settings, "PASSWORD_HASHING_WORKERS", None)
+            _executor = ThreadPoolExecutor(
+                max_workers=workers or os.cpu_count() or 1,
+                thread_name_prefix="password-hashing",
+            )
+        return _executor
+
+
+async def _run(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(get_executor(), fn, *args)
+
+
+async def averify_password(password, encoded):
+    """``(is_correct, must_update)`` for ``password`` against ``encoded``"""
+    return await _run(verify_password, password, encoded)
+
+
+async def amake_password(password):
+    return await _run(make_password, password)
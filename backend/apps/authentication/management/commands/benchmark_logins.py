@@ -0,0 +1,64 @@
+"""
+Compare login throughput of the password hashers.
+
+Each simulated login verifies a password against a stored hash, which is
+what dominates the cost of the login endpoint. Logins are spread over
+``--threads`` threads; argon2 and scrypt release the GIL while hashing, so
+their throughput grows with the threads up to the number of cores.
+"""
+
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hashers
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Benchmark login throughput with each configured password hasher"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--logins", type=int, default=200)
+        parser.add_argument(
+            "--threads", type=int, default=4, help="Threads logging in at once"
+        )
+
+    def handle(self, *args, **options):
+        for hasher in get_hashers():
+            try:
+                encoded = hasher.encode("correct horse battery", hasher.salt())
+            except ValueError as e:
+                # Hasher library not installed
+                self.stdout.write(f"{hasher.algorithm}: skipped ({e})")
+                continue
+            timings, elapsed = self.run(hasher, encoded, options)
+            preferred = " (preferred)" if hasher is get_hashers()[0] else ""
+            self.stdout.write(
+                f"{hasher.algorithm}{preferred}: {len(timings) / elapsed:,.1f} logins/s, "
+                f"mean {statistics.mean(timings) * 1000:.1f} ms per login "
+                f"({len(timings)} logins, {options['threads']} threads)"
+            )
+        self.stdout.write(f"PASSWORD_HASHER is {settings.PASSWORD_HASHER!r}")
+
+    def run(self, hasher, encoded, options):
+        timings = []
+        lock = threading.Lock()
+        per_thread = max(1, options["logins"] // options["threads"])
+
+        def client():
+            for _ in range(per_thread):
+                start = time.perf_counter()
+                hasher.verify("correct horse battery", encoded)
+                elapsed = time.perf_counter() - start
+                with lock:
+                    timings.append(elapsed)
+
+        threads = [threading.Thread(target=client) for _ in range(options["threads"])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return timings, time.perf_counter() - start
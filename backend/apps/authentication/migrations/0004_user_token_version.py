@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0003_uuid7_primary_keys"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="token_version",
+            field=models.PositiveIntegerField(
+                default=0, help_text="Raised to revoke the tokens issued so far"
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0004_user_token_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="last_active_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Last authenticated request, written in batches",
+                null=True,
+            ),
+        ),
+    ]
@@ -1,8 +1,11 @@
-import uuid
-
+from django.contrib.auth.hashers import check_password
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
 
+from trello_backend.ids import uuid7
+
+from .hashing import amake_password, averify_password
+
 
 class UserManager(BaseUserManager):
     """
@@ -53,7 +56,7 @@ class User(AbstractUser):
     Custom User model with additional fields for Trello clone
     """
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     email = models.EmailField(unique=True)
     first_name = models.CharField(max_length=30, blank=True)
     last_name = models.CharField(max_length=30, blank=True)
@@ -62,6 +65,15 @@ class User(AbstractUser):
     is_active = models.BooleanField(default=True)
     date_joined = models.DateTimeField(auto_now_add=True)
     last_login = models.DateTimeField(null=True, blank=True)
+    last_active_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Last authenticated request, written in batches",
+    )
+    token_version = models.PositiveIntegerField(
+        default=0,
+        help_text="Raised to revoke the tokens issued so far",
+    )
 
     # Remove username field since we're using email
     username = None
@@ -75,6 +87,57 @@ class User(AbstractUser):
     def __str__(self):
         return self.email
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        user._loaded_is_active = user.__dict__.get("is_active")
+        user._loaded_token_version = user.__dict__.get("token_version")
+        return user
+
+    def set_password(self, raw_password):
+        super().set_password(raw_password)
+        if not self._state.adding:
+            self.revoke_tokens()
+
+    def check_password(self, raw_password):
+        def setter(raw_password):
+            # Rehashing keeps the password, so the tokens stay valid
+            super(User, self).set_password(raw_password)
+            self._password = None
+            self.save(update_fields=["password"])
+
+        return check_password(raw_password, self.password, setter)
+
+    async def acheck_password(self, raw_password):
+        is_correct, must_update = await averify_password(raw_password, self.password)
+        if is_correct and must_update:
+            self.password = await amake_password(raw_password)
+            await self.asave(update_fields=["password"])
+        return is_correct
+
+    def revoke_tokens(self):
+        """Invalidate every token issued so far, once the user is saved"""
+        self.token_version += 1
+
+    def save(self, *args, **kwargs):
+        if not self.is_active and getattr(self, "_loaded_is_active", False):
+            self.revoke_tokens()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and self.token_version != getattr(
+            self, "_loaded_token_version", self.token_version
+        ):
+            kwargs["update_fields"] = {*update_fields, "token_version"}
+        super().save(*args, **kwargs)
+
+        if self.token_version != getattr(
+            self, "_loaded_token_version", self.token_version
+        ):
+            from .tokens import forget_token_version
+
+            forget_token_version(self.pk, using=self._state.db)
+        self._loaded_is_active = self.is_active
+        self._loaded_token_version = self.token_version
+
     @property
     def full_name(self):
         return f"{self.first_name} {self.last_name}".strip()
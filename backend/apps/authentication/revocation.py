@@ -0,0 +1,236 @@
+"""
+Revocation check for refresh tokens in front of the token blacklist.
+
+With rotation every refresh blacklists the old refresh token, so
+``BlacklistedToken`` and ``OutstandingToken`` grow with every refresh and the
+blacklist lookup made on each refresh gets slower. Revoked token ids are also
+added to a Bloom filter. A token the filter has never seen is not revoked and
+needs no query. Only a positive answer, a revoked token or a rare false
+positive, is confirmed against the blacklist, which stays the exact set.
+
+The filter is split into buckets by token expiry. A token is looked up in the
+bucket of its own ``exp`` claim, and a bucket expires together with the last
+token it can hold, so the filter does not fill up over time. A bucket that is
+missing, e.g. after a Redis restart, is rebuilt from the blacklist before it
+answers.
+
+Buckets live in Redis when ``TOKEN_REVOCATION_REDIS_URL`` is set, and in
+process memory otherwise, which is only correct with a single process.
+``purge_expired_tokens`` removes the rows of expired tokens in chunks.
+"""
+
+import hashlib
+import threading
+import time
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+
+from trello_backend import metrics
+from trello_backend.db import DEFAULT_CHUNK_SIZE, delete_in_chunks
+
+BUCKET_SECONDS = 24 * 3600
+DEFAULT_BITS = 2**23
+DEFAULT_HASHES = 7
+
+# Bit 0 of a bucket is set once the bucket holds every revoked token of its
+# period; token positions start at 1
+LOADED_BIT = 0
+
+
+def _leeway():
+    leeway = api_settings.LEEWAY
+    if isinstance(leeway, timedelta):
+        return leeway.total_seconds()
+    return leeway or 0
+
+
+def _bucket(exp):
+    return int(exp) // BUCKET_SECONDS
+
+
+def _bucket_ttl(bucket):
+    """Seconds until no token of the bucket can be accepted any more"""
+    end = (bucket + 1) * BUCKET_SECONDS + _leeway()
+    return max(1, int(end - time.time()) + 1)
+
+
+def _positions(jti):
+    bits = getattr(settings, "TOKEN_REVOCATION_BLOOM_BITS", DEFAULT_BITS)
+    hashes = getattr(settings, "TOKEN_REVOCATION_BLOOM_HASHES", DEFAULT_HASHES)
+    digest = hashlib.blake2b(jti.encode(), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "big")
+    h2 = int.from_bytes(digest[8:], "big") | 1
+    return [1 + (h1 + i * h2) % (bits - 1) for i in range(hashes)]
+
+
+class MemoryBuckets:
+    """Filter buckets kept in the memory of this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def _get(self, bucket, create=False):
+        now = time.time()
+        for key, (expires, _bits) in list(self._buckets.items()):
+            if expires <= now:
+                del self._buckets[key]
+        entry = self._buckets.get(bucket)
+        if entry is None and create:
+            entry = self._buckets[bucket] = (now + _bucket_ttl(bucket), set())
+        return entry[1] if entry else None
+
+    def add(self, bucket, positions):
+        with self._lock:
+            self._get(bucket, create=True).update(positions)
+
+    def test(self, bucket, positions):
+        with self._lock:
+            bits = self._get(bucket)
+            if bits is None:
+                return False, False
+            return LOADED_BIT in bits, all(p in bits for p in positions)
+
+    def load(self, bucket, position_lists):
+        with self._lock:
+            bits = self._get(bucket, create=True)
+            for positions in position_lists:
+                bits.update(positions)
+            bits.add(LOADED_BIT)
+
+
+class RedisBuckets:
+    """Filter buckets stored as Redis bitmaps shared by every process"""
+
+    def __init__(self, url):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+
+    def _key(self, bucket):
+        return f"auth:revoked:{bucket}"
+
+    def add(self, bucket, positions):
+        key = self._key(bucket)
+        pipe = self._client.pipeline(transaction=False)
+        for position in positions:
+            pipe.setbit(key, position, 1)
+        pipe.expire(key, _bucket_ttl(bucket))
+        pipe.execute()
+
+    def test(self, bucket, positions):
+        key = self._key(bucket)
+        pipe = self._client.pipeline(transaction=False)
+        for position in (LOADED_BIT, *positions):
+            pipe.getbit(key, position)
+        loaded, *bits = pipe.execute()
+        return bool(loaded), all(bits)
+
+    def load(self, bucket, position_lists):
+        key = self._key(bucket)
+        pipe = self._client.pipeline(transaction=False)
+        for positions in position_lists:
+            for position in positions:
+                pipe.setbit(key, position, 1)
+            if len(pipe) >= 10_000:
+                pipe.execute()
+        pipe.setbit(key, LOADED_BIT, 1)
+        pipe.expire(key, _bucket_ttl(bucket))
+        pipe.execute()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            url = getattr(settings, "TOKEN_REVOCATION_REDIS_URL", None)
+            _backend = RedisBuckets(url) if url else MemoryBuckets()
+        return _backend
+
+
+def add(jti, exp):
+    """Record a blacklisted token in the filter"""
+    get_backend().add(_bucket(exp), _positions(jti))
+
+
+def _load(bucket):
+    """Fill a bucket with the blacklisted tokens expiring in its period"""
+    start = datetime.fromtimestamp(bucket * BUCKET_SECONDS, dt_timezone.utc)
+    jtis = BlacklistedToken.objects.filter(
+        token__expires_at__gte=start,
+        token__expires_at__lt=start + timedelta(seconds=BUCKET_SECONDS),
+    ).values_list("token__jti", flat=True)
+    get_backend().load(bucket, (_positions(jti) for jti in jtis.iterator()))
+    metrics.incr("auth.revocation.rebuilds")
+
+
+def _in_blacklist(jti):
+    return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+def is_revoked(jti, exp):
+    """Whether the refresh token ``jti`` expiring at ``exp`` was blacklisted"""
+    if exp + _leeway() < time.time():
+        # Expired tokens are refused anyway, and their bucket may be gone
+        return _in_blacklist(jti)
+
+    bucket = _bucket(exp)
+    positions = _positions(jti)
+    backend = get_backend()
+    loaded, maybe_revoked = backend.test(bucket, positions)
+    if not loaded:
+        _load(bucket)
+        loaded, maybe_revoked = backend.test(bucket, positions)
+    if not maybe_revoked:
+        metrics.incr("auth.revocation.filter_negatives")
+        return False
+    metrics.incr("auth.revocation.filter_positives")
+    return _in_blacklist(jti)
+
+
+def purge_expired_tokens(chunk_size=None):
+    """
+    Delete outstanding and blacklisted tokens that have expired, in chunks.
+
+    Returns the number of deleted outstanding tokens.
+    """
+    chunk_size = chunk_size or getattr(settings, "PURGE_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+    cutoff = timezone.now() - timedelta(seconds=_leeway())
+    params = [
+        OutstandingToken._meta.get_field("expires_at").get_db_prep_value(
+            cutoff, connection
+        )
+    ]
+    outstanding = connection.ops.quote_name(OutstandingToken._meta.db_table)
+    blacklisted = connection.ops.quote_name(BlacklistedToken._meta.db_table)
+
+    delete_in_chunks(
+        BlacklistedToken._meta.db_table,
+        f"SELECT id FROM {blacklisted} WHERE token_id IN "
+        f"(SELECT id FROM {outstanding} WHERE expires_at < %s)",
+        params,
+        chunk_size,
+    )
+    # Skip tokens blacklisted since the previous statement instead of failing
+    # on their foreign key
+    return delete_in_chunks(
+        OutstandingToken._meta.db_table,
+        f"SELECT id FROM {outstanding} o WHERE expires_at < %s AND NOT EXISTS "
+        f"(SELECT 1 FROM {blacklisted} b WHERE b.token_id = o.id)",
+        params,
+        chunk_size,
+    )
@@ -2,8 +2,12 @@ from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 
 from rest_framework import serializers
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
 
 from .models import User
+from .tokens import TOKEN_VERSION_CLAIM, RefreshToken, get_token_version
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -109,3 +113,20 @@ class ChangePasswordSerializer(serializers.Serializer):
         if not user.check_password(value):
             raise serializers.ValidationError("Old password is incorrect")
         return value
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """
+    Refresh that refuses refresh tokens issued before the user's token version
+    was raised
+    """
+
+    token_class = RefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        version = refresh.payload.get(TOKEN_VERSION_CLAIM)
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        if version is not None and version != get_token_version(user_id):
+            raise InvalidToken("Token has been revoked")
+        return super().validate(attrs)
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from . import revocation
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def add_to_revocation_filter(sender, instance, created, **kwargs):
+    if created:
+        revocation.add(instance.token.jti, instance.token.expires_at.timestamp())
@@ -0,0 +1,17 @@
+from celery import shared_task
+
+from trello_backend import activity
+
+from . import revocation
+
+
+@shared_task
+def purge_expired_tokens():
+    """Remove expired outstanding and blacklisted refresh tokens in chunks"""
+    return revocation.purge_expired_tokens()
+
+
+@shared_task
+def flush_activity():
+    """Write the buffered last login and activity timestamps"""
+    return activity.flush()
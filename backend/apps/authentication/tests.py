@@ -23,4 +23,255 @@ class AuthenticationTest(TestCase):
             email='count@example.com',
             password='pass123'
         )
-        self.assertEqual(User.objects.count(), 1)
\ No newline at end of file
+        self.assertEqual(User.objects.count(), 1)
+
+
+class StatelessJWTAuthenticationTest(TestCase):
+    """Access tokens are checked from their claims and revoked by a version bump"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from rest_framework.test import APIClient
+
+        cache.clear()
+        self.user = User.objects.create_user(email='jwt@example.com', password='testpass123')
+        self.client = APIClient()
+        response = self.client.post(
+            '/api/auth/login/', {'email': 'jwt@example.com', 'password': 'testpass123'}, format='json'
+        )
+        self.tokens = response.data['tokens']
+
+    def get(self, url, access):
+        return self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_session_check_skips_user_lookup(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self.assertEqual(self.get('/api/auth/session/', self.tokens['access']).status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get('/api/auth/session/', self.tokens['access'])
+        self.assertEqual(response.data['email'], 'jwt@example.com')
+        self.assertEqual([q['sql'] for q in queries], [])
+
+        # Model fields beyond the claims load the user
+        response = self.get('/api/auth/me/', self.tokens['access'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['email'], 'jwt@example.com')
+
+        # The lazy user works in ORM lookups and as a foreign key value
+        auth = f"Bearer {self.tokens['access']}"
+        response = self.client.post(
+            '/api/projects/', {'name': 'Board'}, format='json', HTTP_AUTHORIZATION=auth
+        )
+        self.assertEqual(response.status_code, 201)
+        response = self.get('/api/projects/', self.tokens['access'])
+        self.assertEqual(response.data['count'], 1)
+
+    def test_password_change_revokes_tokens(self):
+        response = self.client.post(
+            '/api/auth/change-password/',
+            {
+                'old_password': 'testpass123',
+                'new_password': 'N3w-secret-pass',
+                'new_password_confirm': 'N3w-secret-pass',
+            },
+            format='json',
+            HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}",
+        )
+        self.assertEqual(response.status_code, 200)
+        new_tokens = response.data['tokens']
+
+        self.assertEqual(self.get('/api/auth/session/', self.tokens['access']).status_code, 401)
+        response = self.client.post(
+            '/api/auth/token/refresh/', {'refresh': self.tokens['refresh']}, format='json'
+        )
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.get('/api/auth/session/', new_tokens['access']).status_code, 200)
+
+        # The async endpoints refuse the old token too
+        self.assertEqual(self.get('/api/async/projects/', self.tokens['access']).status_code, 401)
+        self.assertEqual(self.get('/api/async/projects/', new_tokens['access']).status_code, 200)
+
+    def test_deactivation_revokes_tokens(self):
+        self.user.is_active = False
+        self.user.save(update_fields=['is_active'])
+        self.assertEqual(self.get('/api/auth/session/', self.tokens['access']).status_code, 401)
+
+
+class TokenRevocationTest(TestCase):
+    """Rotated refresh tokens are refused without querying the blacklist for every refresh"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from rest_framework.test import APIClient
+
+        cache.clear()
+        User.objects.create_user(email='rotate@example.com', password='testpass123')
+        self.client = APIClient()
+        response = self.client.post(
+            '/api/auth/login/', {'email': 'rotate@example.com', 'password': 'testpass123'}, format='json'
+        )
+        self.refresh = response.data['tokens']['refresh']
+
+    def refresh_token(self, refresh):
+        return self.client.post('/api/auth/token/refresh/', {'refresh': refresh}, format='json')
+
+    def test_rotated_token_is_refused(self):
+        from django.core.cache import cache
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        response = self.refresh_token(self.refresh)
+        self.assertEqual(response.status_code, 200)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.refresh_token(response.data['refresh'])
+        self.assertEqual(response.status_code, 200)
+        blacklist_lookups = [
+            q['sql'] for q in queries if 'blacklistedtoken' in q['sql'] and '"jti"' in q['sql']
+        ]
+        self.assertEqual(blacklist_lookups, [])
+
+        # Once the grace window is over the rotated token is refused
+        cache.clear()
+        self.assertEqual(self.refresh_token(self.refresh).status_code, 401)
+
+    def test_concurrent_refreshes_share_the_new_pair(self):
+        from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+        first = self.refresh_token(self.refresh)
+        tokens = OutstandingToken.objects.count()
+        second = self.refresh_token(self.refresh)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(OutstandingToken.objects.count(), tokens)
+
+    def test_purge_expired_tokens(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+        from .revocation import purge_expired_tokens
+
+        expired = timezone.now() - timedelta(days=1)
+        for i in range(5):
+            token = OutstandingToken.objects.create(jti=f'expired-{i}', token='', expires_at=expired)
+            if i % 2:
+                BlacklistedToken.objects.create(token=token)
+        live = OutstandingToken.objects.count() - 5
+
+        self.assertEqual(purge_expired_tokens(chunk_size=2), 5)
+        self.assertEqual(OutstandingToken.objects.count(), live)
+        self.assertFalse(BlacklistedToken.objects.filter(token__jti__startswith='expired-').exists())
+
+
+class ActivityBufferTest(TestCase):
+    """Logins and requests are written to the user in batches"""
+
+    def test_login_and_activity_are_flushed(self):
+        from rest_framework.test import APIClient
+
+        from trello_backend import activity
+
+        user = User.objects.create_user(email='active@example.com', password='testpass123')
+        client = APIClient()
+        response = client.post(
+            '/api/auth/login/', {'email': 'active@example.com', 'password': 'testpass123'}, format='json'
+        )
+        self.assertIsNotNone(response.data['user']['last_login'])
+        access = response.data['tokens']['access']
+        client.get('/api/auth/session/', HTTP_AUTHORIZATION=f'Bearer {access}')
+
+        user.refresh_from_db()
+        self.assertIsNone(user.last_login)
+        self.assertIsNone(user.last_active_at)
+
+        activity.flush()
+        user.refresh_from_db()
+        self.assertIsNotNone(user.last_login)
+        self.assertIsNotNone(user.last_active_at)
+
+    def test_redis_outage_does_not_fail_requests(self):
+        from unittest import mock
+
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        from trello_backend import activity, metrics
+
+        user = User.objects.create_user(email='active@example.com', password='testpass123')
+        errors = metrics.get('activity.errors')
+        # Nothing listens on port 1, so every command fails to connect
+        with mock.patch.object(activity, '_backend', activity.RedisBuffer('redis://127.0.0.1:1/0')):
+            response = self.client.get(
+                '/api/auth/session/', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(metrics.get('activity.errors'), errors + 1)
+
+
+class PasswordHashingTest(TestCase):
+    """Hashes from an older hasher are upgraded at login without revoking tokens"""
+
+    hashers = [
+        'apps.authentication.hashers.ScryptPasswordHasher',
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ]
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='hash@example.com', password='testpass123')
+        self.assertTrue(self.user.password.startswith('md5$'))
+
+    def test_login_rehashes_password(self):
+        from django.test import override_settings
+        from rest_framework.test import APIClient
+
+        with override_settings(PASSWORD_HASHERS=self.hashers, SCRYPT_WORK_FACTOR=2**10):
+            response = APIClient().post(
+                '/api/auth/login/', {'email': 'hash@example.com', 'password': 'testpass123'}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('scrypt$'))
+        self.assertEqual(self.user.token_version, 0)
+
+    async def test_async_login_rehashes_password(self):
+        from django.test import override_settings
+
+        with override_settings(PASSWORD_HASHERS=self.hashers, SCRYPT_WORK_FACTOR=2**10):
+            response = await self.async_client.post(
+                '/api/async/auth/login/',
+                {'email': 'hash@example.com', 'password': 'testpass123'},
+                content_type='application/json',
+            )
+            wrong = await self.async_client.post(
+                '/api/async/auth/login/',
+                {'email': 'hash@example.com', 'password': 'wrong'},
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.json()['tokens'])
+        self.assertEqual(wrong.status_code, 400)
+        user = await User.objects.aget(pk=self.user.pk)
+        self.assertTrue(user.password.startswith('scrypt$'))
+
+    def test_async_login_is_throttled(self):
+        from django.conf import settings
+        from django.test import override_settings
+
+        rates = {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], 'auth': '2/min'}
+        with override_settings(
+            REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates}
+        ):
+            responses = [
+                self.client.post(
+                    '/api/async/auth/login/',
+                    {'email': 'hash@example.com', 'password': 'wrong'},
+                    content_type='application/json',
+                    REMOTE_ADDR='10.0.0.45',
+                )
+                for _ in range(3)
+            ]
+        self.assertEqual([r.status_code for r in responses], [400, 400, 429])
+        self.assertIn('Retry-After', responses[2])
@@ -0,0 +1,72 @@
+"""
+JWTs carrying the claims needed to authenticate without loading the user.
+
+Besides the user id, tokens carry the user's email, ``is_active`` flag and
+``token_version``. The user's version is raised when the password changes or
+the account is deactivated. Tokens issued before that are refused because
+their version no longer matches the current one, which is kept in the cache.
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from . import revocation
+
+EMAIL_CLAIM = "email"
+ACTIVE_CLAIM = "is_active"
+TOKEN_VERSION_CLAIM = "ver"
+
+
+class RefreshToken(tokens.RefreshToken):
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[EMAIL_CLAIM] = user.email
+        token[ACTIVE_CLAIM] = user.is_active
+        token[TOKEN_VERSION_CLAIM] = user.token_version
+        return token
+
+    def check_blacklist(self):
+        # Ask the revocation filter first; most tokens were never blacklisted
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if revocation.is_revoked(jti, self.payload["exp"]):
+            raise TokenError(_("Token is blacklisted"))
+
+
+def _version_key(user_id):
+    return f"auth:token_version:{user_id}"
+
+
+def get_token_version(user_id):
+    """Current token version of a user, or None if the user does not exist"""
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = (
+            get_user_model()
+            .objects.filter(pk=user_id)
+            .values_list("token_version", flat=True)
+            .first()
+        )
+        if version is None:
+            return None
+        cache.set(key, version, None)
+    return version
+
+
+def forget_token_version(user_id, using=None):
+    """
+    Drop the cached version of a user whose version changed.
+
+    The entry is dropped again on commit, in case a concurrent request cached
+    the old version from the database in the meantime.
+    """
+    key = _version_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key), using=using)
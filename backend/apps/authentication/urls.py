@@ -1,13 +1,13 @@
 from django.urls import path
 
-from rest_framework_simplejwt.views import TokenRefreshView
-
 from .views import (
     ChangePasswordView,
     LoginView,
     LogoutView,
     RegisterView,
+    TokenRefreshView,
     UserProfileView,
+    session,
     user_profile,
 )
 
@@ -22,5 +22,6 @@ urlpatterns = [
     # User profile endpoints
     path("profile/", UserProfileView.as_view(), name="profile"),
     path("me/", user_profile, name="current_user"),
+    path("session/", session, name="session"),
     path("change-password/", ChangePasswordView.as_view(), name="change-password"),
 ]
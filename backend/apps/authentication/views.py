@@ -1,4 +1,8 @@
+import hashlib
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.utils import timezone
 
 from rest_framework import permissions, status
@@ -6,18 +10,25 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.generics import RetrieveUpdateAPIView
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt import views as jwt_views
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.views import TokenObtainPairView
 
+from trello_backend import activity
+from trello_backend.singleflight import cached_single_flight
+
 from .serializers import (
     ChangePasswordSerializer,
     UserLoginSerializer,
     UserProfileSerializer,
     UserRegistrationSerializer,
 )
+from .tokens import RefreshToken
 
 User = get_user_model()
 
+DEFAULT_REFRESH_GRACE_SECONDS = 10
+
 
 class RegisterView(APIView):
     """
@@ -25,6 +36,7 @@ class RegisterView(APIView):
     """
 
     permission_classes = [permissions.AllowAny]
+    throttle_scope = "auth"
 
     def post(self, request):
         serializer = UserRegistrationSerializer(data=request.data)
@@ -47,32 +59,36 @@ class RegisterView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def login_response(user):
+    """Body of a successful login: the user and a new token pair"""
+    refresh = RefreshToken.for_user(user)
+
+    # Written in the next activity flush instead of on every login
+    user.last_login = timezone.now()
+    activity.record(User, "last_login", user.pk, user.last_login, resolution=0)
+
+    return {
+        "message": "Login successful",
+        "user": UserProfileSerializer(user).data,
+        "tokens": {
+            "refresh": str(refresh),
+            "access": str(refresh.access_token),
+        },
+    }
+
+
 class LoginView(TokenObtainPairView):
     """
     Custom login view that returns user data along with tokens
     """
 
+    throttle_scope = "auth"
+
     def post(self, request, *args, **kwargs):
         serializer = UserLoginSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.validated_data["user"]
-            refresh = RefreshToken.for_user(user)
-
-            # Update last login
-            user.last_login = timezone.now()
-            user.save(update_fields=["last_login"])
-
-            return Response(
-                {
-                    "message": "Login successful",
-                    "user": UserProfileSerializer(user).data,
-                    "tokens": {
-                        "refresh": str(refresh),
-                        "access": str(refresh.access_token),
-                    },
-                },
-                status=status.HTTP_200_OK,
-            )
+            return Response(login_response(user), status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -98,6 +114,41 @@ class LogoutView(APIView):
             )
 
 
+class TokenRefreshView(jwt_views.TokenRefreshView):
+    """
+    Token refresh that coalesces concurrent refreshes of the same token.
+
+    A burst of requests failing with an expired access token makes the client
+    refresh several times with the same refresh token. The first refresh
+    rotates and blacklists it; the others would fail. The new pair is kept in
+    the cache for ``TOKEN_REFRESH_GRACE_SECONDS`` under a hash of the old
+    refresh token, and every refresh of that token within the window gets the
+    same pair without touching the database.
+    """
+
+    throttle_scope = "auth"
+
+    def post(self, request, *args, **kwargs):
+        refresh = request.data.get("refresh")
+        if not isinstance(refresh, str) or not refresh:
+            return super().post(request, *args, **kwargs)
+
+        key = "auth:refresh:" + hashlib.sha256(refresh.encode()).hexdigest()
+        grace = getattr(
+            settings, "TOKEN_REFRESH_GRACE_SECONDS", DEFAULT_REFRESH_GRACE_SECONDS
+        )
+        data = cached_single_flight(cache, key, lambda: self.refresh(request), grace)
+        return Response(data, status=status.HTTP_200_OK)
+
+    def refresh(self, request):
+        serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+        return dict(serializer.validated_data)
+
+
 class UserProfileView(RetrieveUpdateAPIView):
     """
     Get and update user profile
@@ -116,6 +167,7 @@ class ChangePasswordView(APIView):
     """
 
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = "auth"
 
     def post(self, request):
         serializer = ChangePasswordSerializer(
@@ -127,8 +179,17 @@ class ChangePasswordView(APIView):
             user.set_password(serializer.validated_data["new_password"])
             user.save()
 
+            # The change revoked every token of the user; hand out a new pair
+            refresh = RefreshToken.for_user(user)
             return Response(
-                {"message": "Password changed successfully"}, status=status.HTTP_200_OK
+                {
+                    "message": "Password changed successfully",
+                    "tokens": {
+                        "refresh": str(refresh),
+                        "access": str(refresh.access_token),
+                    },
+                },
+                status=status.HTTP_200_OK,
             )
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -142,3 +203,13 @@ def user_profile(request):
     """
     serializer = UserProfileSerializer(request.user)
     return Response(serializer.data)
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+def session(request):
+    """
+    Check that the access token is valid; answered from the token claims
+    without loading the user
+    """
+    return Response({"id": str(request.user.pk), "email": request.user.email})
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Project, ProjectMembership
+from .models import Project, ProjectMembership, ShardDirectory
 
 
 class ProjectMembershipInline(admin.TabularInline):
@@ -73,3 +73,14 @@ class ProjectMembershipAdmin(admin.ModelAdmin):
         ("Membership Details", {"fields": ("id", "project", "user", "role")}),
         ("Invitation Info", {"fields": ("invited_by", "joined_at")}),
     )
+
+
+@admin.register(ShardDirectory)
+class ShardDirectoryAdmin(admin.ModelAdmin):
+    """Admin configuration for the shard directory; use move_project_shard to
+    move a project"""
+
+    list_display = ["project_id", "user", "shard"]
+    list_filter = ["shard"]
+    search_fields = ["project_id", "user__email"]
+    readonly_fields = ["id", "user", "project_id", "shard"]
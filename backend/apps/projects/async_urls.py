@@ -0,0 +1,9 @@
+from django.urls import path
+
+from . import async_views
+
+app_name = "projects_async"
+
+urlpatterns = [
+    path("", async_views.project_list, name="project-list"),
+]
@@ -0,0 +1,48 @@
+"""
+Async versions of the hottest project reads.
+
+They run on the event loop under ASGI and use the async ORM, so a worker
+does not tie up a thread per open connection. Responses match the
+corresponding DRF endpoints, including the fan-out to every shard.
+"""
+
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from asgiref.sync import sync_to_async
+
+from apps.authentication.async_auth import async_jwt_required
+from trello_backend import sharding
+from trello_backend.pagination import apaginate
+
+from .models import Project
+from .serializers import ProjectListSerializer
+
+
+@require_GET
+@async_jwt_required
+async def project_list(request):
+    """Async ``GET /api/projects/``"""
+    user = request.user
+
+    def build_queryset():
+        return (
+            Project.objects.visible_to(user)
+            .with_member_stats(user)
+            .select_related("owner")
+            .filter(is_template=False)
+        )
+
+    if sharding.is_enabled():
+        projects = await sync_to_async(sharding.projects_for_user)(user, build_queryset)
+        projects.sort(key=lambda p: (p.updated_at, p.created_at), reverse=True)
+    else:
+        projects = build_queryset()
+    data = await apaginate(
+        request,
+        projects,
+        lambda page: ProjectListSerializer(
+            page, many=True, context={"request": request}
+        ).data,
+    )
+    return JsonResponse(data)
@@ -0,0 +1,93 @@
+"""
+Cache of read-heavy project responses.
+
+Every project has a version token stored in the cache. Cached responses are
+keyed by that token, so bumping it when anything on the board changes makes
+all of them stale at once without having to know their keys. The version is a
+random token rather than a counter so that an evicted version can never make
+old entries valid again.
+"""
+
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from trello_backend import metrics
+from trello_backend.routers import use_primary
+from trello_backend.singleflight import cached_single_flight
+
+DEFAULT_TIMEOUT = 300
+METRIC_PREFIX = "cache.project"
+
+
+def get_cache():
+    return caches[getattr(settings, "PROJECT_CACHE_ALIAS", "default")]
+
+
+def get_timeout():
+    return getattr(settings, "PROJECT_CACHE_TIMEOUT", DEFAULT_TIMEOUT)
+
+
+def _version_key(project_id):
+    return f"project:{project_id}:version"
+
+
+def get_project_version(project_id):
+    cache = get_cache()
+    key = _version_key(project_id)
+    version = cache.get(key)
+    if version is None:
+        # Another process may set it concurrently; add() keeps the first one
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def _set_new_version(project_id):
+    get_cache().set(_version_key(project_id), uuid.uuid4().hex, None)
+
+
+def bump_project_version(project_id):
+    """
+    Invalidate every cached response of the project.
+
+    The version is bumped again once the transaction commits, so a response
+    built from the old rows while the transaction was open is not kept.
+    """
+    if project_id is None:
+        return
+    _set_new_version(project_id)
+    transaction.on_commit(lambda: _set_new_version(project_id))
+
+
+def project_cache_key(project_id, name, *parts):
+    """Key of a response of the current project version"""
+    digest = hashlib.md5(
+        "|".join(str(part) for part in parts).encode(), usedforsecurity=False
+    ).hexdigest()
+    return f"project:{project_id}:{get_project_version(project_id)}:{name}:{digest}"
+
+
+def get_or_build(key, build):
+    """
+    Return the cached value for ``key``, building and storing it on a miss.
+
+    Concurrent misses for the same key, in this process or in other workers,
+    wait for a single ``build``.
+    """
+    cache = get_cache()
+    value = cache.get(key)
+    if value is not None:
+        metrics.incr(f"{METRIC_PREFIX}.hits")
+        return value
+    metrics.incr(f"{METRIC_PREFIX}.misses")
+
+    def build_from_primary():
+        # A lagging replica could otherwise store old data under the new version
+        with use_primary():
+            return build()
+
+    return cached_single_flight(cache, key, build_from_primary, get_timeout())
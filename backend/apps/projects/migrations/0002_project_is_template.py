@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="project",
+            name="is_template",
+            field=models.BooleanField(
+                default=False,
+                help_text="Whether the project is a board template that can be duplicated",
+            ),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0002_project_is_template"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="project",
+            name="deleted_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="When the project was deleted; its data is purged in the background",
+                null=True,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="project",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", False)),
+                fields=["deleted_at"],
+                name="project_pending_purge_idx",
+            ),
+        ),
+    ]
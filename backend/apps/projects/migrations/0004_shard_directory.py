@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:22
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_directory(apps, schema_editor):
+    """Existing projects all live on the default database"""
+    if schema_editor.connection.alias != "default":
+        return
+    Project = apps.get_model("projects", "Project")
+    ProjectMembership = apps.get_model("projects", "ProjectMembership")
+    ShardDirectory = apps.get_model("projects", "ShardDirectory")
+    entries = [
+        ShardDirectory(user_id=user_id, project_id=project_id, shard="default")
+        for project_id, user_id in Project.objects.values_list("id", "owner_id")
+    ]
+    entries += [
+        ShardDirectory(user_id=user_id, project_id=project_id, shard="default")
+        for project_id, user_id in ProjectMembership.objects.values_list(
+            "project_id", "user_id"
+        )
+    ]
+    ShardDirectory.objects.bulk_create(entries, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0003_project_deleted_at_project_project_pending_purge_idx"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ShardDirectory",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "project_id",
+                    models.UUIDField(db_index=True, help_text="The project"),
+                ),
+                (
+                    "shard",
+                    models.CharField(
+                        help_text="Database alias of the shard", max_length=64
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        help_text="Owner or member of the project",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="shard_entries",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Shard Directory Entry",
+                "verbose_name_plural": "Shard Directory",
+                "unique_together": {("user", "project_id")},
+            },
+        ),
+        migrations.RunPython(fill_directory, migrations.RunPython.noop),
+    ]
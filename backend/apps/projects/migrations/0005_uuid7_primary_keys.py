@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:26
+
+import trello_backend.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0004_shard_directory"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="project",
+            name="id",
+            field=models.UUIDField(
+                default=trello_backend.ids.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="projectmembership",
+            name="id",
+            field=models.UUIDField(
+                default=trello_backend.ids.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="sharddirectory",
+            name="id",
+            field=models.UUIDField(
+                default=trello_backend.ids.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0005_uuid7_primary_keys"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="project",
+            name="last_activity_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Last change to the lists, tasks or comments, written in batches",
+                null=True,
+            ),
+        ),
+    ]
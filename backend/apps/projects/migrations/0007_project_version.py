@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0006_project_last_activity_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="project",
+            name="version",
+            field=models.PositiveIntegerField(
+                default=1, editable=False, help_text="Incremented by every save"
+            ),
+        ),
+    ]
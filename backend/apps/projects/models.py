@@ -1,13 +1,58 @@
-import uuid
-
 from django.contrib.auth import get_user_model
 from django.core.validators import MinLengthValidator
 from django.db import models
+from django.db.models import Case, Count, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from trello_backend import versioning
+from trello_backend.ids import uuid7
+from trello_backend.versioning import VersionedModel
 
 User = get_user_model()
 
 
-class Project(models.Model):
+class ProjectQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Projects the user owns or is a member of"""
+        return self.filter(
+            Q(owner=user)
+            | Q(id__in=ProjectMembership.objects.filter(user=user).values("project_id"))
+        )
+
+    def with_member_stats(self, user):
+        """
+        Annotate ``members_count`` and the ``user_role`` of ``user``.
+
+        Both are correlated subqueries, so listing any number of projects costs
+        a single query and the result is not affected by other joins.
+        """
+        memberships = ProjectMembership.objects.filter(project=OuterRef("pk"))
+        member_count = (
+            memberships.order_by()
+            .values("project")
+            .annotate(count=Count("id"))
+            .values("count")
+        )
+        return self.annotate(
+            members_count=Coalesce(Subquery(member_count), 0) + 1,
+            user_role=Case(
+                When(owner=user, then=Value("owner")),
+                default=Subquery(memberships.filter(user=user).values("role")[:1]),
+            ),
+        )
+
+
+class ProjectManager(models.Manager.from_queryset(ProjectQuerySet)):
+    """
+    Default manager that hides projects waiting to be purged
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class Project(VersionedModel):
     """
     Project model representing a Trello-like board/workspace
     """
@@ -24,7 +69,7 @@ class Project(models.Model):
         ("#838c91", "Gray"),
     ]
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     name = models.CharField(
         max_length=100,
         validators=[MinLengthValidator(1)],
@@ -64,9 +109,26 @@ class Project(models.Model):
     is_archived = models.BooleanField(
         default=False, help_text="Whether the project is archived"
     )
+    is_template = models.BooleanField(
+        default=False,
+        help_text="Whether the project is a board template that can be duplicated",
+    )
+    deleted_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="When the project was deleted; its data is purged in the background",
+    )
+    last_activity_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="Last change to the lists, tasks or comments, written in batches",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProjectManager()
+    all_objects = models.Manager()
+
     class Meta:
         ordering = ["-updated_at", "-created_at"]
         verbose_name = "Project"
@@ -76,20 +138,30 @@ class Project(models.Model):
             models.Index(fields=["created_at"]),
             models.Index(fields=["is_private"]),
             models.Index(fields=["is_archived"]),
+            models.Index(
+                fields=["deleted_at"],
+                condition=Q(deleted_at__isnull=False),
+                name="project_pending_purge_idx",
+            ),
         ]
 
     def __str__(self):
         return f"{self.name} (by {self.owner.email})"
 
+    def mark_deleted(self):
+        """Hide the project right away; the purge happens in the background"""
+        self.deleted_at = timezone.now()
+        versioning.update(self, deleted_at=self.deleted_at)
+
     def get_members_count(self):
         """Get total number of members including owner"""
-        return self.members.count() + 1  # +1 for owner
+        return self.projectmembership_set.count() + 1  # +1 for owner
 
     def is_member(self, user):
         """Check if user is a member or owner of this project"""
         if user == self.owner:
             return True
-        return self.members.filter(id=user.id).exists()
+        return self.projectmembership_set.filter(user=user).exists()
 
     def can_edit(self, user):
         """Check if user can edit this project"""
@@ -122,7 +194,7 @@ class ProjectMembership(models.Model):
         (ADMIN, "Admin"),
     ]
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     project = models.ForeignKey(
         Project, on_delete=models.CASCADE, help_text="The project"
     )
@@ -155,3 +227,28 @@ class ProjectMembership(models.Model):
 
     def __str__(self):
         return f"{self.user.email} - {self.project.name} ({self.role})"
+
+
+class ShardDirectory(models.Model):
+    """
+    Shard of a project and the users who can reach it, kept on the default
+    database for the project sharding in ``trello_backend.sharding``
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="shard_entries",
+        help_text="Owner or member of the project",
+    )
+    project_id = models.UUIDField(db_index=True, help_text="The project")
+    shard = models.CharField(max_length=64, help_text="Database alias of the shard")
+
+    class Meta:
+        unique_together = ["user", "project_id"]
+        verbose_name = "Shard Directory Entry"
+        verbose_name_plural = "Shard Directory"
+
+    def __str__(self):
+        return f"{self.project_id} on {self.shard}"
@@ -42,6 +42,7 @@ class ProjectListSerializer(serializers.ModelSerializer):
 
     owner_email = serializers.EmailField(source="owner.email", read_only=True)
     members_count = serializers.SerializerMethodField()
+    user_role = serializers.SerializerMethodField()
 
     class Meta:
         model = Project
@@ -54,13 +55,31 @@ class ProjectListSerializer(serializers.ModelSerializer):
             "background_color",
             "is_private",
             "is_archived",
+            "is_template",
             "created_at",
             "updated_at",
+            "user_role",
+            "version",
         ]
 
     def get_members_count(self, obj):
+        if hasattr(obj, "members_count"):
+            return obj.members_count
         return obj.get_members_count()
 
+    def get_user_role(self, obj):
+        """Get current user's role in the project"""
+        if hasattr(obj, "user_role"):
+            return obj.user_role
+
+        request = self.context.get("request")
+        if not request or not request.user.is_authenticated:
+            return None
+        if request.user.id == obj.owner_id:
+            return "owner"
+        membership = obj.projectmembership_set.filter(user=request.user).first()
+        return membership.role if membership else None
+
 
 class ProjectDetailSerializer(serializers.ModelSerializer):
     """Serializer for detailed project view"""
@@ -85,26 +104,36 @@ class ProjectDetailSerializer(serializers.ModelSerializer):
             "background_image",
             "is_private",
             "is_archived",
+            "is_template",
             "created_at",
             "updated_at",
             "user_role",
+            "version",
         ]
 
     def get_members_count(self, obj):
+        if hasattr(obj, "members_count"):
+            return obj.members_count
         return obj.get_members_count()
 
     def get_user_role(self, obj):
         """Get current user's role in the project"""
+        if hasattr(obj, "user_role"):
+            return obj.user_role
+
         request = self.context.get("request")
         if not request or not request.user.is_authenticated:
             return None
 
         user = request.user
-        if user == obj.owner:
+        if user.id == obj.owner_id:
             return "owner"
 
-        membership = obj.projectmembership_set.filter(user=user).first()
-        return membership.role if membership else None
+        # Reuse the memberships already loaded for ``members``
+        for membership in obj.projectmembership_set.all():
+            if membership.user_id == user.id:
+                return membership.role
+        return None
 
 
 class ProjectCreateSerializer(serializers.ModelSerializer):
@@ -122,6 +151,7 @@ class ProjectCreateSerializer(serializers.ModelSerializer):
             "background_image",
             "is_private",
             "owner_email",
+            "version",
         ]
 
     def create(self, validated_data):
@@ -142,9 +172,20 @@ class ProjectUpdateSerializer(serializers.ModelSerializer):
             "background_image",
             "is_private",
             "is_archived",
+            "is_template",
+            "version",
         ]
 
 
+class ProjectDuplicateSerializer(serializers.Serializer):
+    """Serializer for duplicating a project or creating a board from a template"""
+
+    name = serializers.CharField(max_length=100, required=False)
+    include_assignees = serializers.BooleanField(default=False)
+    include_comments = serializers.BooleanField(default=False)
+    as_template = serializers.BooleanField(default=False)
+
+
 class AddMemberSerializer(serializers.Serializer):
     """Serializer for adding members to a project"""
 
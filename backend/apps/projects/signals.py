@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from trello_backend import sharding
+
+from .cache import bump_project_version
+from .models import Project, ProjectMembership, ShardDirectory
+
+User = get_user_model()
+
+
+@receiver([post_save, post_delete], sender=Project)
+def project_changed(sender, instance, **kwargs):
+    bump_project_version(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=ProjectMembership)
+def membership_changed(sender, instance, **kwargs):
+    bump_project_version(instance.project_id)
+
+
+@receiver(post_save, sender=Project)
+def project_saved(sender, instance, created, using, raw=False, **kwargs):
+    if raw or not created:
+        return
+    ShardDirectory.objects.update_or_create(
+        user_id=instance.owner_id, project_id=instance.pk, defaults={"shard": using}
+    )
+
+
+@receiver(post_delete, sender=Project)
+def project_deleted(sender, instance, **kwargs):
+    ShardDirectory.objects.filter(project_id=instance.pk).delete()
+    sharding.forget_project(instance.pk)
+
+
+@receiver(post_save, sender=ProjectMembership)
+def membership_saved(sender, instance, created, using, raw=False, **kwargs):
+    if raw or not created:
+        return
+    ShardDirectory.objects.update_or_create(
+        user_id=instance.user_id,
+        project_id=instance.project_id,
+        defaults={"shard": using},
+    )
+
+
+@receiver(post_delete, sender=ProjectMembership)
+def membership_deleted(sender, instance, **kwargs):
+    ShardDirectory.objects.filter(
+        user_id=instance.user_id, project_id=instance.project_id
+    ).delete()
+
+
+@receiver(post_save, sender=User)
+def copy_user_to_shards(sender, instance, using, raw=False, **kwargs):
+    """Keep the copies of users on the shards up to date"""
+    if raw or using != DEFAULT_DB_ALIAS or not sharding.is_enabled():
+        return
+    values = {
+        field.attname: getattr(instance, field.attname)
+        for field in User._meta.concrete_fields
+    }
+    for alias in sharding.get_shards():
+        if alias != DEFAULT_DB_ALIAS:
+            User.objects.using(alias).update_or_create(pk=instance.pk, defaults=values)
+
+
+@receiver(post_delete, sender=User)
+def delete_user_from_shards(sender, instance, using, **kwargs):
+    if using != DEFAULT_DB_ALIAS or not sharding.is_enabled():
+        return
+    for alias in sharding.get_shards():
+        if alias != DEFAULT_DB_ALIAS:
+            User.objects.using(alias).filter(pk=instance.pk).delete()
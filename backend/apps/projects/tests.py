@@ -1,6 +1,6 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.contrib.auth import get_user_model
-from .models import Project
+from .models import Project, ProjectMembership
 
 User = get_user_model()
 
@@ -34,4 +34,501 @@ class ProjectTest(TestCase):
             description='Test',
             owner=user
         )
-        self.assertEqual(Project.objects.count(), 1)
\ No newline at end of file
+        self.assertEqual(Project.objects.count(), 1)
+
+
+class ProjectDuplicateTest(TestCase):
+    """Board duplication and templates"""
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+        from apps.tasks.models import TaskList, Task, TaskComment
+
+        self.owner = User.objects.create_user(email='owner@example.com', password='testpass123')
+        self.member = User.objects.create_user(email='member@example.com', password='testpass123')
+        self.project = Project.objects.create(name='Sprint', owner=self.owner)
+        ProjectMembership.objects.create(project=self.project, user=self.member)
+        self.todo = TaskList.objects.create(name='To do', project=self.project, position=0)
+        TaskList.objects.create(name='Done', project=self.project, position=1)
+        for position in range(3):
+            task = Task.objects.create(
+                title=f'Task {position}', task_list=self.todo,
+                creator=self.owner, position=position
+            )
+            task.assignees.add(self.member)
+            TaskComment.objects.create(task=task, author=self.member, content='Note')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def duplicate(self, **data):
+        return self.client.post(f'/api/projects/{self.project.id}/duplicate/', data, format='json')
+
+    def test_duplicate_copies_board(self):
+        """Lists and tasks are copied, assignees and comments only on request"""
+        from apps.tasks.models import Task, TaskComment
+
+        response = self.duplicate(name='Sprint 2')
+        self.assertEqual(response.status_code, 201)
+        copy = Project.objects.get(id=response.data['id'])
+        self.assertEqual(copy.name, 'Sprint 2')
+        self.assertEqual(copy.task_lists.count(), 2)
+        tasks = Task.objects.filter(task_list__project=copy)
+        self.assertEqual(tasks.count(), 3)
+        self.assertFalse(tasks.filter(assignees__isnull=False).exists())
+        self.assertFalse(TaskComment.objects.filter(task__task_list__project=copy).exists())
+
+        response = self.duplicate(include_assignees=True, include_comments=True)
+        copy = Project.objects.get(id=response.data['id'])
+        self.assertTrue(copy.is_member(self.member))
+        self.assertEqual(
+            Task.objects.filter(task_list__project=copy, assignees=self.member).count(), 3
+        )
+        self.assertEqual(TaskComment.objects.filter(task__task_list__project=copy).count(), 3)
+
+    def test_duplicate_query_count_is_constant(self):
+        """Copying a bigger board does not issue more queries"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from apps.tasks.models import Task
+
+        with CaptureQueriesContext(connection) as small:
+            self.duplicate(include_assignees=True, include_comments=True)
+        for position in range(3, 30):
+            Task.objects.create(
+                title=f'Task {position}', task_list=self.todo,
+                creator=self.owner, position=position
+            ).assignees.add(self.member)
+        with CaptureQueriesContext(connection) as large:
+            self.duplicate(include_assignees=True, include_comments=True)
+        self.assertEqual(len(small), len(large))
+
+    def test_large_board_is_copied_in_background(self):
+        """Boards above the threshold are copied by a Celery task"""
+        from django.test import override_settings
+        from apps.tasks.models import Task
+
+        with override_settings(PROJECT_DUPLICATE_ASYNC_THRESHOLD=1):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.duplicate()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(Task.objects.filter(task_list__project_id=response.data['id']).count(), 3)
+
+    def test_templates(self):
+        """Templates are listed separately from regular projects"""
+        response = self.duplicate(name='Sprint template', as_template=True)
+        template_id = response.data['id']
+
+        listed = [p['id'] for p in self.client.get('/api/projects/').data['results']]
+        self.assertNotIn(template_id, listed)
+        templates = self.client.get('/api/projects/templates/').data['results']
+        self.assertEqual([p['id'] for p in templates], [template_id])
+
+        response = self.client.post(f'/api/projects/{template_id}/duplicate/', {}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(response.data['is_template'])
+
+
+class ProjectDeleteTest(TestCase):
+    """Deleting a project hides it and purges its data in the background"""
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+        from apps.tasks.models import TaskList, Task, TaskComment
+
+        self.owner = User.objects.create_user(email='owner@example.com', password='testpass123')
+        self.project = Project.objects.create(name='Big board', owner=self.owner)
+        task_list = TaskList.objects.create(name='To do', project=self.project, position=0)
+        for position in range(5):
+            task = Task.objects.create(
+                title=f'Task {position}', task_list=task_list,
+                creator=self.owner, position=position
+            )
+            task.assignees.add(self.owner)
+            TaskComment.objects.create(task=task, author=self.owner, content='Note')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_delete_purges_in_chunks(self):
+        """The project disappears at once and its children are purged"""
+        from django.test import override_settings
+        from apps.tasks.models import TaskList, Task, TaskComment
+
+        with override_settings(PURGE_CHUNK_SIZE=2):
+            with self.captureOnCommitCallbacks() as callbacks:
+                response = self.client.delete(f'/api/projects/{self.project.id}/')
+            self.assertEqual(response.status_code, 204)
+            self.assertFalse(Project.objects.filter(id=self.project.id).exists())
+            self.assertEqual(self.client.get(f'/api/projects/{self.project.id}/').status_code, 404)
+            self.assertTrue(Project.all_objects.filter(id=self.project.id).exists())
+
+            for callback in callbacks:
+                callback()
+
+        self.assertFalse(Project.all_objects.filter(id=self.project.id).exists())
+        self.assertEqual(TaskList.all_objects.count(), 0)
+        self.assertEqual(Task.objects.count(), 0)
+        self.assertEqual(TaskComment.objects.count(), 0)
+        self.assertEqual(Task.assignees.through.objects.count(), 0)
+
+
+class ProjectListQueriesTest(TestCase):
+    """Project listings annotate member counts and roles"""
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        self.user = User.objects.create_user(email='user@example.com', password='testpass123')
+        self.other = User.objects.create_user(email='other@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_projects(self, count):
+        for i in range(count):
+            owned = Project.objects.create(name=f'Mine {i}', owner=self.user)
+            ProjectMembership.objects.create(project=owned, user=self.other)
+            shared = Project.objects.create(name=f'Shared {i}', owner=self.other)
+            ProjectMembership.objects.create(
+                project=shared, user=self.user, role=ProjectMembership.VIEWER
+            )
+
+    def count_queries(self, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_constant_number_of_queries(self):
+        self.create_projects(2)
+        expected = [self.count_queries(url)[0] for url in (
+            '/api/projects/', '/api/projects/my_projects/', '/api/projects/shared_with_me/'
+        )]
+        self.create_projects(8)
+        for url, count in zip((
+            '/api/projects/', '/api/projects/my_projects/', '/api/projects/shared_with_me/'
+        ), expected):
+            self.assertEqual(self.count_queries(url)[0], count, url)
+
+    def test_counts_roles_and_pagination(self):
+        self.create_projects(12)
+        _, response = self.count_queries('/api/projects/my_projects/')
+        self.assertEqual(response.data['count'], 12)
+        self.assertEqual(len(response.data['results']), 12)
+        self.assertEqual(response.data['results'][0]['members_count'], 2)
+        self.assertEqual(response.data['results'][0]['user_role'], 'owner')
+
+        _, response = self.count_queries('/api/projects/shared_with_me/')
+        self.assertEqual(response.data['count'], 12)
+        self.assertEqual(response.data['results'][0]['user_role'], 'viewer')
+
+        _, response = self.count_queries('/api/projects/')
+        self.assertEqual(response.data['count'], 24)
+        self.assertEqual(len(response.data['results']), 20)
+
+
+class ProjectCacheTest(TestCase):
+    """Project and board reads are cached per project version"""
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+        from trello_backend import metrics
+
+        self.owner = User.objects.create_user(email='owner@example.com', password='testpass123')
+        self.viewer = User.objects.create_user(email='viewer@example.com', password='testpass123')
+        self.project = Project.objects.create(name='Board', owner=self.owner)
+        ProjectMembership.objects.create(
+            project=self.project, user=self.viewer, role=ProjectMembership.VIEWER
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        metrics.reset()
+
+    def test_detail_is_cached_per_role(self):
+        from trello_backend import metrics
+
+        url = f'/api/projects/{self.project.id}/'
+        self.assertEqual(self.client.get(url).data['user_role'], 'owner')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url).data['user_role'], 'owner')
+        self.assertEqual(metrics.snapshot()['cache.project.hit_rate'], 0.5)
+
+        self.client.force_authenticate(self.viewer)
+        self.assertEqual(self.client.get(url).data['user_role'], 'viewer')
+
+        # Saving the project invalidates the cached responses
+        self.project.name = 'Renamed'
+        self.project.save()
+        self.assertEqual(self.client.get(url).data['name'], 'Renamed')
+
+    def test_board_is_invalidated_by_task_changes(self):
+        from apps.tasks.models import TaskList, Task
+
+        task_list = TaskList.objects.create(name='To do', project=self.project, position=0)
+        url = f'/api/tasks/task-lists/?project={self.project.id}'
+        self.assertEqual(self.client.get(url).data['results'][0]['tasks'], [])
+
+        Task.objects.create(title='New', task_list=task_list, creator=self.owner, position=0)
+        self.assertEqual(len(self.client.get(url).data['results'][0]['tasks']), 1)
+
+        # Users outside the project never get the cached board
+        outsider = User.objects.create_user(email='out@example.com', password='testpass123')
+        self.client.force_authenticate(outsider)
+        self.assertEqual(self.client.get(url).data['results'], [])
+
+
+class SingleFlightTest(TestCase):
+    """Concurrent cache misses wait for one computation"""
+
+    def test_concurrent_callers_share_one_call(self):
+        import threading
+        from trello_backend.singleflight import SingleFlight
+
+        group = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'board'
+
+        leader = threading.Thread(target=lambda: results.append(group.do('key', compute)))
+        leader.start()
+        started.wait(5)
+        followers = [
+            threading.Thread(target=lambda: results.append(group.do('key', compute)))
+            for _ in range(5)
+        ]
+        for thread in followers:
+            thread.start()
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['board'] * 6)
+
+    def test_waits_for_result_of_other_worker(self):
+        import threading
+        from django.core.cache import cache
+        from trello_backend.singleflight import cached_single_flight
+
+        # Another worker holds the lock and stores the result a bit later
+        cache.add('sf-test:lock', 'other-worker', 30)
+        timer = threading.Timer(0.1, lambda: cache.set('sf-test', 'built elsewhere', 30))
+        timer.start()
+        try:
+            value = cached_single_flight(cache, 'sf-test', lambda: 'built here', 30)
+        finally:
+            timer.join()
+            cache.delete_many(['sf-test', 'sf-test:lock'])
+        self.assertEqual(value, 'built elsewhere')
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTest(TransactionTestCase):
+    """Safe viewset reads go to the replica, writes and fresh writers to the primary"""
+
+    # Committed rows are visible through the mirrored replica connection
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        from django.core.cache import cache
+        from rest_framework.test import APIClient
+
+        cache.clear()
+        self.user = User.objects.create_user(email='user@example.com', password='testpass123')
+        self.project = Project.objects.create(name='Board', owner=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, method, url, **kwargs):
+        from django.db import connections
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            getattr(self.client, method)(url, **kwargs)
+        return len(primary), len(replica)
+
+    def test_reads_use_replica(self):
+        primary, replica = self.count_queries('get', '/api/projects/')
+        self.assertGreater(replica, 0)
+        self.assertEqual(primary, 0)
+
+        # Strong consistency requested by the client
+        primary, replica = self.count_queries(
+            'get', '/api/projects/', HTTP_X_READ_CONSISTENCY='strong'
+        )
+        self.assertEqual(replica, 0)
+
+    def test_writer_sticks_to_primary(self):
+        self.client.patch(f'/api/projects/{self.project.id}/', {'name': 'Renamed'}, format='json')
+        primary, replica = self.count_queries('get', '/api/projects/')
+        self.assertEqual(replica, 0)
+        self.assertGreater(primary, 0)
+
+
+@override_settings(DATABASE_SHARDS=['default', 'shard_1'])
+class ShardingTest(TestCase):
+    """Projects are placed on shards by id and reached through the directory"""
+
+    databases = {'default', 'shard_1'}
+
+    def setUp(self):
+        from django.core.cache import cache
+        from rest_framework.test import APIClient
+
+        cache.clear()
+        self.owner = User.objects.create_user(email='owner@example.com', password='testpass123')
+        self.member = User.objects.create_user(email='member@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def create_projects(self):
+        """Create projects until both shards hold at least one"""
+        from trello_backend.sharding import hash_shard
+
+        projects = {}
+        for index in range(40):
+            response = self.client.post('/api/projects/', {'name': f'Board {index}'}, format='json')
+            self.assertEqual(response.status_code, 201)
+            project_id = response.data['id']
+            projects.setdefault(hash_shard(project_id), []).append(project_id)
+            if len(projects) == 2:
+                return projects
+        self.fail('All projects were placed on the same shard')
+
+    def test_projects_live_on_their_shard(self):
+        from .models import ShardDirectory
+
+        projects = self.create_projects()
+        for shard, other in [('default', 'shard_1'), ('shard_1', 'default')]:
+            for project_id in projects[shard]:
+                self.assertTrue(Project.objects.using(shard).filter(id=project_id).exists())
+                self.assertFalse(Project.objects.using(other).filter(id=project_id).exists())
+                self.assertEqual(ShardDirectory.objects.get(project_id=project_id).shard, shard)
+        # Users are copied to every shard
+        self.assertTrue(User.objects.using('shard_1').filter(id=self.member.id).exists())
+
+        # Listings fan out to both shards
+        total = sum(len(ids) for ids in projects.values())
+        self.assertEqual(self.client.get('/api/projects/').data['count'], total)
+        self.assertEqual(self.client.get('/api/projects/my_projects/').data['count'], total)
+
+        # Templates are fanned out too
+        template_id = projects['shard_1'][-1]
+        Project.objects.using('shard_1').filter(id=template_id).update(is_template=True)
+        templates = self.client.get('/api/projects/templates/').data['results']
+        self.assertEqual([p['id'] for p in templates], [template_id])
+        self.assertEqual(self.client.get('/api/projects/').data['count'], total - 1)
+
+        project_id = projects['shard_1'][0]
+        response = self.client.post(
+            f'/api/projects/{project_id}/add_member/',
+            {'email': self.member.email, 'role': 'editor'},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.client.force_authenticate(self.member)
+        shared = self.client.get('/api/projects/shared_with_me/').data
+        self.assertEqual([p['id'] for p in shared['results']], [project_id])
+        self.assertEqual(self.client.get(f'/api/projects/{project_id}/').status_code, 200)
+
+    def test_async_reads_reach_every_shard(self):
+        from django.test import Client
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        from apps.tasks.models import Task, TaskList
+
+        projects = self.create_projects()
+        project_id = projects['shard_1'][0]
+        response = self.client.post(
+            '/api/tasks/task-lists/', {'project': project_id, 'name': 'Todo'}, format='json'
+        )
+        list_id = str(TaskList.objects.using('shard_1').get(project_id=project_id).id)
+        self.client.post(
+            '/api/tasks/tasks/', {'task_list': list_id, 'title': 'Task'}, format='json'
+        )
+        task_id = str(Task.objects.using('shard_1').get(task_list_id=list_id).id)
+        self.client.post(
+            '/api/tasks/task-comments/', {'task': task_id, 'content': 'Hi'}, format='json'
+        )
+
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.owner)}')
+        total = sum(len(ids) for ids in projects.values())
+        self.assertEqual(client.get('/api/async/projects/').json()['count'], total)
+        board = client.get(f'/api/async/tasks/board/{project_id}/').json()
+        self.assertEqual([task['id'] for task in board[0]['tasks']], [task_id])
+        tasks = client.get('/api/async/tasks/tasks/', {'task_list': list_id}).json()
+        self.assertEqual([task['id'] for task in tasks['results']], [task_id])
+        comments = client.get('/api/async/tasks/task-comments/', {'task': task_id}).json()
+        self.assertEqual(comments['count'], 1)
+
+    def test_board_follows_project_when_moved(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        from apps.tasks.models import Task, TaskList
+        from .models import ShardDirectory
+
+        project_id = self.create_projects()['shard_1'][0]
+        response = self.client.post(
+            '/api/tasks/task-lists/', {'project': project_id, 'name': 'Todo'}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        list_id = TaskList.objects.using('shard_1').get(project_id=project_id).id
+        response = self.client.post(
+            '/api/tasks/tasks/', {'task_list': list_id, 'title': 'Task'}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        task = Task.objects.using('shard_1').get(task_list_id=list_id)
+        self.assertFalse(TaskList.all_objects.using('default').filter(id=list_id).exists())
+
+        call_command('move_project_shard', project_id, 'default', stdout=StringIO())
+
+        self.assertEqual(ShardDirectory.objects.get(project_id=project_id).shard, 'default')
+        self.assertFalse(Project.all_objects.using('shard_1').filter(id=project_id).exists())
+        self.assertFalse(Task.all_objects.using('shard_1').filter(id=task.id).exists())
+        moved = Task.objects.using('default').get(id=task.id)
+        self.assertEqual(moved.created_at, task.created_at)
+
+        self.assertEqual(self.client.get(f'/api/projects/{project_id}/').status_code, 200)
+        self.assertEqual(self.client.get(f'/api/tasks/tasks/{task.id}/').status_code, 200)
+        response = self.client.get('/api/tasks/task-lists/', {'project': project_id})
+        self.assertEqual(len(response.data['results']), 1)
+
+
+class ConnectionPoolTest(TestCase):
+    """The pool health check counts connections that fail the ping"""
+
+    class FakeConnection:
+        closed = False
+
+        def __init__(self, alive):
+            self.alive = alive
+            self.autocommit = False
+
+        def execute(self, sql):
+            if not self.alive:
+                self.closed = True
+                raise OSError('server closed the connection')
+
+    def test_failed_check_is_counted(self):
+        from trello_backend import metrics
+        from trello_backend.db import check_connection
+
+        metrics.reset()
+        conn = self.FakeConnection(alive=True)
+        check_connection(conn)
+        self.assertFalse(conn.autocommit)
+
+        with self.assertRaises(OSError):
+            check_connection(self.FakeConnection(alive=False))
+        self.assertEqual(metrics.get('db.pool.failed_checks'), 1)
@@ -27,3 +27,5 @@ urlpatterns = [
 # GET /api/projects/{id}/members/ - Get all project members
 # GET /api/projects/my_projects/ - Get projects owned by user
 # GET /api/projects/shared_with_me/ - Get projects where user is member
+# GET /api/projects/templates/ - Get board templates the user can view
+# POST /api/projects/{id}/duplicate/ - Copy a project or template into a new board
@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 
 from rest_framework import exceptions, status, viewsets
 from rest_framework.decorators import action
@@ -7,11 +8,22 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
 
+from trello_backend import sharding
+from trello_backend.ids import uuid7
+from trello_backend.mixins import (
+    IdempotencyMixin,
+    ReplicaReadMixin,
+    ShardRoutingMixin,
+    VersionCheckMixin,
+)
+
+from .cache import get_or_build, project_cache_key
 from .models import Project, ProjectMembership
 from .serializers import (
     AddMemberSerializer,
     ProjectCreateSerializer,
     ProjectDetailSerializer,
+    ProjectDuplicateSerializer,
     ProjectListSerializer,
     ProjectMemberSerializer,
     ProjectUpdateSerializer,
@@ -21,12 +33,21 @@ from .serializers import (
 User = get_user_model()
 
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(
+    IdempotencyMixin,
+    VersionCheckMixin,
+    ShardRoutingMixin,
+    ReplicaReadMixin,
+    viewsets.ModelViewSet,
+):
     """
     ViewSet for managing projects with full CRUD operations and member management
     """
 
     permission_classes = [IsAuthenticated]
+    shard_lookups = (("pk", Project),)
+    throttle_scopes = {"duplicate": "bulk"}
+    idempotent_actions = ("duplicate",)
 
     def get_serializer_class(self):
         """Return appropriate serializer based on action"""
@@ -40,14 +61,31 @@ class ProjectViewSet(viewsets.ModelViewSet):
             return AddMemberSerializer
         elif self.action == "update_member_role":
             return UpdateMemberRoleSerializer
+        elif self.action == "duplicate":
+            return ProjectDuplicateSerializer
+        elif self.action == "templates":
+            return ProjectListSerializer
         return ProjectDetailSerializer
 
     def get_queryset(self):
         """Return projects that the user can view"""
         user = self.request.user
-        return Project.objects.filter(
-            Q(owner=user) | Q(projectmembership__user=user)
-        ).distinct()
+        queryset = (
+            Project.objects.visible_to(user)
+            .with_member_stats(user)
+            .select_related("owner")
+        )
+        # Templates are listed separately from regular boards
+        if self.action == "list":
+            queryset = queryset.filter(is_template=False)
+        elif self.action == "templates":
+            queryset = queryset.filter(is_template=True)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        if not sharding.is_enabled():
+            return super().list(request, *args, **kwargs)
+        return self.paginated_list(self.fan_out(self.get_queryset))
 
     def get_object(self):
         """Get project and check permissions"""
@@ -60,9 +98,31 @@ class ProjectViewSet(viewsets.ModelViewSet):
 
         return obj
 
+    def retrieve(self, request, *args, **kwargs):
+        """Get a project; the response is cached per project version and role"""
+        project = self.get_object()
+
+        def build():
+            prefetch_related_objects(
+                [project],
+                Prefetch(
+                    "projectmembership_set",
+                    queryset=ProjectMembership.objects.select_related(
+                        "user", "invited_by"
+                    ),
+                ),
+            )
+            return self.get_serializer(project).data
+
+        key = project_cache_key(project.id, "detail", project.user_role)
+        return Response(get_or_build(key, build))
+
     def perform_create(self, serializer):
         """Set the owner to current user when creating a project"""
-        serializer.save(owner=self.request.user)
+        project_id = uuid7()
+        # The id decides the shard, so it is chosen before the insert
+        with sharding.use_shard(sharding.shard_for_project(project_id)):
+            serializer.save(owner=self.request.user, id=project_id)
 
     def update(self, request, *args, **kwargs):
         """Update project with permission check"""
@@ -85,29 +145,119 @@ class ProjectViewSet(viewsets.ModelViewSet):
 
             raise PermissionDenied("Only project owner can delete the project.")
 
-        return super().destroy(request, *args, **kwargs)
+        from apps.tasks.tasks import purge_project
+
+        # Hide the project now and let a worker delete its data in chunks
+        using = project._state.db
+        with transaction.atomic(using=using):
+            project.mark_deleted()
+            transaction.on_commit(
+                lambda: purge_project.delay(str(project.id)), using=using
+            )
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=["post"])
+    def duplicate(self, request, pk=None):
+        """Copy the board into a new project owned by the current user"""
+        from apps.tasks.duplication import (
+            copy_board,
+            count_board_tasks,
+            create_project_copy,
+            get_async_threshold,
+        )
+        from apps.tasks.tasks import duplicate_board
+
+        source = self.get_object()
+        serializer = ProjectDuplicateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        options = serializer.validated_data
+
+        run_async = count_board_tasks(source) > get_async_threshold()
+        using = source._state.db
+        with transaction.atomic(using=using):
+            project = create_project_copy(
+                source,
+                request.user,
+                name=options.get("name"),
+                as_template=options["as_template"],
+            )
+            if run_async:
+                # Large boards are copied by a worker once the project exists
+                transaction.on_commit(
+                    lambda: duplicate_board.delay(
+                        str(source.id),
+                        str(project.id),
+                        include_assignees=options["include_assignees"],
+                        include_comments=options["include_comments"],
+                    ),
+                    using=using,
+                )
+            else:
+                copy_board(
+                    source.id,
+                    project.id,
+                    include_assignees=options["include_assignees"],
+                    include_comments=options["include_comments"],
+                )
+
+        data = ProjectDetailSerializer(project, context={"request": request}).data
+        if run_async:
+            return Response(data, status=status.HTTP_202_ACCEPTED)
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=["get"])
+    def templates(self, request):
+        """Get board templates the user can duplicate"""
+        return self.paginated_list(self.fan_out(self.get_queryset))
 
     @action(detail=False, methods=["get"])
     def my_projects(self, request):
         """Get projects owned by the current user"""
-        projects = Project.objects.filter(owner=request.user).select_related("owner")
-        serializer = ProjectListSerializer(
-            projects, many=True, context={"request": request}
-        )
-        return Response(serializer.data)
+
+        def build():
+            return (
+                Project.objects.filter(owner=request.user)
+                .with_member_stats(request.user)
+                .select_related("owner")
+            )
+
+        return self.paginated_list(self.fan_out(build))
 
     @action(detail=False, methods=["get"])
     def shared_with_me(self, request):
         """Get projects where user is a member (not owner)"""
-        projects = (
-            Project.objects.filter(members=request.user)
-            .exclude(owner=request.user)
-            .select_related("owner")
+
+        def build():
+            return (
+                Project.objects.filter(
+                    id__in=ProjectMembership.objects.filter(user=request.user).values(
+                        "project_id"
+                    )
+                )
+                .exclude(owner=request.user)
+                .with_member_stats(request.user)
+                .select_related("owner")
+            )
+
+        return self.paginated_list(self.fan_out(build))
+
+    def fan_out(self, build_queryset):
+        """Run a project listing on every shard holding projects of the user"""
+        if not sharding.is_enabled():
+            return build_queryset()
+        projects = sharding.projects_for_user(self.request.user, build_queryset)
+        return sorted(
+            projects, key=lambda p: (p.updated_at, p.created_at), reverse=True
         )
+
+    def paginated_list(self, projects):
+        """Serialize a page of projects with ProjectListSerializer"""
+        page = self.paginate_queryset(projects)
         serializer = ProjectListSerializer(
-            projects, many=True, context={"request": request}
+            page, many=True, context=self.get_serializer_context()
         )
-        return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=["post"])
     def add_member(self, request, pk=None):
@@ -206,8 +356,12 @@ class ProjectViewSet(viewsets.ModelViewSet):
     def members(self, request, pk=None):
         """Get all members of the project"""
         project = self.get_object()
-        memberships = project.projectmembership_set.select_related(
-            "user", "invited_by"
-        ).all()
-        serializer = ProjectMemberSerializer(memberships, many=True)
-        return Response(serializer.data)
+
+        def build():
+            memberships = project.projectmembership_set.select_related(
+                "user", "invited_by"
+            ).all()
+            return ProjectMemberSerializer(memberships, many=True).data
+
+        key = project_cache_key(project.id, "members")
+        return Response(get_or_build(key, build))
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import TaskList, Task, TaskComment
+from .models import TaskList, Task, TaskComment, ArchivedTask
 
 
 @admin.register(TaskList)
@@ -50,3 +50,11 @@ class TaskCommentAdmin(admin.ModelAdmin):
     def content_preview(self, obj):
         return obj.content[:50] + '...' if len(obj.content) > 50 else obj.content
     content_preview.short_description = 'Content Preview'
+
+
+@admin.register(ArchivedTask)
+class ArchivedTaskAdmin(admin.ModelAdmin):
+    list_display = ['title', 'task_list', 'creator', 'archived_at', 'moved_at']
+    list_filter = ['archived_at', 'task_list__project']
+    search_fields = ['title', 'description', 'task_list__name']
+    readonly_fields = ['moved_at']
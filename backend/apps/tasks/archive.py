@@ -0,0 +1,181 @@
+"""
+Cold storage for tasks that have been archived for a long time.
+
+``move_archived_tasks`` copies old archived tasks, with their assignees and
+comments, into the ``ArchivedTask`` table and removes them from the task table
+so the indexes used by live board queries only cover live rows.
+``restore_archived_task`` puts a task back on its board.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import router, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ArchivedTask, Task, TaskComment
+from .ordering import lock_task_lists, schedule_task_list_compaction
+from .purge import delete_tasks_by_id
+
+User = get_user_model()
+
+DEFAULT_COLD_AFTER_DAYS = 30
+DEFAULT_BATCH_SIZE = 500
+
+TASK_FIELDS = [
+    "id",
+    "task_list_id",
+    "title",
+    "description",
+    "position",
+    "priority",
+    "label_color",
+    "creator_id",
+    "due_date",
+    "is_completed",
+    "completed_at",
+    "created_at",
+    "updated_at",
+    "archived_at",
+]
+COMMENT_FIELDS = ["id", "author_id", "content", "is_edited", "created_at", "updated_at"]
+
+
+def get_cold_storage_cutoff():
+    """Tasks archived before this moment belong in cold storage"""
+    days = getattr(settings, "ARCHIVE_COLD_AFTER_DAYS", DEFAULT_COLD_AFTER_DAYS)
+    return timezone.now() - timedelta(days=days)
+
+
+def move_archived_tasks(cutoff=None, batch_size=None):
+    """
+    Move tasks archived before ``cutoff`` to cold storage.
+
+    Works in batches, each in its own transaction. Returns the number of tasks
+    moved.
+    """
+    cutoff = cutoff or get_cold_storage_cutoff()
+    batch_size = batch_size or getattr(
+        settings, "ARCHIVE_MOVE_BATCH_SIZE", DEFAULT_BATCH_SIZE
+    )
+    moved = 0
+    while True:
+        with transaction.atomic(using=router.db_for_write(Task)):
+            rows = list(
+                Task.objects.select_for_update(skip_locked=True)
+                .filter(is_archived=True, archived_at__lt=cutoff)
+                .order_by("archived_at")
+                .values(*TASK_FIELDS)[:batch_size]
+            )
+            if rows:
+                _move_batch(rows)
+        moved += len(rows)
+        if len(rows) < batch_size:
+            return moved
+
+
+def _move_batch(rows):
+    task_ids = [row["id"] for row in rows]
+
+    assignees = defaultdict(list)
+    for task_id, user_id in Task.assignees.through.objects.filter(
+        task_id__in=task_ids
+    ).values_list("task_id", "user_id"):
+        assignees[task_id].append(user_id)
+
+    comments = defaultdict(list)
+    for comment in (
+        TaskComment.objects.filter(task_id__in=task_ids)
+        .order_by("created_at")
+        .values("task_id", *COMMENT_FIELDS)
+    ):
+        comments[comment.pop("task_id")].append(comment)
+
+    ArchivedTask.objects.bulk_create(
+        ArchivedTask(
+            **row,
+            assignee_ids=assignees[row["id"]],
+            comments=comments[row["id"]],
+        )
+        for row in rows
+    )
+    delete_tasks_by_id(task_ids)
+
+    using = router.db_for_write(Task)
+    for task_list_id in {row["task_list_id"] for row in rows}:
+        schedule_task_list_compaction(using, task_list_id)
+
+
+def restore_archived_task(archived):
+    """Put a task from cold storage back at the end of its list"""
+    using = archived._state.db
+    with transaction.atomic(using=using):
+        lock_task_lists(using, archived.task_list_id)
+        last_position = (
+            Task.objects.using(using)
+            .filter(task_list_id=archived.task_list_id)
+            .aggregate(max_pos=Max("position"))["max_pos"]
+        )
+        task = Task(
+            id=archived.id,
+            task_list_id=archived.task_list_id,
+            title=archived.title,
+            description=archived.description,
+            position=0 if last_position is None else last_position + 1,
+            priority=archived.priority,
+            label_color=archived.label_color,
+            creator_id=archived.creator_id,
+            due_date=archived.due_date,
+            is_completed=archived.is_completed,
+            completed_at=archived.completed_at,
+        )
+        task.save(using=using, force_insert=True)
+        # auto_now_add overwrote the original creation date
+        task.created_at = archived.created_at
+        Task.objects.using(using).filter(pk=task.pk).update(created_at=task.created_at)
+
+        # Users may have been deleted while the task was in cold storage
+        user_ids = {str(user_id) for user_id in archived.assignee_ids}
+        user_ids |= {str(comment["author_id"]) for comment in archived.comments}
+        existing = {
+            str(user_id)
+            for user_id in User.objects.filter(id__in=user_ids).values_list(
+                "id", flat=True
+            )
+        }
+
+        Task.assignees.through.objects.using(using).bulk_create(
+            Task.assignees.through(task_id=task.id, user_id=user_id)
+            for user_id in archived.assignee_ids
+            if str(user_id) in existing
+        )
+
+        kept_comments = [
+            comment
+            for comment in archived.comments
+            if str(comment["author_id"]) in existing
+        ]
+        comments = [
+            TaskComment(
+                id=data["id"],
+                task_id=task.id,
+                author_id=data["author_id"],
+                content=data["content"],
+                is_edited=data["is_edited"],
+            )
+            for data in kept_comments
+        ]
+        TaskComment.objects.using(using).bulk_create(comments)
+        for comment, data in zip(comments, kept_comments):
+            comment.created_at = parse_datetime(data["created_at"])
+            comment.updated_at = parse_datetime(data["updated_at"])
+        TaskComment.objects.using(using).bulk_update(
+            comments, ["created_at", "updated_at"]
+        )
+
+        archived.delete()
+    return task
@@ -0,0 +1,11 @@
+from django.urls import path
+
+from . import async_views
+
+app_name = "tasks_async"
+
+urlpatterns = [
+    path("board/<uuid:project_id>/", async_views.board, name="board"),
+    path("tasks/", async_views.task_list, name="task-list"),
+    path("task-comments/", async_views.comment_list, name="comment-list"),
+]
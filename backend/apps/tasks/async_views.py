@@ -0,0 +1,153 @@
+"""
+Async versions of the hottest board reads: the board itself, tasks and
+comments.
+
+Rows are loaded with the async ORM, with every relation the serializers need
+selected or prefetched up front, so serializing runs without further queries.
+Queries run on the shard of the project, list or task the request names.
+"""
+
+import uuid
+from collections import defaultdict
+
+from django.core.exceptions import BadRequest
+from django.db.models import Count, Q
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_GET
+
+from apps.authentication.async_auth import async_jwt_required
+from apps.projects.models import Project
+from trello_backend import sharding
+from trello_backend.pagination import apaginate
+
+from .models import Task, TaskComment, TaskList
+from .serializers import TaskCommentSerializer, TaskListSerializer, TaskSerializer
+
+BOARD_CHUNK_SIZE = 500
+
+
+def uuid_param(request, name):
+    """The query parameter ``name`` as a UUID, or None when it is missing"""
+    value = request.GET.get(name)
+    if not value:
+        return None
+    try:
+        return uuid.UUID(value)
+    except ValueError:
+        raise BadRequest(f"{name} must be a valid UUID.")
+
+
+async def shard_of(model, pk):
+    """
+    Shard of the ``model`` row ``pk``, like ``ShardRoutingMixin``; None, the
+    default database, without a row to look up
+    """
+    return None if pk is None else await sharding.alocate(model, pk)
+
+
+def visible_projects(user):
+    return Project.objects.visible_to(user)
+
+
+def task_queryset():
+    return (
+        Task.objects.filter(task_list__deleted_at__isnull=True)
+        .select_related("task_list__project", "creator")
+        .prefetch_related("assignees")
+    )
+
+
+@require_GET
+@async_jwt_required
+async def board(request, project_id):
+    """
+    The lists of a project with their unarchived tasks, in the shape of
+    ``GET /api/tasks/task-lists/?project=<id>`` results
+    """
+    with sharding.use_shard(await sharding.alocate(Project, project_id)):
+        if not await visible_projects(request.user).filter(id=project_id).aexists():
+            raise Http404("Project not found.")
+
+        lists = (
+            TaskList.objects.filter(project_id=project_id)
+            .select_related("project")
+            .annotate(
+                tasks_count=Count(
+                    "tasks",
+                    filter=Q(tasks__is_archived=False, tasks__deleted_at__isnull=True),
+                )
+            )
+            .order_by("position", "created_at")
+        )
+        task_lists = [task_list async for task_list in lists]
+
+        tasks = defaultdict(list)
+        async for task in (
+            task_queryset()
+            .filter(task_list__project_id=project_id, is_archived=False)
+            .order_by("position", "created_at")
+            .aiterator(chunk_size=BOARD_CHUNK_SIZE)
+        ):
+            tasks[task.task_list_id].append(task)
+
+        context = {"request": request}
+        data = []
+        for task_list in task_lists:
+            item = TaskListSerializer(task_list, context=context).data
+            item["tasks"] = TaskSerializer(
+                tasks[task_list.id], many=True, context=context
+            ).data
+            data.append(item)
+        return JsonResponse(data, safe=False)
+
+
+@require_GET
+@async_jwt_required
+async def task_list(request):
+    """Async ``GET /api/tasks/tasks/``, optionally filtered by ``task_list``"""
+    list_id = uuid_param(request, "task_list")
+    with sharding.use_shard(await shard_of(TaskList, list_id)):
+        tasks = task_queryset().filter(
+            task_list__project__in=visible_projects(request.user)
+        )
+        if list_id is not None:
+            if not await TaskList.objects.filter(
+                id=list_id, project__in=visible_projects(request.user)
+            ).aexists():
+                raise Http404("Task list not found.")
+            tasks = tasks.filter(task_list_id=list_id)
+        tasks = tasks.order_by("position", "created_at")
+
+        data = await apaginate(
+            request,
+            tasks,
+            lambda page: TaskSerializer(
+                page, many=True, context={"request": request}
+            ).data,
+        )
+    return JsonResponse(data)
+
+
+@require_GET
+@async_jwt_required
+async def comment_list(request):
+    """Async ``GET /api/tasks/task-comments/``, optionally filtered by ``task``"""
+    task_id = uuid_param(request, "task")
+    with sharding.use_shard(await shard_of(Task, task_id)):
+        comments = TaskComment.objects.select_related("author").filter(
+            task__deleted_at__isnull=True,
+            task__task_list__deleted_at__isnull=True,
+            task__task_list__project__in=visible_projects(request.user),
+        )
+        if task_id is not None:
+            comments = comments.filter(task_id=task_id)
+        comments = comments.order_by("created_at")
+
+        data = await apaginate(
+            request,
+            comments,
+            lambda page: TaskCommentSerializer(
+                page, many=True, context={"request": request}
+            ).data,
+        )
+    return JsonResponse(data)
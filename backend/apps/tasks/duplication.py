@@ -0,0 +1,166 @@
+"""
+Board duplication: copies the lists, tasks and optionally the assignees and
+comments of a project into another project.
+
+Every table is read once and written with a single ``bulk_create`` so the
+number of queries does not depend on the size of the board.
+"""
+
+from django.conf import settings
+from django.db import transaction
+
+from apps.projects.cache import bump_project_version
+from apps.projects.models import Project, ProjectMembership, ShardDirectory
+from trello_backend.ids import uuid7
+
+from .models import Task, TaskComment, TaskList
+
+DEFAULT_ASYNC_THRESHOLD = 2000
+
+
+def get_async_threshold():
+    """Number of tasks above which a board is copied in the background"""
+    return getattr(
+        settings, "PROJECT_DUPLICATE_ASYNC_THRESHOLD", DEFAULT_ASYNC_THRESHOLD
+    )
+
+
+def count_board_tasks(project):
+    """Count the tasks that a copy of ``project`` would have to create"""
+    return Task.objects.filter(
+        task_list__project=project, task_list__deleted_at__isnull=True
+    ).count()
+
+
+def create_project_copy(source, owner, name=None, as_template=False):
+    """Create the empty project that will receive a copy of ``source``"""
+    return Project.objects.create(
+        name=name or f"{source.name} (copy)"[:100],
+        description=source.description,
+        owner=owner,
+        background_color=source.background_color,
+        background_image=source.background_image,
+        is_private=source.is_private,
+        is_template=as_template,
+    )
+
+
+def copy_board(source_id, target_id, include_assignees=False, include_comments=False):
+    """
+    Copy the lists and tasks of project ``source_id`` into ``target_id``.
+
+    Assignees are copied together with the memberships of the source project;
+    assignments to users who are not part of the copy are dropped. Comments keep
+    their original author.
+    """
+    target = Project.objects.get(id=target_id)
+
+    with transaction.atomic(using=target._state.db):
+        list_ids = {}
+        new_lists = []
+        for row in TaskList.objects.filter(project_id=source_id).values(
+            "id", "name", "position", "is_archived"
+        ):
+            list_ids[row["id"]] = uuid7()
+            new_lists.append(
+                TaskList(
+                    id=list_ids[row["id"]],
+                    project_id=target_id,
+                    name=row["name"],
+                    position=row["position"],
+                    is_archived=row["is_archived"],
+                )
+            )
+        TaskList.objects.bulk_create(new_lists)
+
+        task_ids = {}
+        new_tasks = []
+        for row in Task.objects.filter(
+            task_list__project_id=source_id, task_list__deleted_at__isnull=True
+        ).values(
+            "id",
+            "task_list_id",
+            "title",
+            "description",
+            "position",
+            "priority",
+            "label_color",
+            "creator_id",
+            "due_date",
+            "is_completed",
+            "is_archived",
+            "completed_at",
+        ):
+            task_ids[row["id"]] = uuid7()
+            new_tasks.append(
+                Task(
+                    id=task_ids[row["id"]],
+                    task_list_id=list_ids[row["task_list_id"]],
+                    title=row["title"],
+                    description=row["description"],
+                    position=row["position"],
+                    priority=row["priority"],
+                    label_color=row["label_color"],
+                    creator_id=row["creator_id"],
+                    due_date=row["due_date"],
+                    is_completed=row["is_completed"],
+                    is_archived=row["is_archived"],
+                    completed_at=row["completed_at"],
+                )
+            )
+        Task.objects.bulk_create(new_tasks)
+
+        if include_assignees:
+            _copy_assignees(source_id, target, task_ids)
+
+        if include_comments:
+            TaskComment.objects.bulk_create(
+                TaskComment(
+                    task_id=task_ids[row["task_id"]],
+                    author_id=row["author_id"],
+                    content=row["content"],
+                    is_edited=row["is_edited"],
+                )
+                for row in TaskComment.objects.filter(
+                    task__task_list__project_id=source_id,
+                    task__task_list__deleted_at__isnull=True,
+                    task__deleted_at__isnull=True,
+                ).values("task_id", "author_id", "content", "is_edited")
+            )
+
+    # Rows were bulk created without signals; drop reads cached meanwhile
+    bump_project_version(target_id)
+
+
+def _copy_assignees(source_id, target, task_ids):
+    """Copy memberships and the assignee rows of the copied tasks"""
+    memberships = [
+        ProjectMembership(project=target, user_id=user_id, role=role)
+        for user_id, role in ProjectMembership.objects.filter(
+            project_id=source_id
+        ).values_list("user_id", "role")
+        if user_id != target.owner_id
+    ]
+    ProjectMembership.objects.bulk_create(memberships)
+    # bulk_create skips the signals that fill the shard directory
+    ShardDirectory.objects.bulk_create(
+        [
+            ShardDirectory(
+                user_id=m.user_id, project_id=target.id, shard=target._state.db
+            )
+            for m in memberships
+        ],
+        ignore_conflicts=True,
+    )
+
+    allowed_users = {target.owner_id} | {m.user_id for m in memberships}
+    Assignee = Task.assignees.through
+    Assignee.objects.bulk_create(
+        Assignee(task_id=task_ids[task_id], user_id=user_id)
+        for task_id, user_id in Assignee.objects.filter(
+            task__task_list__project_id=source_id,
+            task__task_list__deleted_at__isnull=True,
+            task__deleted_at__isnull=True,
+        ).values_list("task_id", "user_id")
+        if user_id in allowed_users
+    )
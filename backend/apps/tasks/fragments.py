@@ -0,0 +1,135 @@
+"""
+Cache of serialized task cards.
+
+A card is keyed by the task id, its ``updated_at`` and two version tokens that
+change when the task's assignees or comments change, since neither touches
+``updated_at``. Fragments are looked up in a small in-process LRU first and in
+the shared cache with a single ``get_many`` for the rest.
+"""
+
+import threading
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from trello_backend import metrics
+
+DEFAULT_TIMEOUT = 3600
+DEFAULT_LOCAL_SIZE = 10000
+METRIC_PREFIX = "cache.task_fragment"
+
+
+class LRUCache:
+    """Thread-safe mapping that drops the least recently used keys"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._data:
+                    self._data.move_to_end(key)
+                    found[key] = self._data[key]
+        return found
+
+    def set_many(self, mapping):
+        with self._lock:
+            for key, value in mapping.items():
+                self._data[key] = value
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_cache = LRUCache(
+    getattr(settings, "TASK_FRAGMENT_LOCAL_SIZE", DEFAULT_LOCAL_SIZE)
+)
+
+
+def get_cache():
+    return caches[getattr(settings, "TASK_FRAGMENT_CACHE_ALIAS", "default")]
+
+
+def _version_key(task_id, kind):
+    return f"task:{task_id}:{kind}:version"
+
+
+def _bump(task_ids, kind):
+    get_cache().set_many(
+        {_version_key(task_id, kind): uuid.uuid4().hex for task_id in task_ids}, None
+    )
+
+
+def bump_assignees_version(task_ids):
+    _bump(task_ids, "assignees")
+
+
+def bump_comments_version(task_ids):
+    _bump(task_ids, "comments")
+
+
+def get_versions(task_ids):
+    """Return ``{task_id: (assignees_version, comments_version)}``"""
+    keys = {
+        task_id: (_version_key(task_id, "assignees"), _version_key(task_id, "comments"))
+        for task_id in task_ids
+    }
+    cache = get_cache()
+    found = cache.get_many([key for pair in keys.values() for key in pair])
+    # A version that was never set or got evicted gets a fresh random token,
+    # which cannot match a fragment stored under an older one
+    missing = {
+        key: uuid.uuid4().hex
+        for pair in keys.values()
+        for key in pair
+        if key not in found
+    }
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return {
+        task_id: (found[assignees_key], found[comments_key])
+        for task_id, (assignees_key, comments_key) in keys.items()
+    }
+
+
+def fragment_keys(tasks, name):
+    """Map each task's primary key to the key of its ``name`` fragment"""
+    versions = get_versions([task.pk for task in tasks])
+    return {
+        task.pk: "task:{}:{}:{}:{}:{}".format(
+            task.pk, task.updated_at.isoformat(), *versions[task.pk], name
+        )
+        for task in tasks
+    }
+
+
+def get_fragments(keys):
+    """Return the cached fragments among ``keys``"""
+    keys = list(keys)
+    found = local_cache.get_many(keys)
+    remaining = [key for key in keys if key not in found]
+    if remaining:
+        shared = get_cache().get_many(remaining)
+        local_cache.set_many(shared)
+        found.update(shared)
+    metrics.incr(f"{METRIC_PREFIX}.hits", len(found))
+    metrics.incr(f"{METRIC_PREFIX}.misses", len(keys) - len(found))
+    return found
+
+
+def set_fragments(mapping):
+    local_cache.set_many(mapping)
+    get_cache().set_many(
+        mapping, getattr(settings, "TASK_FRAGMENT_TIMEOUT", DEFAULT_TIMEOUT)
+    )
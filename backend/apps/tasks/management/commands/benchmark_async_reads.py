@@ -0,0 +1,115 @@
+"""
+Benchmark the async read endpoints against their sync DRF versions.
+
+Start the server under uvicorn first, for example::
+
+    uvicorn trello_backend.asgi:application --workers 1 --port 8000
+
+then run ``python manage.py benchmark_async_reads --email <user>``. Each
+endpoint pair is hit by ``--concurrency`` clients that keep their connection
+open for ``--slow-ms`` before sending the request, like slow mobile clients.
+"""
+
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.projects.models import Project
+from apps.tasks.models import Task
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Compare sync and async read endpoints under concurrent load"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--email", required=True, help="User to authenticate as")
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--concurrency", type=int, default=100)
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--slow-ms", type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options["email"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}")
+        project = Project.objects.visible_to(user).first()
+        task = Task.objects.filter(task_list__project=project).first()
+        if project is None or task is None:
+            raise CommandError("The user needs a project with at least one task")
+
+        pairs = [
+            ("project list", "/api/projects/", "/api/async/projects/"),
+            (
+                "board",
+                f"/api/tasks/task-lists/?project={project.id}",
+                f"/api/async/tasks/board/{project.id}/",
+            ),
+            (
+                "tasks",
+                f"/api/tasks/tasks/?task_list={task.task_list_id}",
+                f"/api/async/tasks/tasks/?task_list={task.task_list_id}",
+            ),
+            (
+                "comments",
+                f"/api/tasks/task-comments/?task={task.id}",
+                f"/api/async/tasks/task-comments/?task={task.id}",
+            ),
+        ]
+        token = str(AccessToken.for_user(user))
+        for name, sync_path, async_path in pairs:
+            for label, path in (("sync", sync_path), ("async", async_path)):
+                stats = asyncio.run(self.load(path, token, options))
+                self.stdout.write(f"{name:<14}{label:<7}{stats}")
+
+    async def load(self, path, token, options):
+        url = urlsplit(options["base_url"])
+        host, port = url.hostname, url.port or 80
+        request = (
+            f"GET {path} HTTP/1.1\r\nHost: {url.netloc}\r\n"
+            f"Authorization: Bearer {token}\r\nConnection: close\r\n\r\n"
+        ).encode()
+        semaphore = asyncio.Semaphore(options["concurrency"])
+        latencies = []
+        errors = 0
+
+        async def fetch():
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    reader, writer = await asyncio.open_connection(host, port)
+                    if options["slow_ms"]:
+                        await asyncio.sleep(options["slow_ms"] / 1000)
+                    writer.write(request)
+                    await writer.drain()
+                    response = await reader.read()
+                    writer.close()
+                except OSError:
+                    errors += 1
+                    return
+                if not response.startswith(b"HTTP/1.1 200"):
+                    errors += 1
+                    return
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(fetch() for _ in range(options["requests"])))
+        elapsed = time.perf_counter() - started
+        if not latencies:
+            return f"all {errors} requests failed"
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        return (
+            f"{len(latencies) / elapsed:8.1f} req/s  "
+            f"p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+            f"p95 {p95 * 1000:7.1f} ms  errors {errors}"
+        )
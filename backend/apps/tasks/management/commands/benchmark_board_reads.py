@@ -0,0 +1,91 @@
+"""
+Compare concurrent board reads with and without single-flight coalescing.
+
+Every round invalidates the board cache and lets ``--clients`` threads read
+the board at the same moment, like a team opening it when a standup starts.
+"""
+
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Count
+
+from apps.projects.cache import bump_project_version, get_or_build, project_cache_key
+from apps.projects.models import Project
+from apps.tasks.models import TaskList
+from apps.tasks.serializers import TaskListDetailSerializer
+
+
+class Command(BaseCommand):
+    help = "Benchmark concurrent board reads with and without single-flight"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--project", help="Project id to read (defaults to the largest board)"
+        )
+        parser.add_argument("--clients", type=int, default=40)
+        parser.add_argument("--rounds", type=int, default=5)
+
+    def handle(self, *args, **options):
+        if options["project"]:
+            project = Project.objects.get(id=options["project"])
+        else:
+            project = (
+                Project.objects.annotate(task_count=Count("task_lists__tasks"))
+                .order_by("-task_count")
+                .first()
+            )
+        if project is None:
+            self.stderr.write("No project to read")
+            return
+
+        builds = []
+
+        def build():
+            builds.append(1)
+            lists = TaskList.objects.filter(project=project).select_related("project")
+            return TaskListDetailSerializer(lists, many=True).data
+
+        def direct():
+            return build()
+
+        def coalesced():
+            return get_or_build(project_cache_key(project.id, "benchmark"), build)
+
+        # Warm the task card cache so both runs measure the board build only
+        build()
+
+        for label, read in (("direct", direct), ("single-flight", coalesced)):
+            builds.clear()
+            timings = [
+                self.run_round(project, read, options["clients"])
+                for _ in range(options["rounds"])
+            ]
+            self.stdout.write(
+                f"{label}: {statistics.mean(timings) * 1000:.1f} ms per round, "
+                f"{len(builds) / options['rounds']:.1f} builds per round "
+                f"({options['clients']} clients)"
+            )
+
+    def run_round(self, project, read, clients):
+        bump_project_version(project.id)
+        barrier = threading.Barrier(clients + 1)
+
+        def client():
+            try:
+                barrier.wait()
+                read()
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=client) for _ in range(clients)]
+        for thread in threads:
+            thread.start()
+        started = time.perf_counter()
+        barrier.wait()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started
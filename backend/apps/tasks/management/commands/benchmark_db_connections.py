@@ -0,0 +1,92 @@
+"""
+Compare per-request database latency with and without connection pooling.
+
+Each simulated request opens its connection the way Django does, runs a few
+queries and releases the connection at the end, like ``request_finished``.
+Without pooling every request pays for a new Postgres connection; with
+pooling it borrows one from the pool.
+"""
+
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.utils import ConnectionHandler
+
+from trello_backend.db import check_connection
+
+
+class Command(BaseCommand):
+    help = "Benchmark request latency with and without database connection pooling"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument(
+            "--queries", type=int, default=3, help="Queries run by each request"
+        )
+        parser.add_argument(
+            "--clients", type=int, default=4, help="Threads sending requests"
+        )
+
+    def handle(self, *args, **options):
+        base = settings.DATABASES["default"]
+        if "postgresql" not in base["ENGINE"]:
+            raise CommandError("Connection pooling is only available on PostgreSQL")
+
+        options_without_pool = {
+            k: v for k, v in base.get("OPTIONS", {}).items() if k != "pool"
+        }
+        pool = {
+            "min_size": options["clients"],
+            "max_size": options["clients"],
+            "check": check_connection,
+        }
+        modes = (
+            ("no pooling", {**options_without_pool}),
+            ("pooling", {**options_without_pool, "pool": pool}),
+        )
+        for label, db_options in modes:
+            alias = f"benchmark_{label.replace(' ', '_')}"
+            handler = ConnectionHandler(
+                {alias: {**base, "CONN_MAX_AGE": 0, "OPTIONS": db_options}}
+            )
+            timings = self.run(handler, alias, options)
+            if db_options.get("pool"):
+                handler[alias].close_pool()
+            timings.sort()
+            self.stdout.write(
+                f"{label}: mean {statistics.mean(timings) * 1000:.2f} ms, "
+                f"p50 {timings[len(timings) // 2] * 1000:.2f} ms, "
+                f"p95 {timings[int(len(timings) * 0.95)] * 1000:.2f} ms "
+                f"per request ({options['requests']} requests, "
+                f"{options['clients']} clients)"
+            )
+
+    def run(self, handler, alias, options):
+        timings = []
+        lock = threading.Lock()
+        per_client = max(1, options["requests"] // options["clients"])
+
+        def client():
+            # ConnectionHandler gives each thread its own connection
+            connection = handler[alias]
+            for _ in range(per_client):
+                start = time.perf_counter()
+                with connection.cursor() as cursor:
+                    for _ in range(options["queries"]):
+                        cursor.execute("SELECT 1")
+                        cursor.fetchone()
+                connection.close_if_unusable_or_obsolete()
+                elapsed = time.perf_counter() - start
+                with lock:
+                    timings.append(elapsed)
+            connection.close()
+
+        threads = [threading.Thread(target=client) for _ in range(options["clients"])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return timings
@@ -0,0 +1,100 @@
+"""
+Compare insert throughput and primary key index size of uuid4 and uuid7 keys.
+
+Rows shaped like tasks are inserted into a scratch table, once keyed by
+random uuid4 values and once by time-ordered uuid7 values. The scratch tables
+are dropped afterwards.
+"""
+
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, models, transaction
+
+from trello_backend.ids import uuid7
+
+TABLE = "benchmark_uuid_keys"
+
+
+class Command(BaseCommand):
+    help = "Benchmark inserts and index size with uuid4 and uuid7 primary keys"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        for label, generate in (("uuid4", uuid.uuid4), ("uuid7", uuid7)):
+            self.create_table()
+            try:
+                elapsed = self.insert(generate, options["rows"], options["batch_size"])
+                index_size = self.index_size()
+            finally:
+                self.drop_table()
+            size = "n/a" if index_size is None else f"{index_size / 2**20:.1f} MiB"
+            self.stdout.write(
+                f"{label}: {options['rows'] / elapsed:,.0f} rows/s "
+                f"({elapsed:.1f} s), primary key index {size}"
+            )
+
+    def create_table(self):
+        uuid_type = models.UUIDField().db_type(connection)
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE {quote(TABLE)} ("
+                f"id {uuid_type} PRIMARY KEY, "
+                f"task_list_id {uuid_type} NOT NULL, "
+                f"title varchar(200) NOT NULL, "
+                f"position integer NOT NULL)"
+            )
+
+    def drop_table(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE {connection.ops.quote_name(TABLE)}")
+
+    def insert(self, generate, rows, batch_size):
+        field = models.UUIDField()
+        task_list_id = field.get_db_prep_value(uuid.uuid4(), connection)
+        sql = (
+            f"INSERT INTO {connection.ops.quote_name(TABLE)} "
+            f"(id, task_list_id, title, position) VALUES (%s, %s, %s, %s)"
+        )
+        start = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            count = min(batch_size, rows - offset)
+            params = [
+                (
+                    field.get_db_prep_value(generate(), connection),
+                    task_list_id,
+                    f"Task {offset + i}",
+                    offset + i,
+                )
+                for i in range(count)
+            ]
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, params)
+        return time.perf_counter() - start
+
+    def index_size(self):
+        """Size in bytes of the primary key index, if the database reports it"""
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(
+                    "SELECT pg_relation_size(indexrelid) FROM pg_index "
+                    "WHERE indrelid = %s::regclass AND indisprimary",
+                    [TABLE],
+                )
+                return cursor.fetchone()[0]
+            if connection.vendor == "sqlite":
+                try:
+                    cursor.execute(
+                        "SELECT SUM(pgsize) FROM dbstat WHERE name = %s",
+                        [f"sqlite_autoindex_{TABLE}_1"],
+                    )
+                except Exception:
+                    # SQLite built without the dbstat virtual table
+                    return None
+                return cursor.fetchone()[0]
+        return None
@@ -0,0 +1,26 @@
+"""
+Renumber the lists of every board and the tasks of every list that have gaps
+in their positions, on every shard.
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.tasks.ordering import compact_fragmented
+from trello_backend import sharding
+
+
+class Command(BaseCommand):
+    help = "Renumber list and task positions that have gaps"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threshold",
+            type=int,
+            default=1,
+            help="Gaps a list or board needs to be renumbered (default any)",
+        )
+
+    def handle(self, *args, **options):
+        for shard in sharding.each_shard():
+            renumbered = compact_fragmented(shard, options["threshold"])
+            self.stdout.write(f"{shard}: renumbered {renumbered} lists and tasks")
@@ -0,0 +1,92 @@
+"""
+Report the size of the task table and its indexes and the latency of a board
+query, optionally before and after moving old archived tasks to cold storage.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+
+from apps.projects.models import Project
+from apps.tasks.archive import get_cold_storage_cutoff, move_archived_tasks
+from apps.tasks.models import Task, TaskList
+
+
+class Command(BaseCommand):
+    help = "Measure task index sizes and board query latency"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--project", help="Project id to time (defaults to the largest board)"
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="Number of timed board loads"
+        )
+        parser.add_argument(
+            "--move",
+            action="store_true",
+            help="Move old archived tasks to cold storage between two measurements",
+        )
+
+    def handle(self, *args, **options):
+        project = self.get_project(options["project"])
+        self.report("before" if options["move"] else "current", project, options)
+        if options["move"]:
+            moved = move_archived_tasks(cutoff=get_cold_storage_cutoff())
+            self.stdout.write(f"Moved {moved} tasks to cold storage")
+            self.report("after", project, options)
+
+    def get_project(self, project_id):
+        if project_id:
+            return Project.objects.get(id=project_id)
+        return (
+            Project.objects.annotate(n=Count("task_lists__tasks"))
+            .order_by("-n")
+            .first()
+        )
+
+    def report(self, label, project, options):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{label}:"))
+        self.stdout.write(f"  task rows: {Task.all_objects.count()}")
+        for name, size in self.index_sizes():
+            self.stdout.write(f"  {name}: {size / 1024:.1f} KiB")
+        if project is not None:
+            avg = self.time_board(project, options["repeat"])
+            self.stdout.write(f"  board query: {avg * 1000:.2f} ms (avg)")
+
+    def index_sizes(self):
+        table = Task._meta.db_table
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(
+                    "SELECT indexrelid::regclass::text, "
+                    "pg_relation_size(indexrelid) "
+                    "FROM pg_index WHERE indrelid = %s::regclass",
+                    [table],
+                )
+                return cursor.fetchall()
+            if connection.vendor == "sqlite":
+                try:
+                    cursor.execute(
+                        "SELECT name, SUM(pgsize) FROM dbstat WHERE name IN "
+                        "(SELECT name FROM sqlite_master "
+                        "WHERE type = 'index' AND tbl_name = %s) GROUP BY name",
+                        [table],
+                    )
+                except Exception:
+                    # SQLite built without the dbstat virtual table
+                    return []
+                return cursor.fetchall()
+        return []
+
+    def time_board(self, project, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            list(
+                TaskList.objects.filter(project=project, is_archived=False)
+                .prefetch_related("tasks")
+                .order_by("position")
+            )
+        return (time.perf_counter() - started) / repeat
@@ -0,0 +1,54 @@
+"""
+Move a project, with its lists, tasks and comments, to another shard.
+"""
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.projects.models import Project
+from apps.tasks.rebalance import DEFAULT_BATCH_SIZE, move_project
+from trello_backend import sharding
+
+
+class Command(BaseCommand):
+    help = "Move a project to another database shard"
+
+    def add_arguments(self, parser):
+        parser.add_argument("project", help="Id of the project to move")
+        parser.add_argument("shard", help="Database alias of the target shard")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Rows copied per insert",
+        )
+
+    def handle(self, *args, **options):
+        shards = sharding.get_shards()
+        if options["shard"] not in shards:
+            raise CommandError(
+                f"Unknown shard {options['shard']!r}; DATABASE_SHARDS is {shards}"
+            )
+        try:
+            source = sharding.shard_for_project(options["project"])
+            exists = (
+                Project.all_objects.using(source).filter(pk=options["project"]).exists()
+            )
+        except (ValueError, ValidationError):
+            exists = False
+        if not exists:
+            raise CommandError(f"Project {options['project']} not found")
+
+        copied = move_project(
+            options["project"], options["shard"], batch_size=options["batch_size"]
+        )
+        if not copied:
+            self.stdout.write(f"Project is already on {options['shard']}")
+            return
+        for label, count in copied.items():
+            self.stdout.write(f"  {label}: {count} rows")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Moved project {options['project']} to {options['shard']}"
+            )
+        )
@@ -0,0 +1,104 @@
+"""
+Hammer one list with concurrent task moves and check the order stays intact.
+
+A throwaway board with one list of ``--tasks`` tasks is created, then
+``--threads`` threads each move random tasks to random positions of the list
+``--moves`` times. Afterwards the positions of the list must be exactly
+0 to n-1. Run it against PostgreSQL: SQLite serializes every write anyway.
+"""
+
+import random
+import statistics
+import threading
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connections
+
+from apps.projects.models import Project
+from apps.tasks.models import Task, TaskList
+from apps.tasks.ordering import move_task
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Stress concurrent task moves on one list and verify the positions"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=50)
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument(
+            "--moves", type=int, default=100, help="Moves made by each thread"
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(
+            email=f"stress-{uuid.uuid4().hex[:12]}@example.com", password=None
+        )
+        try:
+            project = Project.objects.create(name="Move stress test", owner=user)
+            task_list = TaskList.objects.create(
+                name="Stress", project=project, position=0
+            )
+            Task.objects.bulk_create(
+                Task(task_list=task_list, title=f"Task {i}", position=i, creator=user)
+                for i in range(options["tasks"])
+            )
+            timings, errors, elapsed = self.run(task_list, options)
+            positions = list(
+                Task.objects.filter(task_list=task_list)
+                .order_by("position")
+                .values_list("position", flat=True)
+            )
+        finally:
+            # Projects cascade to their lists and tasks
+            Project.all_objects.filter(owner=user).delete()
+            user.delete()
+
+        self.stdout.write(
+            f"{len(timings) / elapsed:,.1f} moves/s, "
+            f"mean {statistics.mean(timings) * 1000:.1f} ms per move, "
+            f"{errors} failed ({len(timings)} moves, {options['threads']} threads)"
+        )
+        if positions != list(range(options["tasks"])):
+            raise CommandError(f"Positions are not dense and unique: {positions}")
+        self.stdout.write(self.style.SUCCESS("Positions are dense and unique"))
+
+    def run(self, task_list, options):
+        task_ids = list(
+            Task.objects.filter(task_list=task_list).values_list("id", flat=True)
+        )
+        timings = []
+        errors = []
+        lock = threading.Lock()
+
+        def client():
+            rng = random.Random()
+            try:
+                for _ in range(options["moves"]):
+                    start = time.perf_counter()
+                    try:
+                        task = Task.objects.get(pk=rng.choice(task_ids))
+                        move_task(task, task_list, rng.randrange(len(task_ids)))
+                    except DatabaseError as e:
+                        with lock:
+                            errors.append(e)
+                        continue
+                    elapsed = time.perf_counter() - start
+                    with lock:
+                        timings.append(elapsed)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=client) for _ in range(options["threads"])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for error in errors[:5]:
+            self.stderr.write(f"Move failed: {error}")
+        return timings, len(errors), time.perf_counter() - start
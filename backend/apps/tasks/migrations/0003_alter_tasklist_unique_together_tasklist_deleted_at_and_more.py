@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0003_project_deleted_at_project_project_pending_purge_idx"),
+        ("tasks", "0002_alter_task_unique_together"),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name="tasklist",
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name="tasklist",
+            name="deleted_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="When the list was deleted; its tasks are purged in the background",
+                null=True,
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="tasklist",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=("project", "position"),
+                name="unique_live_task_list_position",
+            ),
+        ),
+    ]
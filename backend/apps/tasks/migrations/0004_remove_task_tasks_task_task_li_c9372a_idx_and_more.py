@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0003_project_deleted_at_project_project_pending_purge_idx"),
+        ("tasks", "0003_alter_tasklist_unique_together_tasklist_deleted_at_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="task",
+            name="tasks_task_task_li_c9372a_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="taskcomment",
+            name="tasks_taskc_task_id_3f97e8_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="tasklist",
+            name="tasks_taskl_project_0e1141_idx",
+        ),
+        migrations.AddField(
+            model_name="task",
+            name="deleted_at",
+            field=models.DateTimeField(
+                blank=True, help_text="When the item was moved to the trash", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="taskcomment",
+            name="deleted_at",
+            field=models.DateTimeField(
+                blank=True, help_text="When the item was moved to the trash", null=True
+            ),
+        ),
+        migrations.AlterField(
+            model_name="tasklist",
+            name="deleted_at",
+            field=models.DateTimeField(
+                blank=True, help_text="When the item was moved to the trash", null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["task_list", "position"],
+                name="task_live_position_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", False)),
+                fields=["deleted_at"],
+                name="task_trash_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="taskcomment",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["task", "created_at"],
+                name="comment_live_task_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="taskcomment",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", False)),
+                fields=["deleted_at"],
+                name="comment_trash_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tasklist",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", False)),
+                fields=["deleted_at"],
+                name="tasklist_trash_idx",
+            ),
+        ),
+    ]
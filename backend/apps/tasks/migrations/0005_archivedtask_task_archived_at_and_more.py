@@ -0,0 +1,140 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:02
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0004_remove_task_tasks_task_task_li_c9372a_idx_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedTask",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(editable=False, primary_key=True, serialize=False),
+                ),
+                ("title", models.CharField(max_length=200)),
+                ("description", models.TextField(blank=True)),
+                ("position", models.PositiveIntegerField(default=0)),
+                (
+                    "priority",
+                    models.CharField(
+                        choices=[
+                            ("low", "Low"),
+                            ("medium", "Medium"),
+                            ("high", "High"),
+                            ("urgent", "Urgent"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "label_color",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("#61bd4f", "Green"),
+                            ("#f2d600", "Yellow"),
+                            ("#ff9f1a", "Orange"),
+                            ("#eb5a46", "Red"),
+                            ("#c377e0", "Purple"),
+                            ("#0079bf", "Blue"),
+                            ("#00c2e0", "Sky"),
+                            ("#51e898", "Lime"),
+                            ("#ff78cb", "Pink"),
+                            ("#344563", "Black"),
+                        ],
+                        max_length=7,
+                        null=True,
+                    ),
+                ),
+                ("due_date", models.DateTimeField(blank=True, null=True)),
+                ("is_completed", models.BooleanField(default=False)),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+                ("created_at", models.DateTimeField()),
+                ("updated_at", models.DateTimeField()),
+                (
+                    "archived_at",
+                    models.DateTimeField(help_text="When the task was archived"),
+                ),
+                (
+                    "moved_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="When the task was moved to cold storage",
+                    ),
+                ),
+                (
+                    "assignee_ids",
+                    models.JSONField(
+                        default=list,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        help_text="IDs of the users assigned to the task",
+                    ),
+                ),
+                (
+                    "comments",
+                    models.JSONField(
+                        default=list,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        help_text="Comments of the task at the time it was moved",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Archived Task",
+                "verbose_name_plural": "Archived Tasks",
+                "ordering": ["-archived_at"],
+            },
+        ),
+        migrations.AddField(
+            model_name="task",
+            name="archived_at",
+            field=models.DateTimeField(
+                blank=True, help_text="When the task was archived", null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                condition=models.Q(("is_archived", True)),
+                fields=["archived_at"],
+                name="task_archived_at_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="archivedtask",
+            name="creator",
+            field=models.ForeignKey(
+                help_text="User who created this task",
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="archived_tasks",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="archivedtask",
+            name="task_list",
+            field=models.ForeignKey(
+                help_text="List the task belonged to",
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="archived_tasks",
+                to="tasks.tasklist",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="archivedtask",
+            index=models.Index(
+                fields=["task_list", "archived_at"],
+                name="tasks_archi_task_li_9bc343_idx",
+            ),
+        ),
+    ]
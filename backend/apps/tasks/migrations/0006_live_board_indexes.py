@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0005_archivedtask_task_archived_at_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="task",
+            name="tasks_task_task_li_4d63d2_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="task",
+            name="tasks_task_creator_b6157f_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="task",
+            name="tasks_task_priorit_a900d4_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="task",
+            name="tasks_task_due_dat_bce847_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="task",
+            name="tasks_task_is_comp_30fbc3_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="tasklist",
+            name="tasks_taskl_project_d0830d_idx",
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                condition=models.Q(
+                    ("deleted_at__isnull", True), ("is_archived", False)
+                ),
+                fields=["task_list", "position", "created_at"],
+                include=("id",),
+                name="task_board_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                condition=models.Q(
+                    ("deleted_at__isnull", True),
+                    ("due_date__isnull", False),
+                    ("is_completed", False),
+                ),
+                fields=["due_date"],
+                name="task_open_due_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:26
+
+import trello_backend.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0006_live_board_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="task",
+            name="id",
+            field=models.UUIDField(
+                default=trello_backend.ids.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="taskcomment",
+            name="id",
+            field=models.UUIDField(
+                default=trello_backend.ids.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="tasklist",
+            name="id",
+            field=models.UUIDField(
+                default=trello_backend.ids.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def renumber_positions(apps, schema_editor):
+    """Give the live tasks of every list the positions 0, 1, 2, ... in order"""
+    Task = apps.get_model("tasks", "Task")
+    tasks = (
+        Task.objects.using(schema_editor.connection.alias)
+        .filter(deleted_at__isnull=True)
+        .order_by("task_list_id", "position", "created_at", "id")
+        .only("id", "task_list_id", "position")
+    )
+    changed = []
+    task_list_id, position = None, 0
+    for task in tasks.iterator():
+        if task.task_list_id != task_list_id:
+            task_list_id, position = task.task_list_id, 0
+        if task.position != position:
+            task.position = position
+            changed.append(task)
+        position += 1
+    Task.objects.using(schema_editor.connection.alias).bulk_update(
+        changed, ["position"], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0007_uuid7_primary_keys"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="task",
+            name="task_live_position_idx",
+        ),
+        migrations.RunPython(renumber_positions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="task",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=("task_list", "position"),
+                name="unique_live_task_position",
+            ),
+        ),
+    ]
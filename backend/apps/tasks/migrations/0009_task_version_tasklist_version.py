@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0008_unique_live_task_position"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="version",
+            field=models.PositiveIntegerField(
+                default=1, editable=False, help_text="Incremented by every save"
+            ),
+        ),
+        migrations.AddField(
+            model_name="tasklist",
+            name="version",
+            field=models.PositiveIntegerField(
+                default=1, editable=False, help_text="Incremented by every save"
+            ),
+        ),
+    ]
@@ -1,20 +1,68 @@
-import uuid
-
 from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinLengthValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Max, Q
+from django.utils import timezone
 
 from apps.projects.models import Project
+from trello_backend import versioning
+from trello_backend.ids import uuid7
+from trello_backend.versioning import VersionedModel
 
 User = get_user_model()
 
 
-class TaskList(models.Model):
+class SoftDeleteManager(models.Manager):
+    """
+    Default manager that hides rows moved to the trash
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class SoftDeleteModel(models.Model):
+    """
+    Abstract model for rows that stay in the trash until they are purged
+    """
+
+    deleted_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="When the item was moved to the trash"
+    )
+
+    objects = SoftDeleteManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        abstract = True
+
+    def soft_delete(self):
+        """Move the item to the trash"""
+        self.deleted_at = timezone.now()
+        self.write_deleted_at()
+
+    def restore(self):
+        """Take the item out of the trash"""
+        self.deleted_at = None
+        self.write_deleted_at()
+
+    def write_deleted_at(self):
+        """Write ``deleted_at`` alone, incrementing the version of versioned rows"""
+        if isinstance(self, VersionedModel):
+            versioning.update(self, deleted_at=self.deleted_at)
+        else:
+            type(self).all_objects.filter(pk=self.pk).update(deleted_at=self.deleted_at)
+
+
+class TaskList(VersionedModel, SoftDeleteModel):
     """
     TaskList model representing a column/list in a Trello board
     """
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     name = models.CharField(
         max_length=100,
         validators=[MinLengthValidator(1)],
@@ -41,21 +89,45 @@ class TaskList(models.Model):
         ordering = ["position", "created_at"]
         verbose_name = "Task List"
         verbose_name_plural = "Task Lists"
-        unique_together = ["project", "position"]
+        constraints = [
+            # Lists in the trash keep their position until restored or purged
+            models.UniqueConstraint(
+                fields=["project", "position"],
+                condition=Q(deleted_at__isnull=True),
+                name="unique_live_task_list_position",
+            ),
+        ]
+        # Board lists are read through unique_live_task_list_position; a board
+        # has few lists, so archived ones are filtered after the index scan
         indexes = [
-            models.Index(fields=["project", "position"]),
-            models.Index(fields=["project", "is_archived"]),
+            models.Index(
+                fields=["deleted_at"],
+                condition=Q(deleted_at__isnull=False),
+                name="tasklist_trash_idx",
+            ),
         ]
 
     def __str__(self):
         return f"{self.name} ({self.project.name})"
 
+    def restore(self):
+        """Take the list out of the trash, at the end if its position was reused"""
+        from .ordering import lock_project
+
+        using = self._state.db
+        with transaction.atomic(using=using):
+            lock_project(using, self.project_id)
+            siblings = TaskList.objects.using(using).filter(project_id=self.project_id)
+            if siblings.filter(position=self.position).exists():
+                self.position = siblings.aggregate(max_pos=Max('position'))['max_pos'] + 1
+            versioning.update(self, deleted_at=None, position=self.position)
+
     def get_tasks_count(self):
         """Get total number of tasks in this list"""
         return self.tasks.filter(is_archived=False).count()
 
 
-class Task(models.Model):
+class Task(VersionedModel, SoftDeleteModel):
     """
     Task model representing a card in a Trello list
     """
@@ -85,7 +157,7 @@ class Task(models.Model):
         ("#344563", "Black"),
     ]
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     title = models.CharField(
         max_length=200,
         validators=[MinLengthValidator(1)],
@@ -150,19 +222,55 @@ class Task(models.Model):
         blank=True,        null=True,
         help_text="When the task was completed"
     )
+    archived_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="When the task was archived"
+    )
 
     class Meta:
         ordering = ["position", "created_at"]
         verbose_name = "Task"
         verbose_name_plural = "Tasks"
-        # unique_together = ["task_list", "position"]  # Temporarily disabled to prevent race conditions
+        constraints = [
+            # Also serves the position lookups of moves; trashed tasks keep
+            # their position until restored or purged
+            models.UniqueConstraint(
+                fields=["task_list", "position"],
+                condition=Q(deleted_at__isnull=True),
+                name="unique_live_task_position",
+            ),
+        ]
+        # creator and task_list are covered by their foreign key indexes
         indexes = [
-            models.Index(fields=["task_list", "position"]),
-            models.Index(fields=["task_list", "is_archived"]),
-            models.Index(fields=["creator"]),
-            models.Index(fields=["priority"]),
-            models.Index(fields=["due_date"]),
-            models.Index(fields=["is_completed"]),
+            # Cards of a list in board order; including the id lets counts and
+            # id lookups of a board be answered from the index alone
+            models.Index(
+                fields=["task_list", "position", "created_at"],
+                include=["id"],
+                condition=Q(deleted_at__isnull=True, is_archived=False),
+                name="task_board_idx",
+            ),
+            # Open tasks with a deadline, for due date ordering and overdue checks
+            models.Index(
+                fields=["due_date"],
+                condition=Q(
+                    deleted_at__isnull=True,
+                    is_completed=False,
+                    due_date__isnull=False,
+                ),
+                name="task_open_due_idx",
+            ),
+            models.Index(
+                fields=["deleted_at"],
+                condition=Q(deleted_at__isnull=False),
+                name="task_trash_idx",
+            ),
+            models.Index(
+                fields=["archived_at"],
+                condition=Q(is_archived=True),
+                name="task_archived_at_idx",
+            ),
         ]
 
     def __str__(self):
@@ -170,14 +278,29 @@ class Task(models.Model):
 
     
     def save(self, *args, **kwargs):
-        """Override save to handle completion timestamp"""
+        """Override save to handle completion and archival timestamps"""
         if self.is_completed and not self.completed_at:
-            from django.utils import timezone
             self.completed_at = timezone.now()
         elif not self.is_completed:
             self.completed_at = None
+        if self.is_archived and not self.archived_at:
+            self.archived_at = timezone.now()
+        elif not self.is_archived:
+            self.archived_at = None
         super().save(*args, **kwargs)
 
+    def restore(self):
+        """Take the task out of the trash, at the end if its position was reused"""
+        from .ordering import lock_task_lists
+
+        using = self._state.db
+        with transaction.atomic(using=using):
+            lock_task_lists(using, self.task_list_id)
+            siblings = Task.objects.using(using).filter(task_list_id=self.task_list_id)
+            if siblings.filter(position=self.position).exists():
+                self.position = siblings.aggregate(max_pos=Max('position'))['max_pos'] + 1
+            versioning.update(self, deleted_at=None, position=self.position)
+
     def get_assignees_count(self):
         """Get total number of assignees"""
         return self.assignees.count()
@@ -201,12 +324,12 @@ class Task(models.Model):
         return self.task_list.project.can_view(user)
 
 
-class TaskComment(models.Model):
+class TaskComment(SoftDeleteModel):
     """
     Comment model for tasks
     """
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     task = models.ForeignKey(
         Task,
         on_delete=models.CASCADE,
@@ -235,7 +358,16 @@ class TaskComment(models.Model):
         verbose_name = "Task Comment"
         verbose_name_plural = "Task Comments"
         indexes = [
-            models.Index(fields=["task", "created_at"]),
+            models.Index(
+                fields=["task", "created_at"],
+                condition=Q(deleted_at__isnull=True),
+                name="comment_live_task_idx",
+            ),
+            models.Index(
+                fields=["deleted_at"],
+                condition=Q(deleted_at__isnull=False),
+                name="comment_trash_idx",
+            ),
             models.Index(fields=["author"]),
         ]
 
@@ -247,3 +379,68 @@ class TaskComment(models.Model):
         if self.pk:  # If updating existing comment
             self.is_edited = True
         super().save(*args, **kwargs)
+
+
+class ArchivedTask(models.Model):
+    """
+    Cold storage copy of a task that has been archived for a long time.
+
+    Keeping these rows out of the task table keeps its indexes small for the
+    live board queries. Assignees and comments are stored inline.
+    """
+
+    id = models.UUIDField(primary_key=True, editable=False)
+    task_list = models.ForeignKey(
+        TaskList,
+        on_delete=models.CASCADE,
+        related_name="archived_tasks",
+        help_text="List the task belonged to"
+    )
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    position = models.PositiveIntegerField(default=0)
+    priority = models.CharField(max_length=10, choices=Task.PRIORITY_CHOICES)
+    label_color = models.CharField(
+        max_length=7, choices=Task.LABEL_COLORS, blank=True, null=True
+    )
+    creator = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="archived_tasks",
+        help_text="User who created this task"
+    )
+    due_date = models.DateTimeField(blank=True, null=True)
+    is_completed = models.BooleanField(default=False)
+    completed_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(help_text="When the task was archived")
+    moved_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="When the task was moved to cold storage"
+    )
+    assignee_ids = models.JSONField(
+        default=list,
+        encoder=DjangoJSONEncoder,
+        help_text="IDs of the users assigned to the task"
+    )
+    comments = models.JSONField(
+        default=list,
+        encoder=DjangoJSONEncoder,
+        help_text="Comments of the task at the time it was moved"
+    )
+
+    class Meta:
+        ordering = ["-archived_at"]
+        verbose_name = "Archived Task"
+        verbose_name_plural = "Archived Tasks"
+        indexes = [
+            models.Index(fields=["task_list", "archived_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.title} (archived)"
+
+    def can_edit(self, user):
+        """Check if user can restore this task"""
+        return self.task_list.project.can_edit(user)
@@ -0,0 +1,318 @@
+"""
+Race-free positions of lists and tasks.
+
+Positions are unique among the live lists of a project and among the live
+tasks of a list. Every change of positions runs in a transaction that first
+locks the parent row with ``SELECT ... FOR UPDATE``: the list for its tasks,
+the project for its lists. Concurrent moves within one list therefore run one
+after the other and always see current positions, while other lists are not
+blocked. Two lists are locked in id order, so moves in opposite directions
+between them cannot deadlock.
+
+A block of siblings is shifted in two ``UPDATE`` statements: first past the
+highest used position, then to its final place, which also increments the
+versions of the shifted rows. Shifting by one in a single
+statement would collide with a neighbour's position whenever the database
+checks the unique constraint before the neighbour has moved.
+
+Items leaving a list or board, to the trash or to cold storage, leave gaps in
+the positions. Once ``POSITION_GAP_THRESHOLD`` gaps have built up, a Celery
+job renumbers the siblings to 0, 1, 2, ... again with one ``CASE`` update;
+``compact_positions`` sweeps every board for gaps.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, Max, PositiveIntegerField, Value, When
+
+from apps.projects.cache import bump_project_version
+from apps.projects.models import Project
+from trello_backend import versioning
+
+from .models import Task, TaskList
+from .signals import project_changed
+
+
+def lock_task_lists(using, *task_list_ids):
+    """Lock the given task lists until the end of the transaction"""
+    list(
+        TaskList.all_objects.using(using)
+        .select_for_update()
+        .filter(pk__in=set(task_list_ids))
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+
+
+def lock_project(using, project_id):
+    """Lock a project, which serializes changes to the order of its lists"""
+    list(
+        Project.all_objects.using(using)
+        .select_for_update()
+        .filter(pk=project_id)
+        .values_list("pk", flat=True)
+    )
+
+
+def task_siblings(using, task_list_id):
+    return Task.objects.using(using).filter(task_list_id=task_list_id)
+
+
+def list_siblings(using, project_id):
+    return TaskList.objects.using(using).filter(project_id=project_id)
+
+
+def top_position(siblings):
+    """Highest position among ``siblings``, -1 if there are none"""
+    top = siblings.aggregate(top=Max("position"))["top"]
+    return -1 if top is None else top
+
+
+def shift(siblings, low, high, delta, free=None):
+    """
+    Add ``delta`` to the positions ``low`` to ``high`` of ``siblings``.
+
+    The positions the block moves onto must be free apart from its own, and
+    so must every position from ``free`` (default past the highest) upwards.
+    """
+    if high < low:
+        return
+    if free is None:
+        free = top_position(siblings) + 1
+    # Park the block clear of the positions it moves onto
+    offset = max(free, high + delta + 1) - low
+    siblings.filter(position__gte=low, position__lte=high).update(
+        position=F("position") + offset
+    )
+    siblings.filter(position__gte=low + offset).update(
+        position=F("position") - offset + delta, version=F("version") + 1
+    )
+
+
+def make_room(siblings, position=None):
+    """
+    Free ``position`` among ``siblings`` by shifting the ones at or after it.
+
+    ``None`` or a position past the end means the end. The parent must be
+    locked. Returns the position to use.
+    """
+    top = top_position(siblings)
+    if position is None or position > top:
+        return top + 1
+    shift(siblings, position, top, 1, free=top + 1)
+    return position
+
+
+def reposition(siblings, item, position):
+    """
+    Make room for ``item`` at ``position`` among its ``siblings``, shifting the
+    ones in between, and set ``item.position``. The parent must be locked.
+    Returns whether the item moves; writing its position is up to the caller.
+    """
+    current = siblings.values_list("position", flat=True).get(pk=item.pk)
+    top = top_position(siblings)
+    position = item.position = max(0, min(position, top))
+    if position == current:
+        return False
+
+    # Park the item above every sibling while the others shift
+    siblings.filter(pk=item.pk).update(position=top + 1)
+    others = siblings.exclude(pk=item.pk)
+    if position < current:
+        shift(others, position, current - 1, 1, free=top + 2)
+    else:
+        shift(others, current + 1, position, -1, free=top + 2)
+    return True
+
+
+def write_position(item, project_id, *fields):
+    """
+    Write ``fields`` of a moved ``item`` with one ``UPDATE``, incrementing its
+    version, and refresh the board of ``project_id``.
+    """
+    versioning.update(item, **{name: getattr(item, name) for name in fields})
+    project_changed(project_id)
+
+
+def insert_task(task_list, position=None):
+    """
+    Reserve ``position`` (default the end) in ``task_list`` for a new task.
+
+    Must run in a transaction, which should also save the task.
+    """
+    using = task_list._state.db
+    lock_task_lists(using, task_list.pk)
+    return make_room(task_siblings(using, task_list.pk), position)
+
+
+def insert_task_list(project, position=None):
+    """Reserve ``position`` (default the end) in ``project`` for a new list"""
+    using = project._state.db
+    lock_project(using, project.pk)
+    return make_room(list_siblings(using, project.pk), position)
+
+
+def move_task(task, target_list, position=None, save=None):
+    """
+    Move ``task`` to ``position`` of ``target_list``, which may be its own.
+
+    ``None`` means the end of another list and no move within the same list.
+    ``save``, such as a serializer's ``save``, writes the task once it is in
+    place together with any other changes; by default only its list and
+    position are written.
+    """
+    using = task._state.db
+    with transaction.atomic(using=using):
+        source_id = task.task_list_id
+        lock_task_lists(using, source_id, target_list.pk)
+        if target_list.pk == source_id:
+            siblings = task_siblings(using, source_id)
+            moved = position is not None and reposition(siblings, task, position)
+            if save is not None:
+                save()
+            elif moved:
+                write_position(task, target_list.project_id, "position")
+            return task
+
+        current = (
+            task_siblings(using, source_id)
+            .values_list("position", flat=True)
+            .get(pk=task.pk)
+        )
+        task.position = make_room(task_siblings(using, target_list.pk), position)
+        task.task_list = target_list
+        if save is not None:
+            save()
+        else:
+            write_position(task, target_list.project_id, "task_list", "position")
+        # Close the gap left in the source list
+        source = task_siblings(using, source_id)
+        shift(source, current + 1, top_position(source), -1)
+        return task
+
+
+def move_task_list(task_list, position, save=None):
+    """
+    Move ``task_list`` to ``position`` among the lists of its project.
+    ``save`` is as for ``move_task``.
+    """
+    using = task_list._state.db
+    with transaction.atomic(using=using):
+        lock_project(using, task_list.project_id)
+        siblings = list_siblings(using, task_list.project_id)
+        moved = reposition(siblings, task_list, position)
+        if save is not None:
+            save()
+        elif moved:
+            write_position(task_list, task_list.project_id, "position")
+        return task_list
+
+
+DEFAULT_GAP_THRESHOLD = 50
+
+
+def get_gap_threshold():
+    return getattr(settings, "POSITION_GAP_THRESHOLD", DEFAULT_GAP_THRESHOLD)
+
+
+def count_gaps(siblings):
+    """Unused positions below the highest one of ``siblings``"""
+    stats = siblings.aggregate(top=Max("position"), count=Count("pk"))
+    return 0 if stats["top"] is None else stats["top"] + 1 - stats["count"]
+
+
+def renumber(siblings):
+    """
+    Give ``siblings`` the positions 0 to n-1 in their current order.
+
+    The parent must be locked. Returns the number of renumbered items. The
+    ``UPDATE`` sends no signals, so callers refresh the cached board.
+    """
+    rows = list(siblings.order_by("position").values_list("pk", "position"))
+    moved = {pk: i for i, (pk, position) in enumerate(rows) if position != i}
+    if not moved:
+        return 0
+    # Park the moved items past the top, then put them in place
+    siblings.filter(pk__in=moved).update(position=F("position") + rows[-1][1] + 1)
+    siblings.filter(pk__in=moved).update(
+        position=Case(
+            *[When(pk=pk, then=Value(i)) for pk, i in moved.items()],
+            output_field=PositiveIntegerField(),
+        ),
+        version=F("version") + 1,
+    )
+    return len(moved)
+
+
+def compact_task_list(using, task_list_id):
+    """Renumber the tasks of a list; returns the number of renumbered tasks"""
+    with transaction.atomic(using=using):
+        lock_task_lists(using, task_list_id)
+        renumbered = renumber(task_siblings(using, task_list_id))
+        if renumbered:
+            bump_project_version(
+                TaskList.all_objects.using(using)
+                .filter(pk=task_list_id)
+                .values_list("project_id", flat=True)
+                .first()
+            )
+        return renumbered
+
+
+def compact_project(using, project_id):
+    """Renumber the lists of a project; returns the number of renumbered lists"""
+    with transaction.atomic(using=using):
+        lock_project(using, project_id)
+        renumbered = renumber(list_siblings(using, project_id))
+        if renumbered:
+            bump_project_version(project_id)
+        return renumbered
+
+
+def _fragmented(siblings, parent_field, threshold):
+    """Parents whose children in ``siblings`` have ``threshold`` or more gaps"""
+    return (
+        siblings.order_by()
+        .values(parent_field)
+        .annotate(top=Max("position"), count=Count("pk"))
+        .filter(top__gte=F("count") + threshold - 1)
+        .values_list(parent_field, flat=True)
+    )
+
+
+def compact_fragmented(using, threshold=None):
+    """
+    Compact every list and board of the database ``using`` with at least
+    ``threshold`` gaps. Returns the number of renumbered lists and tasks.
+    """
+    threshold = max(1, threshold or get_gap_threshold())
+    renumbered = 0
+    for project_id in _fragmented(
+        TaskList.objects.using(using), "project_id", threshold
+    ):
+        renumbered += compact_project(using, project_id)
+    for task_list_id in _fragmented(
+        Task.objects.using(using), "task_list_id", threshold
+    ):
+        renumbered += compact_task_list(using, task_list_id)
+    return renumbered
+
+
+def schedule_task_list_compaction(using, task_list_id):
+    """Queue compaction of a list once its tasks have enough gaps"""
+    from .tasks import compact_task_list as compact
+
+    if count_gaps(task_siblings(using, task_list_id)) >= get_gap_threshold():
+        transaction.on_commit(
+            lambda: compact.delay(using, str(task_list_id)), using=using
+        )
+
+
+def schedule_project_compaction(using, project_id):
+    """Queue compaction of a board once its lists have enough gaps"""
+    from .tasks import compact_project as compact
+
+    if count_gaps(list_siblings(using, project_id)) >= get_gap_threshold():
+        transaction.on_commit(
+            lambda: compact.delay(using, str(project_id)), using=using
+        )
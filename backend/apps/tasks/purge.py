@@ -0,0 +1,179 @@
+"""
+Background purge of deleted projects and of expired trash.
+
+Deleting through the ORM collector loads every dependent row into Python to
+send signals. These helpers remove the children of a project or list with raw
+chunked ``DELETE`` statements instead, leaf tables first. They run on the
+database of the current shard.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router
+from django.utils import timezone
+
+from apps.projects.models import Project, ProjectMembership, ShardDirectory
+from trello_backend import sharding
+from trello_backend.db import DEFAULT_CHUNK_SIZE, delete_in_chunks
+
+from .models import ArchivedTask, Task, TaskComment, TaskList
+
+DEFAULT_TRASH_RETENTION_DAYS = 30
+
+
+def get_chunk_size():
+    return getattr(settings, "PURGE_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+
+
+def get_trash_cutoff():
+    """Items moved to the trash before this moment are purged"""
+    days = getattr(settings, "TRASH_RETENTION_DAYS", DEFAULT_TRASH_RETENTION_DAYS)
+    return timezone.now() - timedelta(days=days)
+
+
+def _db():
+    return router.db_for_write(Task)
+
+
+def _connection():
+    """Connection of the database the ``DELETE`` statements run on"""
+    return connections[_db()]
+
+
+def _table(model):
+    return _connection().ops.quote_name(model._meta.db_table)
+
+
+def _prep_id(model, value):
+    return model._meta.pk.get_db_prep_value(value, _connection())
+
+
+def _prep_datetime(model, value):
+    field = model._meta.get_field("deleted_at")
+    return field.get_db_prep_value(value, _connection())
+
+
+def delete_tasks(task_ids_sql, params, chunk_size):
+    """Delete the comments, assignee rows and the tasks selected by the SQL"""
+    Assignee = Task.assignees.through
+    delete_in_chunks(
+        TaskComment._meta.db_table,
+        f"SELECT id FROM {_table(TaskComment)} WHERE task_id IN ({task_ids_sql})",
+        params,
+        chunk_size,
+        using=_db(),
+    )
+    delete_in_chunks(
+        Assignee._meta.db_table,
+        f"SELECT id FROM {_table(Assignee)} WHERE task_id IN ({task_ids_sql})",
+        params,
+        chunk_size,
+        using=_db(),
+    )
+    delete_in_chunks(Task._meta.db_table, task_ids_sql, params, chunk_size, using=_db())
+
+
+def delete_tasks_by_id(task_ids, chunk_size=None):
+    """Delete the given tasks together with their comments and assignee rows"""
+    if not task_ids:
+        return
+    placeholders = ", ".join(["%s"] * len(task_ids))
+    delete_tasks(
+        f"SELECT id FROM {_table(Task)} WHERE id IN ({placeholders})",
+        [_prep_id(Task, task_id) for task_id in task_ids],
+        chunk_size or get_chunk_size(),
+    )
+
+
+def purge_task_list(task_list_id, chunk_size=None):
+    """Delete a task list and every task it contains"""
+    chunk_size = chunk_size or get_chunk_size()
+    params = [_prep_id(TaskList, task_list_id)]
+
+    delete_tasks(
+        f"SELECT id FROM {_table(Task)} WHERE task_list_id = %s", params, chunk_size
+    )
+    delete_in_chunks(
+        ArchivedTask._meta.db_table,
+        f"SELECT id FROM {_table(ArchivedTask)} WHERE task_list_id = %s",
+        params,
+        chunk_size,
+        using=_db(),
+    )
+    delete_in_chunks(
+        TaskList._meta.db_table,
+        f"SELECT id FROM {_table(TaskList)} WHERE id = %s",
+        params,
+        chunk_size,
+        using=_db(),
+    )
+
+
+def purge_project(project_id, chunk_size=None, remove_from_directory=True):
+    """
+    Delete a project with its lists, tasks, archived tasks and memberships.
+
+    ``remove_from_directory=False`` keeps the shard directory entries, for a
+    project that was copied to another shard.
+    """
+    chunk_size = chunk_size or get_chunk_size()
+    params = [_prep_id(Project, project_id)]
+    list_ids_sql = f"SELECT id FROM {_table(TaskList)} WHERE project_id = %s"
+
+    delete_tasks(
+        f"SELECT id FROM {_table(Task)} WHERE task_list_id IN ({list_ids_sql})",
+        params,
+        chunk_size,
+    )
+    delete_in_chunks(
+        ArchivedTask._meta.db_table,
+        f"SELECT id FROM {_table(ArchivedTask)} WHERE task_list_id IN ({list_ids_sql})",
+        params,
+        chunk_size,
+        using=_db(),
+    )
+    delete_in_chunks(
+        TaskList._meta.db_table, list_ids_sql, params, chunk_size, using=_db()
+    )
+    delete_in_chunks(
+        ProjectMembership._meta.db_table,
+        f"SELECT id FROM {_table(ProjectMembership)} WHERE project_id = %s",
+        params,
+        chunk_size,
+        using=_db(),
+    )
+    delete_in_chunks(
+        Project._meta.db_table,
+        f"SELECT id FROM {_table(Project)} WHERE id = %s",
+        params,
+        chunk_size,
+        using=_db(),
+    )
+    if remove_from_directory:
+        ShardDirectory.objects.filter(project_id=project_id).delete()
+        sharding.forget_project(project_id)
+
+
+def purge_expired_trash(cutoff=None, chunk_size=None):
+    """Delete lists, tasks and comments that were trashed before ``cutoff``"""
+    cutoff = cutoff or get_trash_cutoff()
+    chunk_size = chunk_size or get_chunk_size()
+
+    for task_list_id in TaskList.all_objects.filter(deleted_at__lt=cutoff).values_list(
+        "id", flat=True
+    ):
+        purge_task_list(task_list_id, chunk_size)
+
+    delete_tasks(
+        f"SELECT id FROM {_table(Task)} WHERE deleted_at < %s",
+        [_prep_datetime(Task, cutoff)],
+        chunk_size,
+    )
+    delete_in_chunks(
+        TaskComment._meta.db_table,
+        f"SELECT id FROM {_table(TaskComment)} WHERE deleted_at < %s",
+        [_prep_datetime(TaskComment, cutoff)],
+        chunk_size,
+        using=_db(),
+    )
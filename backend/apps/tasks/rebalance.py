@@ -0,0 +1,90 @@
+"""
+Moving a project to another shard.
+
+The rows of the project are copied to the target shard in one transaction.
+The shard directory is then switched over and the rows are purged from the
+source shard. Changes made to the project while it is copied are lost, so
+the project should be idle during the move.
+"""
+
+from django.db import transaction
+
+from apps.projects.cache import bump_project_version
+from apps.projects.models import Project, ProjectMembership, ShardDirectory
+from trello_backend import sharding
+
+from . import purge
+from .models import ArchivedTask, Task, TaskComment, TaskList
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _copy_rows(queryset, target, batch_size):
+    """Insert the rows of ``queryset`` unchanged on ``target``"""
+    model = queryset.model
+    stamped = [
+        field.attname
+        for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+    manager = model._base_manager.db_manager(target)
+    copied = 0
+    for batch in _batches(queryset.iterator(chunk_size=batch_size), batch_size):
+        stamps = [[getattr(obj, name) for name in stamped] for obj in batch]
+        manager.bulk_create(batch)
+        if stamped:
+            # bulk_create replaced the timestamps with the current time
+            for obj, values in zip(batch, stamps):
+                for name, value in zip(stamped, values):
+                    setattr(obj, name, value)
+            manager.bulk_update(batch, stamped)
+        copied += len(batch)
+    return copied
+
+
+def move_project(project_id, target, batch_size=None):
+    """
+    Move project ``project_id`` and all its rows to the shard ``target``.
+
+    Returns the number of rows copied per model, empty if the project already
+    is on ``target``.
+    """
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    source = sharding.shard_for_project(project_id)
+    if source == target:
+        return {}
+
+    Assignee = Task.assignees.through
+    tables = [
+        (Project, {"pk": project_id}),
+        (ProjectMembership, {"project_id": project_id}),
+        (TaskList, {"project_id": project_id}),
+        (Task, {"task_list__project_id": project_id}),
+        (Assignee, {"task__task_list__project_id": project_id}),
+        (TaskComment, {"task__task_list__project_id": project_id}),
+        (ArchivedTask, {"task_list__project_id": project_id}),
+    ]
+    copied = {}
+    with transaction.atomic(using=target):
+        for model, lookup in tables:
+            queryset = model._base_manager.using(source).filter(**lookup)
+            copied[model._meta.label] = _copy_rows(queryset, target, batch_size)
+
+    ShardDirectory.objects.filter(project_id=project_id).update(shard=target)
+    sharding.forget_project(project_id)
+    bump_project_version(project_id)
+
+    with sharding.use_shard(source):
+        purge.purge_project(project_id, remove_from_directory=False)
+    return copied
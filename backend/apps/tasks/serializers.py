@@ -1,7 +1,10 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db import models
+from django.db.models import prefetch_related_objects
 
-from .models import TaskList, Task, TaskComment
+from .fragments import fragment_keys, get_fragments, set_fragments
+from .models import TaskList, Task, TaskComment, ArchivedTask
 from apps.projects.models import Project
 
 User = get_user_model()
@@ -10,15 +13,22 @@ User = get_user_model()
 class TaskListSerializer(serializers.ModelSerializer):
     """Serializer for TaskList model"""
     
-    tasks_count = serializers.ReadOnlyField(source='get_tasks_count')
+    tasks_count = serializers.SerializerMethodField()
     project_name = serializers.ReadOnlyField(source='project.name')
     
     class Meta:
         model = TaskList
         fields = [
             'id', 'name', 'project', 'project_name', 'position', 
-            'is_archived', 'tasks_count', 'created_at', 'updated_at'        ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+            'is_archived', 'tasks_count', 'created_at', 'updated_at',
+            'deleted_at', 'version'
+        ]
+        read_only_fields = ['id', 'created_at', 'updated_at', 'deleted_at']
+
+    def get_tasks_count(self, obj):
+        if hasattr(obj, 'tasks_count'):
+            return obj.tasks_count
+        return obj.get_tasks_count()
 
     def validate_project(self, value):
         """Validate that user can edit the project"""
@@ -68,9 +78,11 @@ class TaskCommentSerializer(serializers.ModelSerializer):
         model = TaskComment
         fields = [
             'id', 'task', 'author', 'author_email', 'author_name',
-            'content', 'created_at', 'updated_at', 'is_edited'
+            'content', 'created_at', 'updated_at', 'is_edited', 'deleted_at'
+        ]
+        read_only_fields = [
+            'id', 'author', 'created_at', 'updated_at', 'is_edited', 'deleted_at'
         ]
-        read_only_fields = ['id', 'author', 'created_at', 'updated_at', 'is_edited']
     
     def get_author_name(self, obj):
         """Get author's display name"""
@@ -86,6 +98,50 @@ class TaskCommentSerializer(serializers.ModelSerializer):
         return value
 
 
+class TaskFragmentListSerializer(serializers.ListSerializer):
+    """
+    Serializes many tasks, reusing cached cards of tasks that did not change.
+
+    Fields that change without touching the task's ``updated_at`` (position
+    shifts, trash, renamed lists and projects, the overdue flag, the version)
+    are always read from the instance.
+    """
+
+    live_fields = [
+        'task_list', 'task_list_name', 'project_name', 'position',
+        'is_overdue', 'deleted_at', 'version'
+    ]
+
+    def to_representation(self, data):
+        tasks = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        if not tasks:
+            return []
+        keys = fragment_keys(tasks, type(self.child).__name__)
+        fragments = get_fragments(keys.values())
+
+        missing = [task for task in tasks if keys[task.pk] not in fragments]
+        if missing:
+            prefetch_related_objects(missing, 'assignees', 'creator')
+            fresh = {keys[task.pk]: self.child.to_representation(task) for task in missing}
+            set_fragments(fresh)
+            fragments.update(fresh)
+
+        return [
+            {**fragments[keys[task.pk]], **self.get_live_fields(task)}
+            for task in tasks
+        ]
+
+    def get_live_fields(self, task):
+        data = {}
+        for name in self.live_fields:
+            field = self.child.fields.get(name)
+            if field is None:
+                continue
+            attribute = field.get_attribute(task)
+            data[name] = None if attribute is None else field.to_representation(attribute)
+        return data
+
+
 class TaskSerializer(serializers.ModelSerializer):
     """Serializer for Task model"""
     
@@ -107,10 +163,14 @@ class TaskSerializer(serializers.ModelSerializer):
             'project_name', 'position', 'priority', 'label_color',
             'assignees', 'assignees_count', 'creator', 'creator_email',
             'due_date', 'is_completed', 'is_archived', 'is_overdue',
-            'created_at', 'updated_at', 'completed_at'        ]
+            'created_at', 'updated_at', 'completed_at', 'archived_at',
+            'deleted_at', 'version'
+        ]
         read_only_fields = [
-            'id', 'creator', 'created_at', 'updated_at', 'completed_at'
+            'id', 'creator', 'created_at', 'updated_at', 'completed_at',
+            'archived_at', 'deleted_at'
         ]
+        list_serializer_class = TaskFragmentListSerializer
 
     def validate_task_list(self, value):
         """Validate that user can create tasks in this list"""
@@ -189,6 +249,8 @@ class TaskDetailSerializer(TaskSerializer):
     
     class Meta(TaskSerializer.Meta):
         fields = TaskSerializer.Meta.fields + ['comments', 'assignees_details']
+        # Comment authors' details are not covered by the fragment versions
+        list_serializer_class = serializers.ListSerializer
     
     def get_assignees_details(self, obj):
         """Get detailed assignee information"""
@@ -202,6 +264,26 @@ class TaskDetailSerializer(TaskSerializer):
         ]
 
 
+class ArchivedTaskSerializer(serializers.ModelSerializer):
+    """Serializer for tasks kept in cold storage"""
+
+    task_list_name = serializers.ReadOnlyField(source='task_list.name')
+    project = serializers.ReadOnlyField(source='task_list.project_id')
+    project_name = serializers.ReadOnlyField(source='task_list.project.name')
+    creator_email = serializers.ReadOnlyField(source='creator.email')
+
+    class Meta:
+        model = ArchivedTask
+        fields = [
+            'id', 'title', 'description', 'task_list', 'task_list_name',
+            'project', 'project_name', 'priority', 'label_color',
+            'assignee_ids', 'creator', 'creator_email', 'due_date',
+            'is_completed', 'completed_at', 'comments', 'created_at',
+            'updated_at', 'archived_at', 'moved_at'
+        ]
+        read_only_fields = fields
+
+
 class TaskMoveSerializer(serializers.Serializer):
     """Serializer for moving tasks between lists"""
     
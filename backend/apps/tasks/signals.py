@@ -0,0 +1,69 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from apps.projects.cache import bump_project_version
+from apps.projects.models import Project
+from trello_backend import activity
+
+from .fragments import bump_assignees_version, bump_comments_version
+from .models import Task, TaskComment, TaskList
+
+
+def project_changed(project_id):
+    bump_project_version(project_id)
+    activity.record(Project, "last_activity_at", project_id)
+
+
+@receiver([post_save, post_delete], sender=TaskList)
+def task_list_changed(sender, instance, **kwargs):
+    project_changed(instance.project_id)
+
+
+@receiver([post_save, post_delete], sender=Task)
+def task_changed(sender, instance, **kwargs):
+    if Task.task_list.is_cached(instance):
+        project_id = instance.task_list.project_id
+    else:
+        project_id = (
+            TaskList.all_objects.filter(id=instance.task_list_id)
+            .values_list("project_id", flat=True)
+            .first()
+        )
+    project_changed(project_id)
+
+
+@receiver(m2m_changed, sender=Task.assignees.through)
+def assignees_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == "pre_clear":
+        # Clearing from the user side does not report which tasks changed
+        instance._cleared_task_ids = list(
+            instance.assigned_tasks.values_list("pk", flat=True)
+        )
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        task_ids = [instance.pk]
+    elif action == "post_clear":
+        task_ids = instance.__dict__.pop("_cleared_task_ids", [])
+    else:
+        task_ids = list(pk_set)
+
+    bump_assignees_version(task_ids)
+    for project_id in (
+        Task.all_objects.filter(pk__in=task_ids)
+        .order_by()
+        .values_list("task_list__project_id", flat=True)
+        .distinct()
+    ):
+        project_changed(project_id)
+
+
+@receiver([post_save, post_delete], sender=TaskComment)
+def comment_changed(sender, instance, **kwargs):
+    bump_comments_version([instance.task_id])
+    project_changed(
+        Task.all_objects.filter(id=instance.task_id)
+        .values_list("task_list__project_id", flat=True)
+        .first()
+    )
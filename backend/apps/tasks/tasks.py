@@ -0,0 +1,75 @@
+from celery import shared_task
+
+from apps.projects.models import Project
+from trello_backend import sharding
+
+from . import archive, ordering, purge
+from .duplication import copy_board
+
+
+@shared_task
+def duplicate_board(
+    source_id, target_id, include_assignees=False, include_comments=False
+):
+    """Copy a large board in the background"""
+    with sharding.use_shard(sharding.shard_for_project(source_id)):
+        copy_board(
+            source_id,
+            target_id,
+            include_assignees=include_assignees,
+            include_comments=include_comments,
+        )
+
+
+@shared_task
+def purge_project(project_id):
+    """Remove a deleted project and its children in chunks"""
+    with sharding.use_shard(sharding.shard_for_project(project_id)):
+        purge.purge_project(project_id)
+
+
+@shared_task
+def purge_deleted_projects():
+    """Finish project purges that were interrupted, e.g. by a worker restart"""
+    for shard in sharding.each_shard():
+        with sharding.use_shard(shard):
+            for project_id in Project.all_objects.filter(
+                deleted_at__isnull=False
+            ).values_list("id", flat=True):
+                purge.purge_project(project_id)
+
+
+@shared_task
+def purge_expired_trash():
+    """Delete lists, tasks and comments kept in the trash for too long"""
+    for shard in sharding.each_shard():
+        with sharding.use_shard(shard):
+            purge.purge_expired_trash()
+
+
+@shared_task
+def move_archived_tasks():
+    """Move tasks archived for a long time to cold storage"""
+    moved = 0
+    for shard in sharding.each_shard():
+        with sharding.use_shard(shard):
+            moved += archive.move_archived_tasks()
+    return moved
+
+
+@shared_task
+def compact_task_list(shard, task_list_id):
+    """Renumber the tasks of a list that has built up gaps"""
+    return ordering.compact_task_list(shard, task_list_id)
+
+
+@shared_task
+def compact_project(shard, project_id):
+    """Renumber the lists of a board that has built up gaps"""
+    return ordering.compact_project(shard, project_id)
+
+
+@shared_task
+def compact_positions():
+    """Compact the lists and boards whose gaps were not caught when made"""
+    return sum(ordering.compact_fragmented(shard) for shard in sharding.each_shard())
@@ -1,4 +1,6 @@
-from django.test import TestCase
+from io import StringIO
+
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
 from django.contrib.auth import get_user_model
 from apps.projects.models import Project
 from .models import TaskList, Task, TaskComment
@@ -63,3 +65,723 @@ class TaskModelTest(TestCase):
         Task.objects.create(title='Task 2', task_list=self.task_list, creator=self.user, position=1)
         final_count = Task.objects.count()
         self.assertEqual(final_count, initial_count + 2)
+
+    def test_task_ids_follow_creation_order(self):
+        """Primary keys are time-ordered uuid7 values"""
+        tasks = [
+            Task.objects.create(
+                title=f'Task {i}', task_list=self.task_list, creator=self.user, position=i
+            )
+            for i in range(20)
+        ]
+        self.assertTrue(all(task.id.version == 7 for task in tasks))
+        self.assertEqual(
+            list(Task.objects.order_by('id').values_list('id', flat=True)),
+            [task.id for task in tasks],
+        )
+
+    def test_changes_record_project_activity(self):
+        from trello_backend import activity
+
+        Task.objects.create(title='Active', task_list=self.task_list, creator=self.user)
+        self.project.refresh_from_db()
+        self.assertIsNone(self.project.last_activity_at)
+
+        activity.flush()
+        self.project.refresh_from_db()
+        self.assertIsNotNone(self.project.last_activity_at)
+
+
+class TrashTest(TestCase):
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        self.user = User.objects.create_user(email='test@example.com', password='testpass')
+        self.project = Project.objects.create(name='Test Project', owner=self.user)
+        self.task_list = TaskList.objects.create(name='Test List', project=self.project, position=0)
+        self.task = Task.objects.create(
+            title='Task', task_list=self.task_list, creator=self.user, position=0
+        )
+        self.comment = TaskComment.objects.create(task=self.task, author=self.user, content='Hi')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_deleted_list_goes_to_trash(self):
+        """Deleted lists are hidden, listed in the trash and can be restored"""
+        response = self.client.delete(f'/api/tasks/task-lists/{self.task_list.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(TaskList.objects.filter(id=self.task_list.id).exists())
+        self.assertEqual(self.client.get(f'/api/tasks/tasks/{self.task.id}/').status_code, 404)
+
+        trash = self.client.get('/api/tasks/task-lists/trash/', {'project': self.project.id})
+        self.assertEqual([item['id'] for item in trash.data['results']], [str(self.task_list.id)])
+
+        # The position of a list in the trash can be reused; restoring moves it last
+        TaskList.objects.create(name='New List', project=self.project, position=0)
+        response = self.client.post(f'/api/tasks/task-lists/{self.task_list.id}/restore/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['position'], 1)
+        self.assertEqual(self.client.get(f'/api/tasks/tasks/{self.task.id}/').status_code, 200)
+
+    def test_deleted_task_and_comment_go_to_trash(self):
+        """Tasks and comments are soft deleted and restorable"""
+        self.client.delete(f'/api/tasks/task-comments/{self.comment.id}/')
+        self.client.delete(f'/api/tasks/tasks/{self.task.id}/')
+        self.assertFalse(Task.objects.filter(id=self.task.id).exists())
+        self.assertEqual(self.task_list.get_tasks_count(), 0)
+
+        trash = self.client.get('/api/tasks/tasks/trash/')
+        self.assertEqual([item['id'] for item in trash.data['results']], [str(self.task.id)])
+        # Comments of a task in the trash are hidden with it
+        self.assertEqual(self.client.get('/api/tasks/task-comments/trash/').data['count'], 0)
+
+        self.client.post(f'/api/tasks/tasks/{self.task.id}/restore/')
+        self.client.post(f'/api/tasks/task-comments/{self.comment.id}/restore/')
+        self.assertEqual(TaskComment.objects.filter(task=self.task).count(), 1)
+
+    def test_viewers_cannot_trash_items(self):
+        from rest_framework.test import APIClient
+        from apps.projects.models import ProjectMembership
+
+        viewer = User.objects.create_user(email='viewer@example.com', password='testpass')
+        ProjectMembership.objects.create(
+            project=self.project, user=viewer, role=ProjectMembership.VIEWER
+        )
+        client = APIClient()
+        client.force_authenticate(viewer)
+        response = client.delete(f'/api/tasks/tasks/{self.task.id}/')
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(Task.objects.filter(id=self.task.id).exists())
+
+    def test_expired_trash_is_purged(self):
+        """The beat job deletes items older than the retention period"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from .tasks import purge_expired_trash
+
+        other_list = TaskList.objects.create(name='Other', project=self.project, position=1)
+        other_list.soft_delete()
+        self.comment.soft_delete()
+        self.task.soft_delete()
+        TaskList.all_objects.filter(id=other_list.id).update(
+            deleted_at=timezone.now() - timedelta(days=60)
+        )
+        Task.all_objects.filter(id=self.task.id).update(
+            deleted_at=timezone.now() - timedelta(days=60)
+        )
+
+        purge_expired_trash.delay()
+        self.assertFalse(TaskList.all_objects.filter(id=other_list.id).exists())
+        self.assertFalse(Task.all_objects.filter(id=self.task.id).exists())
+        self.assertFalse(TaskComment.all_objects.exists())
+        self.assertTrue(TaskList.objects.filter(id=self.task_list.id).exists())
+
+
+class ColdStorageTest(TestCase):
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        self.user = User.objects.create_user(email='test@example.com', password='testpass')
+        self.project = Project.objects.create(name='Test Project', owner=self.user)
+        self.task_list = TaskList.objects.create(name='Test List', project=self.project, position=0)
+        self.task = Task.objects.create(
+            title='Old task', task_list=self.task_list, creator=self.user, position=0,
+            is_archived=True
+        )
+        self.task.assignees.add(self.user)
+        TaskComment.objects.create(task=self.task, author=self.user, content='Done')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_old_archived_tasks_move_to_cold_storage(self):
+        """Long-archived tasks are moved out of the task table and can be restored"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from .tasks import move_archived_tasks
+
+        recent = Task.objects.create(
+            title='Recent', task_list=self.task_list, creator=self.user, position=1,
+            is_archived=True
+        )
+        Task.objects.filter(id=self.task.id).update(
+            archived_at=timezone.now() - timedelta(days=60)
+        )
+
+        self.assertEqual(move_archived_tasks.delay().get(), 1)
+        self.assertFalse(Task.objects.filter(id=self.task.id).exists())
+        self.assertTrue(Task.objects.filter(id=recent.id).exists())
+
+        response = self.client.get('/api/tasks/archive/', {'search': 'Old'})
+        self.assertEqual(response.data['count'], 1)
+        item = response.data['results'][0]
+        self.assertEqual(item['assignee_ids'], [str(self.user.id)])
+        self.assertEqual(item['comments'][0]['content'], 'Done')
+
+        response = self.client.post(f'/api/tasks/archive/{self.task.id}/restore/')
+        self.assertEqual(response.status_code, 200)
+        task = Task.objects.get(id=self.task.id)
+        self.assertEqual(task.position, 2)
+        self.assertFalse(task.is_archived)
+        self.assertEqual(list(task.assignees.all()), [self.user])
+        self.assertEqual(task.comments.get().content, 'Done')
+        self.assertEqual(self.client.get('/api/tasks/archive/').data['count'], 0)
+
+
+class IndexUsageTest(TestCase):
+    """The planner picks the partial indexes for the hot board queries"""
+
+    def setUp(self):
+        from django.db import connection
+
+        self.user = User.objects.create_user(email='test@example.com', password='testpass')
+        self.project = Project.objects.create(name='Test Project', owner=self.user)
+        self.task_list = TaskList.objects.create(name='Test List', project=self.project, position=0)
+        if connection.vendor == 'postgresql':
+            # Tiny test tables are otherwise always read sequentially
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+    def test_board_lists(self):
+        queryset = TaskList.objects.filter(
+            project=self.project, is_archived=False
+        ).order_by('position', 'created_at')
+        self.assertUsesIndex(queryset, 'unique_live_task_list_position')
+
+    def test_board_tasks(self):
+        queryset = self.task_list.tasks.filter(is_archived=False).order_by('position', 'created_at')
+        self.assertUsesIndex(queryset, 'task_board_idx')
+
+    def test_open_tasks_by_due_date(self):
+        queryset = Task.objects.filter(
+            is_completed=False, due_date__isnull=False
+        ).order_by('due_date')
+        self.assertUsesIndex(queryset, 'task_open_due_idx')
+
+
+class TaskFragmentCacheTest(TestCase):
+    """Board reads only re-serialize the cards that changed"""
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+        from trello_backend import metrics
+
+        self.user = User.objects.create_user(email='test@example.com', password='testpass')
+        self.other = User.objects.create_user(email='other@example.com', password='testpass')
+        self.project = Project.objects.create(name='Test Project', owner=self.user)
+        self.project.members.add(self.other)
+        self.task_list = TaskList.objects.create(name='Test List', project=self.project, position=0)
+        self.tasks = [
+            Task.objects.create(
+                title=f'Task {i}', task_list=self.task_list, creator=self.user, position=i
+            )
+            for i in range(3)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        metrics.reset()
+
+    def get_tasks(self):
+        from trello_backend import metrics
+
+        metrics.reset()
+        response = self.client.get('/api/tasks/tasks/', {'task_list': self.task_list.id})
+        return response.data['results'], metrics.snapshot()
+
+    def test_only_changed_cards_are_serialized(self):
+        results, counters = self.get_tasks()
+        self.assertEqual(counters['cache.task_fragment.misses'], 3)
+
+        self.tasks[0].assignees.add(self.other)
+        Task.objects.filter(id=self.tasks[1].id).update(position=10)
+        results, counters = self.get_tasks()
+        self.assertEqual(counters['cache.task_fragment.hits'], 2)
+        self.assertEqual(counters['cache.task_fragment.misses'], 1)
+        by_id = {item['id']: item for item in results}
+        self.assertEqual(by_id[str(self.tasks[0].id)]['assignees'], [self.other.id])
+        # Positions are read from the row even for cached cards
+        self.assertEqual(by_id[str(self.tasks[1].id)]['position'], 10)
+
+    def test_local_tier_evicts_least_recently_used(self):
+        from .fragments import LRUCache
+
+        cache = LRUCache(2)
+        cache.set_many({'a': 1, 'b': 2})
+        cache.get_many(['a'])
+        cache.set_many({'c': 3})
+        self.assertEqual(cache.get_many(['a', 'b', 'c']), {'a': 1, 'c': 3})
+
+
+class AsyncReadTest(TestCase):
+    """Async read endpoints return the same data as the DRF ones"""
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        self.user = User.objects.create_user(email='test@example.com', password='testpass')
+        self.project = Project.objects.create(name='Test Project', owner=self.user)
+        self.task_list = TaskList.objects.create(name='Test List', project=self.project, position=0)
+        self.task = Task.objects.create(
+            title='Task', task_list=self.task_list, creator=self.user, position=0
+        )
+        self.task.assignees.add(self.user)
+        TaskComment.objects.create(task=self.task, author=self.user, content='Hi')
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.user)}'}
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def get_async(self, url):
+        from django.core.cache import cache
+        from .fragments import local_cache
+
+        # Serialize from the rows, not from cards cached by the sync request
+        cache.clear()
+        local_cache.clear()
+        return self.client.get(url, **self.auth)
+
+    def assertSameResults(self, sync_url, async_url):
+        import json
+
+        expected = json.loads(self.api.get(sync_url).content)
+        response = self.get_async(async_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], expected['results'])
+
+    def test_reads_match_sync_endpoints(self):
+        import json
+
+        self.assertSameResults('/api/projects/', '/api/async/projects/')
+        self.assertSameResults(
+            f'/api/tasks/tasks/?task_list={self.task_list.id}',
+            f'/api/async/tasks/tasks/?task_list={self.task_list.id}'
+        )
+        self.assertSameResults(
+            f'/api/tasks/task-comments/?task={self.task.id}',
+            f'/api/async/tasks/task-comments/?task={self.task.id}'
+        )
+        board = json.loads(self.api.get(f'/api/tasks/task-lists/?project={self.project.id}').content)
+        response = self.get_async(f'/api/async/tasks/board/{self.project.id}/')
+        self.assertEqual(response.json(), board['results'])
+
+    def test_requires_token_and_membership(self):
+        self.assertEqual(self.client.get('/api/async/projects/').status_code, 401)
+        other = User.objects.create_user(email='other@example.com', password='testpass')
+        from rest_framework_simplejwt.tokens import AccessToken
+        response = self.client.get(
+            f'/api/async/tasks/board/{self.project.id}/',
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(other)}'
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class ThrottlingTest(TestCase):
+    """Writes are limited per user and per project with a token bucket"""
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        self.user = User.objects.create_user(email='test@example.com', password='testpass')
+        self.project = Project.objects.create(name='Test Project', owner=self.user)
+        self.task_list = TaskList.objects.create(name='Test List', project=self.project, position=0)
+        self.task = Task.objects.create(
+            title='Task', task_list=self.task_list, creator=self.user, position=0
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def rates(self, **rates):
+        from django.conf import settings
+        from django.test import override_settings
+
+        return override_settings(
+            REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates}
+        )
+
+    def test_user_writes_are_throttled(self):
+        from trello_backend import metrics
+
+        throttled = metrics.get('throttle.writes.throttled')
+        with self.rates(writes='2/min'):
+            for _ in range(2):
+                response = self.client.patch(f'/api/tasks/tasks/{self.task.id}/', {'title': 'Renamed'})
+                self.assertEqual(response.status_code, 200)
+            response = self.client.patch(f'/api/tasks/tasks/{self.task.id}/', {'title': 'Again'})
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response['Retry-After'], '30')
+            self.assertEqual(metrics.get('throttle.writes.throttled'), throttled + 1)
+
+            # Reads are not throttled
+            self.assertEqual(self.client.get(f'/api/tasks/tasks/{self.task.id}/').status_code, 200)
+
+    def test_project_writes_are_shared_by_its_users(self):
+        from rest_framework.test import APIClient
+
+        from apps.projects.models import ProjectMembership
+
+        other = User.objects.create_user(email='other@example.com', password='testpass')
+        ProjectMembership.objects.create(project=self.project, user=other, role=ProjectMembership.EDITOR)
+        other_client = APIClient()
+        other_client.force_authenticate(other)
+
+        with self.rates(writes='100/min', project_writes='2/min'):
+            url = f'/api/tasks/tasks/{self.task.id}/'
+            self.assertEqual(self.client.patch(url, {'title': 'One'}).status_code, 200)
+            self.assertEqual(other_client.patch(url, {'title': 'Two'}).status_code, 200)
+            self.assertEqual(other_client.patch(url, {'title': 'Three'}).status_code, 429)
+
+
+class IdempotencyTest(TestCase):
+    """Requests retried with the same Idempotency-Key are answered from the first one"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from rest_framework.test import APIClient
+
+        cache.clear()
+        self.user = User.objects.create_user(email='test@example.com', password='testpass')
+        self.project = Project.objects.create(name='Test Project', owner=self.user)
+        self.task_list = TaskList.objects.create(name='Test List', project=self.project, position=0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create(self, title, key):
+        return self.client.post(
+            '/api/tasks/tasks/',
+            {'title': title, 'task_list': str(self.task_list.id)},
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_retried_create_is_replayed(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        first = self.create('Card', 'retry-1')
+        self.assertEqual(first.status_code, 201)
+        with CaptureQueriesContext(connection) as queries:
+            retry = self.create('Card', 'retry-1')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.data, first.data)
+        self.assertFalse([q for q in queries if not q['sql'].startswith('SELECT')])
+        self.assertEqual(Task.objects.filter(title='Card').count(), 1)
+
+        # A new key creates a new card
+        self.assertEqual(self.create('Card', 'retry-2').status_code, 201)
+        self.assertEqual(Task.objects.filter(title='Card').count(), 2)
+
+    def test_key_reused_with_another_body(self):
+        self.assertEqual(self.create('Card', 'retry-1').status_code, 201)
+        self.assertEqual(self.create('Other', 'retry-1').status_code, 422)
+
+    def test_retried_move_is_replayed(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        task = Task.objects.create(
+            title='Card', task_list=self.task_list, creator=self.user, position=0
+        )
+        other = TaskList.objects.create(name='Other', project=self.project, position=1)
+
+        def move():
+            return self.client.post(
+                f'/api/tasks/tasks/{task.id}/move/',
+                {'target_list': str(other.id), 'new_position': 0},
+                HTTP_IDEMPOTENCY_KEY='move-1',
+            )
+
+        first = move()
+        self.assertEqual(first.status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            retry = move()
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.data, first.data)
+        self.assertFalse([q for q in queries if not q['sql'].startswith('SELECT')])
+
+
+class TaskOrderingTest(TestCase):
+    """Positions stay dense and unique through creates and moves"""
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        self.user = User.objects.create_user(email='test@example.com', password='testpass')
+        self.project = Project.objects.create(name='Test Project', owner=self.user)
+        self.list_a = TaskList.objects.create(name='A', project=self.project, position=0)
+        self.list_b = TaskList.objects.create(name='B', project=self.project, position=1)
+        self.tasks = [
+            Task.objects.create(title=f'A{i}', task_list=self.list_a, creator=self.user, position=i)
+            for i in range(5)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def titles(self, task_list):
+        tasks = Task.objects.filter(task_list=task_list).order_by('position')
+        self.assertEqual(
+            list(tasks.values_list('position', flat=True)), list(range(tasks.count()))
+        )
+        return list(tasks.values_list('title', flat=True))
+
+    def move(self, task, task_list, position):
+        return self.client.post(
+            f'/api/tasks/tasks/{task.id}/move/',
+            {'target_list': str(task_list.id), 'new_position': position},
+        )
+
+    def test_moves_keep_positions_dense(self):
+        a0, a1, a2, a3, a4 = self.tasks
+        self.assertEqual(self.move(a0, self.list_a, 3).status_code, 200)
+        self.assertEqual(self.titles(self.list_a), ['A1', 'A2', 'A3', 'A0', 'A4'])
+        self.move(a4, self.list_a, 0)
+        self.assertEqual(self.titles(self.list_a), ['A4', 'A1', 'A2', 'A3', 'A0'])
+        # Past the end means last
+        self.move(a1, self.list_a, 99)
+        self.assertEqual(self.titles(self.list_a), ['A4', 'A2', 'A3', 'A0', 'A1'])
+
+        self.move(a2, self.list_b, 5)
+        self.move(a3, self.list_b, 0)
+        self.assertEqual(self.titles(self.list_a), ['A4', 'A0', 'A1'])
+        self.assertEqual(self.titles(self.list_b), ['A3', 'A2'])
+
+        self.client.patch(f'/api/tasks/tasks/{a0.id}/', {'task_list': str(self.list_b.id)})
+        self.client.post(
+            '/api/tasks/tasks/',
+            {'title': 'New', 'task_list': str(self.list_a.id), 'position': 0},
+        )
+        self.assertEqual(self.titles(self.list_a), ['New', 'A4', 'A1'])
+        self.assertEqual(self.titles(self.list_b), ['A3', 'A2', 'A0'])
+
+    def test_moves_lock_both_lists_first_in_id_order(self):
+        from unittest import mock
+
+        from django.db import connection
+        from django.db.models.query import QuerySet
+        from django.test.utils import CaptureQueriesContext
+
+        from .ordering import move_task
+
+        locked = []
+        select_for_update = QuerySet.select_for_update
+
+        def record_lock(queryset, *args, **kwargs):
+            locked.append(queryset.model)
+            return select_for_update(queryset, *args, **kwargs)
+
+        with mock.patch.object(QuerySet, 'select_for_update', record_lock), \
+                CaptureQueriesContext(connection) as queries:
+            move_task(self.tasks[0], self.list_b, 0)
+        self.assertEqual(locked, [TaskList])
+
+        # SQLite ignores FOR UPDATE, so check the order of the statements instead:
+        # one query selects both lists sorted by id before any row is read or moved
+        statements = [q['sql'] for q in queries if not q['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+        lock = statements[0]
+        self.assertTrue(lock.startswith('SELECT "tasks_tasklist"."id" AS "pk" FROM "tasks_tasklist"'))
+        self.assertTrue(lock.endswith('ORDER BY 1 ASC'))
+        for task_list in (self.list_a, self.list_b):
+            self.assertIn(task_list.id.hex, lock)
+
+    def test_restored_task_goes_last_if_its_position_was_taken(self):
+        self.tasks[0].soft_delete()
+        self.move(self.tasks[4], self.list_a, 0)
+        self.tasks[0].restore()
+        self.assertEqual(self.tasks[0].position, 5)
+        self.assertEqual(
+            Task.objects.filter(task_list=self.list_a, position=0).get().title, 'A4'
+        )
+
+
+class ConcurrentMoveTest(TransactionTestCase):
+    """Concurrent moves on one list keep positions dense and unique"""
+
+    # Needs real row locks: runs against PostgreSQL, is skipped on SQLite, where
+    # TaskOrderingTest checks the locking order instead
+    @skipUnlessDBFeature('has_select_for_update')
+    def test_stress_moves(self):
+        from django.core.management import call_command
+
+        # Fails with CommandError when the positions end up broken
+        call_command('stress_task_moves', tasks=20, threads=4, moves=25, stdout=StringIO())
+
+
+class PositionCompactionTest(TestCase):
+    """Gaps left by removed items are compacted away"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='test@example.com', password='testpass')
+        self.project = Project.objects.create(name='Test Project', owner=self.user)
+        self.task_list = TaskList.objects.create(name='A', project=self.project, position=0)
+        self.tasks = [
+            Task.objects.create(
+                title=f'T{i}', task_list=self.task_list, creator=self.user, position=i * 3
+            )
+            for i in range(5)
+        ]
+
+    def positions(self):
+        return list(
+            Task.objects.filter(task_list=self.task_list)
+            .order_by('position')
+            .values_list('title', 'position')
+        )
+
+    def test_sweep_renumbers_lists_with_gaps(self):
+        from django.core.management import call_command
+
+        call_command('compact_positions', stdout=StringIO())
+        self.assertEqual(self.positions(), [(f'T{i}', i) for i in range(5)])
+
+    def test_deleting_past_the_threshold_compacts_the_list(self):
+        from django.test import override_settings
+        from rest_framework.test import APIClient
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with override_settings(POSITION_GAP_THRESHOLD=20):
+            client.delete(f'/api/tasks/tasks/{self.tasks[0].id}/')
+            self.assertEqual(self.positions()[0], ('T1', 3))
+        with override_settings(POSITION_GAP_THRESHOLD=10):
+            with self.captureOnCommitCallbacks(execute=True):
+                client.delete(f'/api/tasks/tasks/{self.tasks[1].id}/')
+        self.assertEqual(self.positions(), [('T2', 0), ('T3', 1), ('T4', 2)])
+
+    def test_compaction_refreshes_the_cached_board(self):
+        from rest_framework.test import APIClient
+        from apps.tasks.ordering import compact_project
+
+        TaskList.objects.create(name='B', project=self.project, position=4)
+        TaskList.objects.create(name='C', project=self.project, position=9)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = f'/api/tasks/task-lists/?project={self.project.id}'
+
+        def board():
+            data = client.get(url).data
+            return [(item['name'], item['position']) for item in data.get('results', data)]
+
+        self.assertEqual(board(), [('A', 0), ('B', 4), ('C', 9)])
+        with self.captureOnCommitCallbacks(execute=True):
+            compact_project('default', self.project.id)
+        self.assertEqual(board(), [('A', 0), ('B', 1), ('C', 2)])
+
+
+class VersioningTest(TestCase):
+    """Writes made against an outdated version are refused with 409"""
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        self.user = User.objects.create_user(email='test@example.com', password='testpass')
+        self.project = Project.objects.create(name='Test Project', owner=self.user)
+        self.task_list = TaskList.objects.create(name='A', project=self.project, position=0)
+        self.task = Task.objects.create(
+            title='Card', task_list=self.task_list, creator=self.user, position=0
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/tasks/tasks/{self.task.id}/'
+
+    def test_stale_if_match_is_refused(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['version'], 1)
+        self.assertEqual(response['ETag'], '"1"')
+
+        response = self.client.patch(self.url, {'title': 'Mine'}, HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['version'], 2)
+
+        response = self.client.patch(self.url, {'title': 'Theirs'}, HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 409)
+        response = self.client.patch(self.url, {'title': 'Theirs', 'version': 1})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Task.objects.get(pk=self.task.pk).title, 'Mine')
+
+        response = self.client.patch(
+            f'/api/projects/{self.project.id}/', {'name': 'Renamed'}, HTTP_IF_MATCH='"7"'
+        )
+        self.assertEqual(response.status_code, 409)
+
+    def test_concurrent_save_is_checked_by_the_update(self):
+        from django.db import connection, transaction
+        from django.test.utils import CaptureQueriesContext
+        from trello_backend.versioning import StaleVersion
+
+        first = Task.objects.get(pk=self.task.pk)
+        second = Task.objects.get(pk=self.task.pk)
+        first.title = 'First'
+        first.expected_version = 1
+        with CaptureQueriesContext(connection) as queries:
+            first.save()
+        # The version is checked by the UPDATE itself, without reading the row
+        task_queries = [q['sql'] for q in queries if '"tasks_task"' in q['sql']]
+        self.assertEqual(len(task_queries), 1)
+        self.assertTrue(task_queries[0].startswith('UPDATE'))
+        self.assertEqual(first.version, 2)
+
+        second.title = 'Second'
+        second.expected_version = 1
+        with self.assertRaises(StaleVersion), transaction.atomic():
+            second.save()
+        self.assertEqual(second.version, 1)
+        self.assertEqual(Task.objects.get(pk=self.task.pk).title, 'First')
+
+    def test_move_with_changes_is_one_write(self):
+        other = Task.objects.create(
+            title='Other', task_list=self.task_list, creator=self.user, position=1
+        )
+        response = self.client.patch(
+            self.url, {'title': 'Moved', 'position': 1}, HTTP_IF_MATCH='"1"'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['version'], 2)
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.title, self.task.position), ('Moved', 1))
+        other.refresh_from_db()
+        self.assertEqual(other.position, 0)
+
+    def test_internal_writes_are_not_checked(self):
+        from apps.tasks.ordering import move_task
+
+        stale = Task.objects.get(pk=self.task.pk)
+        Task.objects.get(pk=self.task.pk).save()
+        other_list = TaskList.objects.create(name='B', project=self.project, position=1)
+        move_task(stale, other_list)
+        self.assertEqual(Task.objects.get(pk=self.task.pk).version, 3)
+
+        stale.soft_delete()
+        stale.restore()
+        self.assertEqual(Task.objects.get(pk=self.task.pk).version, 5)
+        self.assertEqual(stale.version, 5)
+
+    def test_shifted_sibling_refuses_stale_write(self):
+        other = Task.objects.create(
+            title='Other', task_list=self.task_list, creator=self.user, position=1
+        )
+        url = f'/api/tasks/tasks/{other.id}/'
+        self.assertEqual(self.client.get(url)['ETag'], '"1"')
+
+        # Moving the first task after it shifts the other one
+        response = self.client.patch(self.url, {'position': 1})
+        self.assertEqual(response.status_code, 200)
+        other.refresh_from_db()
+        self.assertEqual((other.position, other.version), (0, 2))
+
+        response = self.client.patch(url, {'position': 1}, HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 409)
+
+    def test_bulk_update(self):
+        response = self.client.post(
+            '/api/tasks/tasks/bulk_update/',
+            {'task_ids': [str(self.task.id)], 'action': 'complete'},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated_count'], 1)
+        self.task.refresh_from_db()
+        self.assertTrue(self.task.is_completed)
+        self.assertIsNotNone(self.task.completed_at)
+        self.assertEqual(self.task.version, 2)
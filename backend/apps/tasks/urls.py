@@ -6,6 +6,7 @@ router = DefaultRouter()
 router.register(r'task-lists', views.TaskListViewSet, basename='tasklist')
 router.register(r'tasks', views.TaskViewSet, basename='task')
 router.register(r'task-comments', views.TaskCommentViewSet, basename='taskcomment')
+router.register(r'archive', views.ArchivedTaskViewSet, basename='archivedtask')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,30 +1,103 @@
-from django.shortcuts import get_object_or_404
-from django.db import transaction, IntegrityError
-from django.db.models import Q, F, Max
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q, F, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
-import time
-import random
-from rest_framework import viewsets, status, permissions
+from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 
-from .models import TaskList, Task, TaskComment
+from . import ordering
+from .archive import restore_archived_task
+from .models import TaskList, Task, TaskComment, ArchivedTask
 from .serializers import (
     TaskListSerializer, TaskListCreateSerializer, TaskListDetailSerializer,
     TaskSerializer, TaskCreateSerializer, TaskDetailSerializer,
-    TaskCommentSerializer, TaskMoveSerializer, TaskBulkUpdateSerializer
+    TaskCommentSerializer, TaskMoveSerializer, TaskBulkUpdateSerializer,
+    ArchivedTaskSerializer
 )
+from apps.projects.cache import bump_project_version, get_or_build, project_cache_key
 from apps.projects.models import Project
+from trello_backend.mixins import (
+    IdempotencyMixin, ReplicaReadMixin, ShardRoutingMixin, VersionCheckMixin
+)
+
+
+class TrashMixin:
+    """
+    Soft delete, trash listing and restore for board items.
+
+    ``project_lookup`` is the path from an item to its project, e.g.
+    ``'task_list__project'``, used to check edit permissions.
+    """
+
+    project_lookup = 'project'
+
+    def get_base_queryset(self):
+        """Trash actions work on deleted rows, every other action on live ones"""
+        model = self.queryset.model
+        if self.action in ['trash', 'restore']:
+            return model.all_objects.filter(deleted_at__isnull=False)
+        return model.objects.all()
+
+    def get_item_project(self, obj):
+        """Project of ``obj``, following ``project_lookup``"""
+        return reduce(getattr, self.project_lookup.split('__'), obj)
+
+    def can_edit_item(self, item):
+        """Whether the user may move ``item`` to the trash and back"""
+        return self.get_item_project(item).can_edit(self.request.user)
+
+    def destroy(self, request, *args, **kwargs):
+        """Move the item to the trash"""
+        item = self.get_object()
+        if not self.can_edit_item(item):
+            return Response(
+                {'error': 'Permission denied'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        item.soft_delete()
+        self.schedule_compaction(item)
+        bump_project_version(self.get_item_project(item).id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def schedule_compaction(self, item):
+        """Compact the positions ``item`` left behind once enough gaps built up"""
 
-class TaskListViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'])
+    def trash(self, request):
+        """List deleted items that can still be restored"""
+        queryset = self.filter_queryset(self.get_queryset()).order_by('-deleted_at')
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['post'])
+    def restore(self, request, pk=None):
+        """Take an item out of the trash"""
+        item = self.get_object()
+        if not self.can_edit_item(item):
+            return Response(
+                {'error': 'Permission denied'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        item.restore()
+        bump_project_version(self.get_item_project(item).id)
+        return Response(self.get_serializer(item).data)
+
+
+class TaskListViewSet(IdempotencyMixin, VersionCheckMixin, ShardRoutingMixin, ReplicaReadMixin, TrashMixin, viewsets.ModelViewSet):
     """ViewSet for TaskList CRUD operations"""
     
     queryset = TaskList.objects.select_related('project').all()
     permission_classes = [IsAuthenticated]
+    shard_lookups = (('pk', TaskList), ('project', Project))
+    idempotent_actions = ('create', 'reorder')
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['project', 'is_archived']
     search_fields = ['name']
@@ -42,7 +115,7 @@ class TaskListViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """Filter queryset based on user permissions"""
         user = self.request.user
-        return TaskList.objects.select_related('project').filter(
+        return self.get_base_queryset().select_related('project').filter(
             project__in=Project.objects.filter(
                 Q(owner=user) | 
                 Q(members=user)
@@ -50,16 +123,43 @@ class TaskListViewSet(viewsets.ModelViewSet):
         )
 
     def perform_create(self, serializer):
-        """Handle TaskList creation with position management"""
+        """Create the list at its position, shifting the lists after it"""
         project = serializer.validated_data['project']
         position = serializer.validated_data.get('position')
         
+        with transaction.atomic(using=project._state.db):
+            position = ordering.insert_task_list(project, position)
+            serializer.save(position=position)
+
+    def perform_update(self, serializer):
+        """Apply position changes as a reorder"""
+        position = serializer.validated_data.pop('position', None)
+        task_list = serializer.instance
         if position is None:
-            # Auto-assign position at the end
-            last_list = TaskList.objects.filter(project=project).order_by('-position').first()
-            position = (last_list.position + 1) if last_list else 0
-        
-        serializer.save(position=position)
+            serializer.save()
+        else:
+            ordering.move_task_list(task_list, position, save=serializer.save)
+
+    def list(self, request, *args, **kwargs):
+        """List task lists; board reads of a single project are cached"""
+        project_id = request.query_params.get('project')
+        try:
+            is_member = bool(project_id) and Project.objects.visible_to(
+                request.user
+            ).filter(id=project_id).exists()
+        except (ValueError, ValidationError):
+            is_member = False
+        if not is_member:
+            return super().list(request, *args, **kwargs)
+
+        key = project_cache_key(project_id, 'task-lists', request.build_absolute_uri())
+        data = get_or_build(key, lambda: super(TaskListViewSet, self).list(
+            request, *args, **kwargs
+        ).data)
+        return Response(data)
+
+    def schedule_compaction(self, item):
+        ordering.schedule_project_compaction(item._state.db, item.project_id)
 
     @action(detail=True, methods=['post'])
     def reorder(self, request, pk=None):
@@ -89,44 +189,19 @@ class TaskListViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Get all task lists in the project ordered by position
-        task_lists = TaskList.objects.filter(project=project).order_by('position')
-        
-        # If moving to the end, just update this task list
-        if new_position >= task_lists.count():
-            task_list.position = task_lists.count() - 1
-            task_list.save()
-            return Response({'status': 'Task list position updated'})
-        
-        # Create a transaction to ensure atomicity
-        with transaction.atomic():
-            if new_position < task_list.position:
-                # Moving up - shift affected lists down
-                TaskList.objects.filter(
-                    project=project,
-                    position__gte=new_position,
-                    position__lt=task_list.position
-                ).update(position=F('position') + 1)
-            else:
-                # Moving down - shift affected lists up
-                TaskList.objects.filter(
-                    project=project,
-                    position__gt=task_list.position,
-                    position__lte=new_position
-                ).update(position=F('position') - 1)
-            
-            # Update the task list's position
-            task_list.position = new_position
-            task_list.save()
-        
+        ordering.move_task_list(task_list, new_position)
         return Response({'status': 'Task list position updated'})
 
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(IdempotencyMixin, VersionCheckMixin, ShardRoutingMixin, ReplicaReadMixin, TrashMixin, viewsets.ModelViewSet):
     """ViewSet for Task CRUD operations"""
     
     queryset = Task.objects.select_related('task_list__project', 'creator').all()
     permission_classes = [IsAuthenticated]
+    shard_lookups = (('pk', Task), ('task_list', TaskList))
+    project_lookup = 'task_list__project'
+    throttle_scopes = {'bulk_update': 'bulk'}
+    idempotent_actions = ('create', 'move', 'bulk_update')
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['task_list', 'is_archived', 'creator', 'priority', 'is_completed']
     search_fields = ['title', 'description']    
@@ -144,7 +219,8 @@ class TaskViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """Filter queryset based on user permissions"""
         user = self.request.user
-        return Task.objects.select_related('task_list__project', 'creator').filter(
+        return self.get_base_queryset().select_related('task_list__project', 'creator').filter(
+            task_list__deleted_at__isnull=True,
             task_list__project__in=Project.objects.filter(
                 Q(owner=user) | 
                 Q(members=user)
@@ -152,30 +228,26 @@ class TaskViewSet(viewsets.ModelViewSet):
         )
 
     def perform_create(self, serializer):
-        """Handle Task creation with simple position management"""
+        """Create the task at its position, shifting the tasks after it"""
         task_list = serializer.validated_data['task_list']
         position = serializer.validated_data.get('position')
         
-        if position is None:
-            # Use a much smaller timestamp approach to avoid integer overflow
-            # Get current timestamp and use only the last 6 digits (seconds since epoch modulo 1M)
-            import time
-            timestamp_base = int(time.time()) % 1000000  # Keep only last 6 digits
-            
-            # Add task count to ensure ordering and uniqueness
-            task_count = Task.objects.filter(task_list=task_list).count()
-            position = timestamp_base + task_count
-            
-            # If still too large or collision, use a simple incremental approach
-            max_position = Task.objects.filter(task_list=task_list).aggregate(
-                max_pos=Max('position')
-            )['max_pos']
-            
-            if max_position is not None and position <= max_position:
-                position = max_position + 1
-        
-        # Save the task with the calculated position
-        serializer.save(creator=self.request.user, position=position)
+        with transaction.atomic(using=task_list._state.db):
+            position = ordering.insert_task(task_list, position)
+            serializer.save(creator=self.request.user, position=position)
+
+    def perform_update(self, serializer):
+        """Apply list and position changes as a move"""
+        task = serializer.instance
+        target_list = serializer.validated_data.pop('task_list', task.task_list)
+        position = serializer.validated_data.pop('position', None)
+        source_project_id = task.task_list.project_id
+        ordering.move_task(task, target_list, position, save=serializer.save)
+        if target_list.project_id != source_project_id:
+            bump_project_version(source_project_id)
+
+    def schedule_compaction(self, item):
+        ordering.schedule_task_list_compaction(item._state.db, item.task_list_id)
 
     @action(detail=True, methods=['post'])
     def move(self, request, pk=None):
@@ -199,46 +271,10 @@ class TaskViewSet(viewsets.ModelViewSet):
         target_list = serializer.validated_data.get('target_list')
         new_position = serializer.validated_data.get('new_position')
         
-        # If target list is different, update the task's list
-        if target_list and target_list.id != task.task_list_id:
-            # Get the new position in the target list
-            if new_position is None:
-                # Default to the end of the target list using timestamp approach
-                import time
-                base_timestamp = int(time.time()) % 1000000  # Keep only last 6 digits
-                existing_count = Task.objects.filter(task_list=target_list).count()
-                new_position = base_timestamp + existing_count
-            
-            # Update tasks in the old list
-            with transaction.atomic():
-                # No need to shift positions since we're using timestamp-based positioning
-                # Just update the task
-                task.task_list = target_list
-                task.position = new_position
-                task.save()
-        
-        # If only the position changed within the same list
-        elif new_position is not None and new_position != task.position:
-            with transaction.atomic():
-                # For explicit position changes, we still need to handle ordering
-                if new_position < task.position:
-                    # Moving up - shift affected tasks down
-                    Task.objects.filter(
-                        task_list=task.task_list,
-                        position__gte=new_position,
-                        position__lt=task.position
-                    ).update(position=F('position') + 1)
-                else:
-                    # Moving down - shift affected tasks up
-                    Task.objects.filter(
-                        task_list=task.task_list,
-                        position__gt=task.position,
-                        position__lte=new_position
-                    ).update(position=F('position') - 1)
-                
-                # Update the task's position
-                task.position = new_position
-                task.save()
+        source_project_id = project.id
+        ordering.move_task(task, target_list, new_position)
+        if target_list.project_id != source_project_id:
+            bump_project_version(source_project_id)
         
         return Response(TaskDetailSerializer(task).data)
 
@@ -254,11 +290,23 @@ class TaskViewSet(viewsets.ModelViewSet):
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        tasks = serializer.validated_data['tasks']
-        update_data = serializer.validated_data['update_data']
+        task_ids = serializer.validated_data['task_ids']
+        now = timezone.now()
+        changes = {
+            'complete': {
+                'is_completed': True,
+                'completed_at': Coalesce('completed_at', Value(now)),
+            },
+            'incomplete': {'is_completed': False, 'completed_at': None},
+            'archive': {
+                'is_archived': True,
+                'archived_at': Coalesce('archived_at', Value(now)),
+            },
+            'unarchive': {'is_archived': False, 'archived_at': None},
+        }[serializer.validated_data['action']]
         
         # Check that all tasks belong to projects the user can edit
-        task_objects = Task.objects.select_related('task_list__project').filter(id__in=tasks)
+        task_objects = Task.objects.select_related('task_list__project').filter(id__in=task_ids)
         
         for task in task_objects:
             if not task.task_list.project.can_edit(user):
@@ -268,15 +316,21 @@ class TaskViewSet(viewsets.ModelViewSet):
                 )
         
         # Update tasks
-        task_objects.update(**update_data, updated_at=timezone.now())
+        with transaction.atomic(using=task_objects.db):
+            updated_count = task_objects.update(
+                **changes, updated_at=now, version=F('version') + 1
+            )
+        for project_id in {task.task_list.project_id for task in task_objects}:
+            bump_project_version(project_id)
         
         return Response({
-            'message': f'Successfully updated {task_objects.count()} tasks',
-            'tasks': TaskSerializer(task_objects, many=True).data
+            'message': f'Successfully updated {updated_count} tasks',
+            'updated_count': updated_count,
+            'tasks': TaskSerializer(task_objects.all(), many=True).data
         })
 
 
-class TaskCommentViewSet(viewsets.ModelViewSet):
+class TaskCommentViewSet(IdempotencyMixin, ShardRoutingMixin, ReplicaReadMixin, TrashMixin, viewsets.ModelViewSet):
     """ViewSet for TaskComment CRUD operations"""
     
     queryset = TaskComment.objects.select_related(
@@ -284,6 +338,9 @@ class TaskCommentViewSet(viewsets.ModelViewSet):
     ).all()
     serializer_class = TaskCommentSerializer
     permission_classes = [IsAuthenticated]
+    shard_lookups = (('pk', TaskComment), ('task', Task))
+    project_lookup = 'task__task_list__project'
+    idempotent_actions = ('create',)
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_fields = ['task']
     ordering_fields = ['created_at']
@@ -292,9 +349,11 @@ class TaskCommentViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """Filter queryset based on user permissions with optimized queries"""
         user = self.request.user
-        return TaskComment.objects.select_related(
+        return self.get_base_queryset().select_related(
             'task', 'task__task_list', 'task__task_list__project', 'author'
         ).filter(
+            task__deleted_at__isnull=True,
+            task__task_list__deleted_at__isnull=True,
             task__task_list__project__in=Project.objects.filter(
                 Q(owner=user) | 
                 Q(members=user)
@@ -305,6 +364,10 @@ class TaskCommentViewSet(viewsets.ModelViewSet):
         """Handle comment creation"""
         serializer.save(author=self.request.user)
 
+    def can_edit_item(self, item):
+        """Authors may always trash and restore their own comments"""
+        return item.author == self.request.user or super().can_edit_item(item)
+
     def update(self, request, *args, **kwargs):
         """Only allow comment author to update"""
         comment = self.get_object()
@@ -315,13 +378,41 @@ class TaskCommentViewSet(viewsets.ModelViewSet):
             )
         return super().update(request, *args, **kwargs)
 
-    def destroy(self, request, *args, **kwargs):
-        """Only allow comment author or project admin to delete"""
-        comment = self.get_object()
-        if (comment.author != request.user and 
-            not comment.task.task_list.project.can_edit(request.user)):
+
+class ArchivedTaskViewSet(ShardRoutingMixin, ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
+    """ViewSet for browsing and restoring tasks kept in cold storage"""
+    
+    queryset = ArchivedTask.objects.select_related('task_list__project', 'creator').all()
+    serializer_class = ArchivedTaskSerializer
+    permission_classes = [IsAuthenticated]
+    shard_lookups = (
+        ('pk', ArchivedTask), ('task_list', TaskList), ('task_list__project', Project)
+    )
+    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filterset_fields = ['task_list', 'task_list__project']
+    search_fields = ['title', 'description']
+    ordering_fields = ['archived_at', 'moved_at', 'created_at']
+    ordering = ['-archived_at']
+
+    def get_queryset(self):
+        """Filter queryset based on user permissions"""
+        user = self.request.user
+        return ArchivedTask.objects.select_related('task_list__project', 'creator').filter(
+            task_list__deleted_at__isnull=True,
+            task_list__project__in=Project.objects.filter(
+                Q(owner=user) | 
+                Q(members=user)
+            ).distinct()
+        )
+
+    @action(detail=True, methods=['post'])
+    def restore(self, request, pk=None):
+        """Move a task from cold storage back to its list"""
+        archived = self.get_object()
+        if not archived.can_edit(request.user):
             return Response(
                 {'error': 'Permission denied'}, 
                 status=status.HTTP_403_FORBIDDEN
             )
-        return super().destroy(request, *args, **kwargs)
+        task = restore_archived_task(archived)
+        return Response(TaskDetailSerializer(task).data)
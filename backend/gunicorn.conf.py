@@ -0,0 +1,86 @@
+"""
+Gunicorn configuration for production.
+
+Start the server with::
+
+    gunicorn -c gunicorn.conf.py
+
+``SERVER_MODE`` picks the interface: ``wsgi`` (default) serves
+``trello_backend.wsgi`` with threaded workers, ``asgi`` serves
+``trello_backend.asgi`` with uvicorn workers for the async endpoints and
+WebSockets. Worker counts are derived from the CPUs available to the process
+unless ``WEB_CONCURRENCY`` is set.
+"""
+
+import os
+
+from decouple import config
+
+
+def available_cpus():
+    """CPUs this process may run on, which respects container CPU sets"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+SERVER_MODE = config("SERVER_MODE", default="wsgi")
+if SERVER_MODE not in ("wsgi", "asgi"):
+    raise ValueError(f"SERVER_MODE must be 'wsgi' or 'asgi', not {SERVER_MODE!r}")
+
+cpus = available_cpus()
+
+if SERVER_MODE == "asgi":
+    wsgi_app = "trello_backend.asgi:application"
+    worker_class = "uvicorn.workers.UvicornWorker"
+    # One event loop per core handles many connections on its own
+    default_workers = cpus
+    threads = 1
+else:
+    wsgi_app = "trello_backend.wsgi:application"
+    worker_class = "gthread"
+    # Requests mostly wait on the database, so oversubscribe the cores
+    default_workers = cpus * 2 + 1
+    threads = config("GUNICORN_THREADS", default=4, cast=int)
+
+workers = config(
+    "WEB_CONCURRENCY",
+    default=min(default_workers, config("GUNICORN_MAX_WORKERS", default=12, cast=int)),
+    cast=int,
+)
+
+bind = config("GUNICORN_BIND", default=f"0.0.0.0:{config('PORT', default='8000')}")
+
+# Load the application once in the master and fork it into the workers
+preload_app = config("GUNICORN_PRELOAD", default=True, cast=bool)
+
+# Recycle workers regularly, staggered so they do not all restart together
+max_requests = config("GUNICORN_MAX_REQUESTS", default=1000, cast=int)
+max_requests_jitter = config("GUNICORN_MAX_REQUESTS_JITTER", default=100, cast=int)
+
+timeout = config("GUNICORN_TIMEOUT", default=30, cast=int)
+graceful_timeout = config("GUNICORN_GRACEFUL_TIMEOUT", default=30, cast=int)
+# Behind a load balancer, set this above the balancer's idle timeout
+keepalive = config("GUNICORN_KEEPALIVE", default=5, cast=int)
+
+accesslog = config("GUNICORN_ACCESS_LOG", default="-")
+errorlog = "-"
+loglevel = config("GUNICORN_LOG_LEVEL", default="info")
+
+
+def post_fork(server, worker):
+    # Connections inherited from the preloaded master must not be shared
+    from django.db import connections
+
+    connections.close_all()
+
+
+def on_starting(server):
+    server.log.info(
+        "Starting %s server: %s workers x %s threads (%s CPUs)",
+        SERVER_MODE,
+        workers,
+        threads,
+        cpus,
+    )
@@ -0,0 +1,226 @@
+"""
+Write-behind buffer for activity timestamps such as ``last_login``.
+
+``record(User, "last_active_at", user_id)`` notes the time in a buffer instead
+of updating the row. ``flush`` writes the buffered timestamps with one
+``UPDATE ... SET field = CASE ...`` per model, field and batch of rows.
+
+Timestamps are buffered in Redis hashes when ``ACTIVITY_REDIS_URL`` is set and
+flushed by the ``flush_activity`` Celery beat job. A flush renames a hash
+before reading it, so new timestamps go to a fresh hash meanwhile; a hash
+left behind by a flush that died is picked up by the next one. Restarting a
+web or Celery worker therefore loses nothing.
+
+Without Redis the buffer is kept in process memory and a background thread
+of every process flushes it every ``ACTIVITY_FLUSH_INTERVAL`` seconds, losing
+what was buffered if the process dies. Requests never flush.
+
+Recording runs on every authenticated request, so it must not fail one: if
+Redis cannot be reached the timestamp is dropped and counted in
+``activity.errors``.
+
+A process records the same row at most once per ``ACTIVITY_RESOLUTION``
+seconds, so the buffer is not written on every request.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from datetime import timezone as dt_timezone
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Case, Value, When
+from django.utils import timezone
+
+from . import metrics, sharding
+
+DEFAULT_FLUSH_INTERVAL = 60
+DEFAULT_RESOLUTION = 60
+BATCH_SIZE = 500
+MAX_RECENT = 100_000
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBuffer:
+    """
+    Timestamps kept in the memory of this process, flushed by a background
+    thread once ``ACTIVITY_FLUSH_INTERVAL`` is positive
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = defaultdict(dict)
+        self._flusher = None
+
+    def add(self, key, pk, timestamp):
+        with self._lock:
+            self._pending[key][str(pk)] = timestamp
+            if self._flusher is None:
+                interval = getattr(
+                    settings, "ACTIVITY_FLUSH_INTERVAL", DEFAULT_FLUSH_INTERVAL
+                )
+                if interval > 0:
+                    self._flusher = threading.Thread(
+                        target=self._flush_every,
+                        args=(interval,),
+                        name="activity-flush",
+                        daemon=True,
+                    )
+                    self._flusher.start()
+
+    def _flush_every(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                flush()
+            except Exception:
+                logger.exception("Flushing activity timestamps failed")
+                metrics.incr("activity.errors")
+            finally:
+                connections.close_all()
+
+    def drain(self):
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(dict)
+        for key, values in pending.items():
+            yield key, values, lambda: None
+
+
+class RedisBuffer:
+    """Timestamps kept in Redis hashes shared by every process"""
+
+    PENDING = "activity:pending:"
+    FLUSHING = "activity:flushing:"
+
+    def __init__(self, url):
+        import redis
+
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+
+    def add(self, key, pk, timestamp):
+        import redis
+
+        try:
+            self._client.hset(self.PENDING + key, str(pk), timestamp)
+        except redis.RedisError:
+            # Losing a timestamp beats failing the request
+            metrics.incr("activity.errors")
+
+    def drain(self):
+        import redis
+
+        # Hashes of flushes that did not finish first, then the current ones
+        names = list(self._client.scan_iter(self.FLUSHING + "*"))
+        for name in self._client.scan_iter(self.PENDING + "*"):
+            key = name[len(self.PENDING) :]
+            flushing = f"{self.FLUSHING}{uuid.uuid4().hex}:{key}"
+            try:
+                self._client.rename(name, flushing)
+            except redis.ResponseError:
+                # Emptied by a concurrent flush
+                continue
+            names.append(flushing)
+
+        for name in names:
+            key = name[len(self.FLUSHING) :].split(":", 1)[1]
+            values = self._client.hgetall(name)
+            yield key, values, lambda name=name: self._client.delete(name)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+_recent = {}
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            url = getattr(settings, "ACTIVITY_REDIS_URL", None)
+            _backend = RedisBuffer(url) if url else MemoryBuffer()
+        return _backend
+
+
+def _buffer_key(model, field):
+    return f"{model._meta.label_lower}:{field}"
+
+
+def record(model, field, pk, when=None, resolution=None):
+    """
+    Buffer ``when`` (default now) as the new value of ``field`` on row ``pk``.
+
+    ``resolution`` overrides ``ACTIVITY_RESOLUTION``; pass 0 to record every
+    call.
+    """
+    if pk is None:
+        return
+    if resolution is None:
+        resolution = getattr(settings, "ACTIVITY_RESOLUTION", DEFAULT_RESOLUTION)
+    key = _buffer_key(model, field)
+    now = time.monotonic()
+    with _backend_lock:
+        last = _recent.get((key, pk))
+        if last is not None and now - last < resolution:
+            metrics.incr("activity.skipped")
+            return
+        if len(_recent) >= MAX_RECENT:
+            _recent.clear()
+        _recent[(key, pk)] = now
+
+    when = when or timezone.now()
+    get_backend().add(key, pk, when.timestamp())
+    metrics.incr("activity.recorded")
+
+
+def _databases(model, pks):
+    """Group ``pks`` by the database holding their rows"""
+    if not sharding.is_sharded(model):
+        return {DEFAULT_DB_ALIAS: pks}
+    # Only projects are recorded among the sharded models
+    groups = defaultdict(list)
+    for pk in pks:
+        groups[sharding.shard_for_project(pk)].append(pk)
+    return groups
+
+
+def _write(model, field, values):
+    pk_field = model._meta.pk
+    values = {
+        pk_field.to_python(pk): datetime.fromtimestamp(float(ts), dt_timezone.utc)
+        for pk, ts in values.items()
+    }
+    updated = 0
+    for using, pks in _databases(model, list(values)).items():
+        for start in range(0, len(pks), BATCH_SIZE):
+            batch = pks[start : start + BATCH_SIZE]
+            updated += (
+                model._base_manager.using(using)
+                .filter(pk__in=batch)
+                .update(
+                    **{
+                        field: Case(
+                            *[When(pk=pk, then=Value(values[pk])) for pk in batch],
+                            output_field=model._meta.get_field(field),
+                        )
+                    }
+                )
+            )
+    return updated
+
+
+def flush():
+    """Write every buffered timestamp; returns the number of updated rows"""
+    updated = 0
+    for key, values, done in get_backend().drain():
+        if values:
+            label, field = key.rsplit(":", 1)
+            updated += _write(apps.get_model(label), field, values)
+        done()
+    metrics.incr("activity.flushed_rows", updated)
+    return updated
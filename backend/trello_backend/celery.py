@@ -0,0 +1,16 @@
+"""
+Celery application for trello_backend project.
+
+Configuration is read from the Django settings using the ``CELERY_`` prefix and
+tasks are discovered from the ``tasks.py`` module of every installed app.
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "trello_backend.settings")
+
+app = Celery("trello_backend")
+app.config_from_object("django.conf:settings", namespace="CELERY")
+app.autodiscover_tasks()
@@ -0,0 +1,83 @@
+"""
+Database helpers shared by the apps.
+"""
+
+from django.db import connections, transaction
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def delete_in_chunks(
+    table, select_ids_sql, params=(), chunk_size=DEFAULT_CHUNK_SIZE, using="default"
+):
+    """
+    Delete rows of ``table`` whose id is returned by ``select_ids_sql``.
+
+    Runs ``DELETE ... WHERE id IN (<select_ids_sql> LIMIT n)`` until fewer than
+    ``chunk_size`` rows are removed. Every chunk is committed on its own so locks
+    are held briefly and no rows are loaded into Python. Returns the number of
+    deleted rows.
+    """
+    connection = connections[using]
+    sql = "DELETE FROM {table} WHERE id IN ({select} LIMIT %s)".format(
+        table=connection.ops.quote_name(table), select=select_ids_sql
+    )
+    total = 0
+    while True:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(sql, [*params, chunk_size])
+            deleted = cursor.rowcount
+        total += deleted
+        if deleted < chunk_size:
+            return total
+
+
+def check_connection(conn):
+    """
+    Health check run by the psycopg pool before handing out a connection.
+
+    A connection dropped by the server fails the ping; the pool then discards
+    it and hands out another one instead of failing the request.
+    """
+    from . import metrics
+
+    autocommit = conn.autocommit
+    try:
+        conn.autocommit = True
+        conn.execute("SELECT 1")
+    except Exception:
+        metrics.incr("db.pool.failed_checks")
+        raise
+    finally:
+        if not conn.closed:
+            conn.autocommit = autocommit
+
+
+def pool_stats():
+    """
+    Current figures of the connection pools of this process, per alias.
+
+    ``checked_out`` connections are in use by requests, ``waiting`` requests
+    wait for a free connection and ``timeouts`` counts the requests that gave
+    up waiting.
+    """
+    stats = {}
+    for alias in connections:
+        connection = connections[alias]
+        options = connection.settings_dict["OPTIONS"]
+        if connection.vendor != "postgresql" or not options.get("pool"):
+            continue
+        raw = connection.pool.get_stats()
+        size = raw.get("pool_size", 0)
+        available = raw.get("pool_available", 0)
+        stats[alias] = {
+            "size": size,
+            "available": available,
+            "checked_out": size - available,
+            "waiting": raw.get("requests_waiting", 0),
+            "requests": raw.get("requests_num", 0),
+            "timeouts": raw.get("requests_errors", 0),
+            "wait_ms": raw.get("requests_wait_ms", 0),
+            "connections_lost": raw.get("connections_lost", 0),
+        }
+    return stats
@@ -0,0 +1,117 @@
+"""
+Replay of requests retried with the same ``Idempotency-Key`` header.
+
+The first request with a key runs normally and its successful response is
+stored in the cache for ``IDEMPOTENCY_KEY_TTL`` seconds. A retry with the same
+key gets the stored response back, marked with ``Idempotent-Replayed: true``,
+after a single cache lookup and without running the view again.
+
+Keys are scoped to the user and the URL. While the first request is still
+running, retries get ``409 Conflict``; reusing a key with a different body
+gets ``422``. Failed requests are not stored, so they can be retried with the
+same key.
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+DEFAULT_TTL = 24 * 3600
+# Longest a request may hold its key before a retry may run it again
+LOCK_TIMEOUT = 60
+
+
+class RequestInProgress(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "A request with this Idempotency-Key is still in progress."
+    default_code = "idempotency_key_in_progress"
+
+
+class KeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "This Idempotency-Key was used with a different request."
+    default_code = "idempotency_key_reused"
+
+
+class Replay(Exception):
+    """Raised to answer a retry with the stored response"""
+
+    def __init__(self, response):
+        self.response = response
+
+
+def get_cache():
+    return caches[getattr(settings, "IDEMPOTENCY_CACHE_ALIAS", "default")]
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f"{request.method} {body}".encode()).hexdigest()
+
+
+def begin(request):
+    """
+    Start a request carrying an idempotency key.
+
+    Raises ``Replay`` when a response is stored for the key. Returns the state
+    to pass to ``finish``, or None when the request has no key.
+    """
+    key = request.headers.get(HEADER)
+    if not key:
+        return None
+    if len(key) > MAX_KEY_LENGTH:
+        raise ValidationError(
+            {HEADER: f"Ensure this value has at most {MAX_KEY_LENGTH} characters."}
+        )
+
+    digest = hashlib.sha256(
+        f"{request.user.pk}:{request.path}:{key}".encode()
+    ).hexdigest()
+    cache_key = f"idempotency:{digest}"
+    fingerprint = _fingerprint(request)
+    cache = get_cache()
+
+    stored = cache.get(cache_key)
+    if stored is not None:
+        if stored["fingerprint"] != fingerprint:
+            raise KeyReused()
+        raise Replay(
+            Response(
+                stored["data"],
+                status=stored["status"],
+                headers={**stored["headers"], REPLAYED_HEADER: "true"},
+            )
+        )
+    if not cache.add(f"{cache_key}:lock", fingerprint, LOCK_TIMEOUT):
+        raise RequestInProgress()
+    return cache_key, fingerprint
+
+
+def finish(state, response):
+    """Store a successful response and release the key"""
+    cache_key, fingerprint = state
+    cache = get_cache()
+    if status.is_success(response.status_code):
+        headers = {
+            name: response[name] for name in ("Location",) if response.has_header(name)
+        }
+        cache.set(
+            cache_key,
+            {
+                "fingerprint": fingerprint,
+                "status": response.status_code,
+                "data": response.data,
+                "headers": headers,
+            },
+            getattr(settings, "IDEMPOTENCY_KEY_TTL", DEFAULT_TTL),
+        )
+    cache.delete(f"{cache_key}:lock")
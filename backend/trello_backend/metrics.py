@@ -0,0 +1,43 @@
+"""
+In-process counters for cache and throttling statistics.
+
+Counters live in the memory of each worker process; ``/api/metrics/`` reports
+the values of the process that serves the request.
+"""
+
+import threading
+from collections import defaultdict
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+
+
+def incr(name, value=1):
+    """Add ``value`` to the counter ``name``"""
+    with _lock:
+        _counters[name] += value
+
+
+def get(name):
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def snapshot():
+    """
+    Return every counter, plus a ``<prefix>.hit_rate`` for each pair of
+    ``<prefix>.hits`` and ``<prefix>.misses`` counters.
+    """
+    with _lock:
+        data = dict(_counters)
+    for name in list(data):
+        if name.endswith(".hits"):
+            prefix = name[: -len(".hits")]
+            total = data[name] + data.get(f"{prefix}.misses", 0)
+            data[f"{prefix}.hit_rate"] = round(data[name] / total, 4) if total else 0.0
+    return data
+
+
+def reset():
+    with _lock:
+        _counters.clear()
@@ -0,0 +1,145 @@
+from collections.abc import Mapping
+
+from rest_framework.permissions import SAFE_METHODS
+
+from . import idempotency, sharding, versioning
+from .routers import (
+    REPLICA,
+    is_sticky,
+    mark_sticky,
+    reset_read_target,
+    set_read_target,
+)
+
+# Header a client sends to read its own data from the primary
+CONSISTENCY_HEADER = "HTTP_X_READ_CONSISTENCY"
+
+
+class ReplicaReadMixin:
+    """
+    Serve the safe reads of a viewset (``replica_actions``) from a replica.
+
+    Reads stay on the primary for a user who wrote recently, and for requests
+    sending ``X-Read-Consistency: strong``.
+    """
+
+    replica_actions = ("list", "retrieve")
+
+    def can_read_from_replica(self, request):
+        return (
+            request.method in SAFE_METHODS
+            and self.action in self.replica_actions
+            and request.META.get(CONSISTENCY_HEADER, "").lower() != "strong"
+            and not (request.user.is_authenticated and is_sticky(request.user))
+        )
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.can_read_from_replica(request):
+            self._read_target_token = set_read_target(REPLICA)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, "_read_target_token", None)
+        if token is not None:
+            reset_read_target(token)
+            self._read_target_token = None
+        if request.method not in SAFE_METHODS and request.user.is_authenticated:
+            mark_sticky(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ShardRoutingMixin:
+    """
+    Route the queries of a request to the shard of the project it works on.
+
+    The shard comes from the first of ``shard_lookups``, pairs of a parameter
+    and the model it identifies, found in the URL, the query string or the
+    request body. Requests without any of them use the default database.
+    """
+
+    shard_lookups = ()
+
+    def get_lookup(self, request):
+        """The first of ``shard_lookups`` in the request, as ``(model, value)``"""
+        for param, model in self.shard_lookups:
+            value = self.kwargs.get(param) or request.query_params.get(param)
+            if value is None and isinstance(request.data, Mapping):
+                value = request.data.get(param)
+            if value:
+                return model, value
+        return None, None
+
+    def get_request_shard(self, request):
+        model, value = self.get_lookup(request)
+        return sharding.locate(model, value) if model else None
+
+    def get_request_project_id(self, request):
+        """Id of the project the request works on, if it names one"""
+        model, value = self.get_lookup(request)
+        return sharding.find_project_id(model, value) if model else None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if sharding.is_enabled():
+            shard = self.get_request_shard(request)
+            if shard:
+                self._shard_token = sharding.set_current_shard(shard)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, "_shard_token", None)
+        if token is not None:
+            sharding.reset_current_shard(token)
+            self._shard_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class IdempotencyMixin:
+    """
+    Replay the stored response of ``idempotent_actions`` retried with the same
+    ``Idempotency-Key`` header, see ``trello_backend.idempotency``.
+    """
+
+    idempotent_actions = ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action in self.idempotent_actions:
+            self._idempotency = idempotency.begin(request)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, idempotency.Replay):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        state = getattr(self, "_idempotency", None)
+        if state is not None:
+            self._idempotency = None
+            idempotency.finish(state, response)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class VersionCheckMixin:
+    """
+    Refuse writes to an object edited since the version the client sent, see
+    ``trello_backend.versioning``, and return the version as ``ETag``.
+
+    Writes of requests that send no version are not checked.
+    """
+
+    def get_object(self):
+        obj = super().get_object()
+        if self.request.method not in SAFE_METHODS:
+            versioning.check_version(self.request, obj)
+        return obj
+
+    def handle_exception(self, exc):
+        if isinstance(exc, versioning.StaleVersion):
+            exc = versioning.VersionConflict()
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        data = getattr(response, "data", None)
+        if isinstance(data, Mapping) and "version" in data:
+            response["ETag"] = f'"{data["version"]}"'
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,52 @@
+"""
+Page number pagination for async views, with the same query parameters and
+response shape as DRF's ``PageNumberPagination``.
+"""
+
+from django.conf import settings
+from django.http import Http404
+
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def get_page_size():
+    return settings.REST_FRAMEWORK.get("PAGE_SIZE", 20)
+
+
+async def apaginate(request, queryset, serialize):
+    """
+    Return the paginated response data of ``serialize(page_objects)``.
+    ``queryset`` may also be a list, such as projects gathered from every shard.
+    """
+    page_size = get_page_size()
+    try:
+        page = int(request.GET.get("page", 1))
+    except ValueError:
+        raise Http404("Invalid page.")
+    is_list = isinstance(queryset, list)
+    count = len(queryset) if is_list else await queryset.acount()
+    if page < 1 or (page > 1 and (page - 1) * page_size >= count):
+        raise Http404("Invalid page.")
+
+    offset = (page - 1) * page_size
+    if is_list:
+        objects = queryset[offset : offset + page_size]
+    else:
+        objects = [obj async for obj in queryset[offset : offset + page_size]]
+
+    url = request.build_absolute_uri()
+    next_url = None
+    if offset + page_size < count:
+        next_url = replace_query_param(url, "page", page + 1)
+    previous_url = None
+    if page == 2:
+        previous_url = remove_query_param(url, "page")
+    elif page > 2:
+        previous_url = replace_query_param(url, "page", page - 1)
+
+    return {
+        "count": count,
+        "next": next_url,
+        "previous": previous_url,
+        "results": serialize(objects),
+    }
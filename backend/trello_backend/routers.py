@@ -0,0 +1,94 @@
+"""
+Database routers.
+
+``ReplicaRouter`` sends reads to one of ``DATABASE_REPLICAS`` only while the
+read target is ``REPLICA``, which ``ReplicaReadMixin`` sets for safe viewset
+reads. Everything else, including every write, goes to the primary.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+PRIMARY = "primary"
+REPLICA = "replica"
+
+_read_target = ContextVar("read_target", default=PRIMARY)
+
+
+DEFAULT_STICKY_SECONDS = 5
+
+
+def get_replicas():
+    return list(getattr(settings, "DATABASE_REPLICAS", []))
+
+
+def set_read_target(target):
+    """Route reads to ``PRIMARY`` or ``REPLICA``; returns a token for reset"""
+    return _read_target.set(target)
+
+
+def reset_read_target(token):
+    _read_target.reset(token)
+
+
+def _sticky_key(user_id):
+    return f"db:sticky:{user_id}"
+
+
+def mark_sticky(user):
+    """Read from the primary for a while after ``user`` wrote, so the user
+    sees their own writes even if the replicas lag behind"""
+    seconds = getattr(settings, "REPLICA_STICKY_SECONDS", DEFAULT_STICKY_SECONDS)
+    cache.set(_sticky_key(user.pk), True, seconds)
+
+
+def is_sticky(user):
+    return bool(cache.get(_sticky_key(user.pk)))
+
+
+@contextmanager
+def read_from(target):
+    """Route the reads of the enclosed block to ``PRIMARY`` or ``REPLICA``"""
+    token = set_read_target(target)
+    try:
+        yield
+    finally:
+        reset_read_target(token)
+
+
+def use_primary():
+    """Force the reads of the enclosed block to the primary"""
+    return read_from(PRIMARY)
+
+
+def read_from_replica():
+    return read_from(REPLICA)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _read_target.get() == REPLICA:
+            replicas = get_replicas()
+            if replicas:
+                return random.choice(replicas)
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Writes always go to the primary, i.e. the "default" database
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {"default", *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication
+        if db in get_replicas():
+            return False
+        return None
@@ -14,7 +14,8 @@ import os
 from datetime import timedelta
 from pathlib import Path
 
-from decouple import config
+from corsheaders.defaults import default_headers
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -99,9 +100,60 @@ DATABASES = {
         "PASSWORD": config("DB_PASSWORD", default="postgres"),
         "HOST": config("DB_HOST", default="db"),
         "PORT": config("DB_PORT", default="5432"),
+        # Drop connections the server closed before a request uses them
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {},
     }
 }
 
+# Connection pooling (psycopg pool). Each worker process keeps between
+# DB_POOL_MIN_SIZE and DB_POOL_MAX_SIZE connections per database; connections
+# are pinged before use and closed after DB_POOL_MAX_IDLE seconds unused.
+# Without pooling, connections are kept for DB_CONN_MAX_AGE seconds.
+if config("DB_POOL", default=True, cast=bool):
+    from trello_backend.db import check_connection
+
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": config("DB_POOL_MIN_SIZE", default=2, cast=int),
+        "max_size": config("DB_POOL_MAX_SIZE", default=10, cast=int),
+        # Seconds a request waits for a free connection before failing
+        "timeout": config("DB_POOL_TIMEOUT", default=10, cast=float),
+        "max_idle": config("DB_POOL_MAX_IDLE", default=300, cast=float),
+        "check": check_connection,
+    }
+else:
+    DATABASES["default"]["CONN_MAX_AGE"] = config(
+        "DB_CONN_MAX_AGE", default=60, cast=int
+    )
+
+# Read replicas: safe viewset reads go to one of these, see trello_backend.routers
+DATABASE_REPLICAS = []
+for index, host in enumerate(config("DB_REPLICA_HOSTS", default="", cast=Csv()), 1):
+    DATABASES[f"replica_{index}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica_{index}")
+
+# Project shards: each project lives on one of these, see trello_backend.sharding.
+# Sharding is off while the list is empty.
+DATABASE_SHARDS = []
+SHARD_HOSTS = config("DB_SHARD_HOSTS", default="", cast=Csv())
+if SHARD_HOSTS:
+    DATABASE_SHARDS.append("default")
+for index, host in enumerate(SHARD_HOSTS, 1):
+    DATABASES[f"shard_{index}"] = {**DATABASES["default"], "HOST": host}
+    DATABASE_SHARDS.append(f"shard_{index}")
+
+DATABASE_ROUTERS = [
+    "trello_backend.sharding.ShardRouter",
+    "trello_backend.routers.ReplicaRouter",
+]
+
+# Seconds a user reads from the primary after writing
+REPLICA_STICKY_SECONDS = config("REPLICA_STICKY_SECONDS", default=5, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -124,6 +176,28 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing: "argon2", "scrypt" or "pbkdf2" hashes new passwords. The
+# others still verify existing hashes, which are upgraded at the next login,
+# as are hashes made with a lower cost than configured below
+PASSWORD_HASHER = config("PASSWORD_HASHER", default="argon2")
+_PASSWORD_HASHERS = {
+    "argon2": "apps.authentication.hashers.Argon2PasswordHasher",
+    "scrypt": "apps.authentication.hashers.ScryptPasswordHasher",
+    "pbkdf2": "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+}
+PASSWORD_HASHERS = [
+    _PASSWORD_HASHERS.pop(PASSWORD_HASHER),
+    *_PASSWORD_HASHERS.values(),
+]
+
+ARGON2_TIME_COST = config("ARGON2_TIME_COST", default=2, cast=int)
+ARGON2_MEMORY_COST = config("ARGON2_MEMORY_COST", default=19456, cast=int)  # KiB
+ARGON2_PARALLELISM = config("ARGON2_PARALLELISM", default=1, cast=int)
+SCRYPT_WORK_FACTOR = config("SCRYPT_WORK_FACTOR", default=2**15, cast=int)
+
+# Threads hashing passwords for the async login; defaults to the CPU count
+PASSWORD_HASHING_WORKERS = config("PASSWORD_HASHING_WORKERS", default=0, cast=int)
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -162,7 +236,7 @@ AUTH_USER_MODEL = "authentication.User"
 # Django REST Framework
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "apps.authentication.authentication.StatelessJWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
@@ -172,6 +246,19 @@ REST_FRAMEWORK = {
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 20,
+    "DEFAULT_THROTTLE_CLASSES": [
+        "trello_backend.throttling.UserBucketThrottle",
+        "trello_backend.throttling.ProjectBucketThrottle",
+    ],
+    # Token bucket rates per user, and per project for "project_<scope>"
+    "DEFAULT_THROTTLE_RATES": {
+        "auth": config("THROTTLE_AUTH_RATE", default="10/min"),
+        "writes": config("THROTTLE_WRITES_RATE", default="120/min"),
+        "search": config("THROTTLE_SEARCH_RATE", default="60/min"),
+        "bulk": config("THROTTLE_BULK_RATE", default="10/min"),
+        "project_writes": config("THROTTLE_PROJECT_WRITES_RATE", default="600/min"),
+        "project_bulk": config("THROTTLE_PROJECT_BULK_RATE", default="30/min"),
+    },
 }
 
 # JWT Settings
@@ -179,6 +266,9 @@ SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
     "ROTATE_REFRESH_TOKENS": True,
+    "BLACKLIST_AFTER_ROTATION": True,
+    # Refuses refresh tokens revoked by a token version bump
+    "TOKEN_REFRESH_SERIALIZER": "apps.authentication.serializers.TokenRefreshSerializer",
 }
 
 # CORS Settings
@@ -191,6 +281,8 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key", "if-match")
+CORS_EXPOSE_HEADERS = ["etag"]
 
 # Channels/WebSocket Configuration
 ASGI_APPLICATION = "trello_backend.asgi.application"
@@ -204,6 +296,26 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Cache Configuration
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": config("CACHE_URL", default="redis://redis:6379/1"),
+    }
+}
+
+# Seconds a cached project, member list or board response is kept
+PROJECT_CACHE_TIMEOUT = config("PROJECT_CACHE_TIMEOUT", default=300, cast=int)
+
+# Concurrent cache misses wait for one computation: seconds the build lock is
+# held at most, and seconds other workers wait for the result
+SINGLE_FLIGHT_LOCK_TIMEOUT = config("SINGLE_FLIGHT_LOCK_TIMEOUT", default=30, cast=int)
+SINGLE_FLIGHT_WAIT = config("SINGLE_FLIGHT_WAIT", default=10, cast=int)
+
+# Serialized task cards: seconds kept in Redis and cards kept per process
+TASK_FRAGMENT_TIMEOUT = config("TASK_FRAGMENT_TIMEOUT", default=3600, cast=int)
+TASK_FRAGMENT_LOCAL_SIZE = config("TASK_FRAGMENT_LOCAL_SIZE", default=10000, cast=int)
+
 # Celery Configuration
 CELERY_BROKER_URL = config("CELERY_BROKER_URL", default="redis://redis:6379/0")
 CELERY_RESULT_BACKEND = config("CELERY_RESULT_BACKEND", default="redis://redis:6379/0")
@@ -220,8 +332,88 @@ CELERY_BEAT_SCHEDULE = {
         "schedule": timedelta(hours=24),
         "args": ("clearsessions",),
     },
+    "purge-deleted-projects": {
+        "task": "apps.tasks.tasks.purge_deleted_projects",
+        "schedule": timedelta(hours=1),
+    },
+    "purge-expired-trash": {
+        "task": "apps.tasks.tasks.purge_expired_trash",
+        "schedule": timedelta(hours=6),
+    },
+    "move-archived-tasks": {
+        "task": "apps.tasks.tasks.move_archived_tasks",
+        "schedule": timedelta(hours=24),
+    },
+    "compact-positions": {
+        "task": "apps.tasks.tasks.compact_positions",
+        "schedule": timedelta(hours=24),
+    },
+    "purge-expired-tokens": {
+        "task": "apps.authentication.tasks.purge_expired_tokens",
+        "schedule": timedelta(hours=6),
+    },
+    "flush-activity": {
+        "task": "apps.authentication.tasks.flush_activity",
+        "schedule": timedelta(
+            seconds=config("ACTIVITY_FLUSH_INTERVAL", default=60, cast=int)
+        ),
+    },
 }
 
+# Board duplication: boards with more tasks than this are copied by Celery
+PROJECT_DUPLICATE_ASYNC_THRESHOLD = config(
+    "PROJECT_DUPLICATE_ASYNC_THRESHOLD", default=2000, cast=int
+)
+
+# Rows removed per DELETE statement when purging deleted projects and trash
+PURGE_CHUNK_SIZE = config("PURGE_CHUNK_SIZE", default=1000, cast=int)
+
+# Days deleted lists, tasks and comments stay in the trash
+TRASH_RETENTION_DAYS = config("TRASH_RETENTION_DAYS", default=30, cast=int)
+
+# Tasks archived for longer than this are moved to cold storage
+ARCHIVE_COLD_AFTER_DAYS = config("ARCHIVE_COLD_AFTER_DAYS", default=30, cast=int)
+ARCHIVE_MOVE_BATCH_SIZE = config("ARCHIVE_MOVE_BATCH_SIZE", default=500, cast=int)
+
+# Bloom filter in front of the refresh token blacklist. Without a Redis URL
+# the filter is kept per process, which is only correct with a single process
+TOKEN_REVOCATION_REDIS_URL = config(
+    "TOKEN_REVOCATION_REDIS_URL",
+    default=config("CACHE_URL", default="redis://redis:6379/1"),
+)
+TOKEN_REVOCATION_BLOOM_BITS = config(
+    "TOKEN_REVOCATION_BLOOM_BITS", default=2**23, cast=int
+)
+TOKEN_REVOCATION_BLOOM_HASHES = config(
+    "TOKEN_REVOCATION_BLOOM_HASHES", default=7, cast=int
+)
+
+# Seconds a rotated refresh token keeps returning the pair it was exchanged
+# for, so concurrent refreshes of the same token all succeed
+TOKEN_REFRESH_GRACE_SECONDS = config("TOKEN_REFRESH_GRACE_SECONDS", default=10, cast=int)
+
+# Write-behind buffer for last_login and last activity timestamps. Without a
+# Redis URL each process buffers in memory and a background thread flushes it
+# every interval; 0 leaves flushing to the flush_activity job
+ACTIVITY_REDIS_URL = config(
+    "ACTIVITY_REDIS_URL",
+    default=config("CACHE_URL", default="redis://redis:6379/1"),
+)
+ACTIVITY_FLUSH_INTERVAL = config("ACTIVITY_FLUSH_INTERVAL", default=60, cast=int)
+# Seconds during which a process records the same user or project only once
+ACTIVITY_RESOLUTION = config("ACTIVITY_RESOLUTION", default=60, cast=int)
+
+# Redis holding the throttle buckets shared by every worker; without it each
+# process keeps its own buckets
+THROTTLE_REDIS_URL = config("THROTTLE_REDIS_URL", default="")
+
+# Seconds the response of a request sent with an Idempotency-Key is replayed
+# to retries
+IDEMPOTENCY_KEY_TTL = config("IDEMPOTENCY_KEY_TTL", default=24 * 3600, cast=int)
+
+# Unused positions a list or board may have before its items are renumbered
+POSITION_GAP_THRESHOLD = config("POSITION_GAP_THRESHOLD", default=50, cast=int)
+
 # Logging Configuration
 # Ensure logs directory exists
 os.makedirs(BASE_DIR / "logs", exist_ok=True)
@@ -0,0 +1,242 @@
+"""
+Project sharding.
+
+A project lives on one of ``DATABASE_SHARDS`` together with its memberships,
+lists, tasks and comments. New projects are placed by a stable hash of their
+id. The ``ShardDirectory`` table on the default database records the shard of
+every project and the users who can reach it. Once placed, a project stays on
+its shard when shards are added, and it can be moved with
+``move_project_shard``.
+
+User rows are copied to every shard, so foreign keys and joins to users stay
+local to a shard. Users and the directory are written to the default
+database.
+
+Sharding is off while ``DATABASE_SHARDS`` is empty; everything then lives on the
+default database.
+"""
+
+import hashlib
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS
+
+from asgiref.sync import sync_to_async
+
+SHARDED_APPS = ("projects", "tasks")
+GLOBAL_MODELS = ("projects.sharddirectory",)
+
+# Path from each sharded model to the id of the project that owns the row
+PROJECT_PATHS = {
+    "projects.project": "pk",
+    "projects.projectmembership": "project_id",
+    "tasks.tasklist": "project_id",
+    "tasks.task": "task_list__project_id",
+    "tasks.archivedtask": "task_list__project_id",
+    "tasks.taskcomment": "task__task_list__project_id",
+}
+
+_current_shard = ContextVar("current_shard", default=None)
+
+
+def get_shards():
+    return list(getattr(settings, "DATABASE_SHARDS", []))
+
+
+def is_enabled():
+    return bool(get_shards())
+
+
+def is_sharded(model):
+    return (
+        model._meta.app_label in SHARDED_APPS
+        and model._meta.label_lower not in GLOBAL_MODELS
+    )
+
+
+def hash_shard(project_id):
+    """The shard a new project is placed on"""
+    shards = get_shards()
+    digest = hashlib.blake2b(uuid.UUID(str(project_id)).bytes, digest_size=8).digest()
+    return shards[int.from_bytes(digest, "big") % len(shards)]
+
+
+def _project_key(project_id):
+    return f"shard:project:{project_id}"
+
+
+def shard_for_project(project_id):
+    """The shard holding ``project_id``, from the directory or the hash"""
+    if not is_enabled():
+        return DEFAULT_DB_ALIAS
+    key = _project_key(project_id)
+    shard = cache.get(key)
+    if shard is None:
+        from apps.projects.models import ShardDirectory
+
+        shard = (
+            ShardDirectory.objects.filter(project_id=project_id)
+            .values_list("shard", flat=True)
+            .first()
+        )
+        if shard is None:
+            # Not placed yet
+            return hash_shard(project_id)
+        cache.set(key, shard, None)
+    return shard
+
+
+def forget_project(project_id):
+    """Drop the cached shard of a project that was moved or purged"""
+    cache.delete(_project_key(project_id))
+
+
+def find_project_id(model, pk):
+    """Id of the project owning the ``model`` row ``pk``, searching every shard"""
+    path = PROJECT_PATHS[model._meta.label_lower]
+    if path == "pk":
+        return pk
+    # Rows never change project, so the answer can be cached for good
+    key = f"shard:{model._meta.label_lower}:{pk}"
+    project_id = cache.get(key)
+    if project_id is not None:
+        return project_id
+    for alias in get_shards() or [DEFAULT_DB_ALIAS]:
+        try:
+            project_id = (
+                model._base_manager.using(alias)
+                .filter(pk=pk)
+                .values_list(path, flat=True)
+                .first()
+            )
+        except (ValueError, ValidationError):
+            return None
+        if project_id is not None:
+            cache.set(key, project_id, None)
+            return project_id
+    return None
+
+
+def locate(model, pk):
+    """The shard holding the ``model`` row ``pk``, or None if there is none"""
+    if not is_enabled():
+        return DEFAULT_DB_ALIAS
+    project_id = find_project_id(model, pk)
+    if project_id is None:
+        return None
+    try:
+        return shard_for_project(project_id)
+    except ValueError:
+        return None
+
+
+async def alocate(model, pk):
+    """``locate`` for async views"""
+    return await sync_to_async(locate)(model, pk)
+
+
+def get_current_shard():
+    return _current_shard.get()
+
+
+def set_current_shard(alias):
+    """Route the queries on sharded models to ``alias``; returns a reset token"""
+    return _current_shard.set(alias)
+
+
+def reset_current_shard(token):
+    _current_shard.reset(token)
+
+
+@contextmanager
+def use_shard(alias):
+    """Route the queries of the enclosed block on sharded models to ``alias``"""
+    token = set_current_shard(alias)
+    try:
+        yield alias
+    finally:
+        reset_current_shard(token)
+
+
+def each_shard():
+    """Every database holding projects; the default one when sharding is off"""
+    return get_shards() or [DEFAULT_DB_ALIAS]
+
+
+def projects_for_user(user, build_queryset):
+    """
+    Fan out a project listing to the shards holding projects of ``user``.
+
+    ``build_queryset()`` is evaluated once per shard, restricted to the
+    projects the directory lists for the user there. Returns a list.
+    """
+    from apps.projects.models import ShardDirectory
+
+    project_ids = defaultdict(list)
+    for shard, project_id in ShardDirectory.objects.filter(user=user).values_list(
+        "shard", "project_id"
+    ):
+        project_ids[shard].append(project_id)
+
+    projects = []
+    for shard, ids in project_ids.items():
+        with use_shard(shard):
+            projects.extend(build_queryset().filter(id__in=ids))
+    return projects
+
+
+class ShardRouter:
+    """
+    Route sharded models to the shard of their project.
+
+    Saved rows stay on their database. New projects go to the shard of their
+    id. Every other query uses the shard set with ``use_shard`` or
+    ``ShardRoutingMixin``. Returns None while sharding is off so
+    ``ReplicaRouter`` decides.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not is_enabled():
+            return None
+        instance = hints.get("instance")
+        if (
+            instance is not None
+            and instance._state.db in get_shards()
+            and (is_sharded(type(instance)) or not is_sharded(model))
+        ):
+            # Related rows, including the local copies of users
+            return instance._state.db
+        if is_sharded(model):
+            return get_current_shard()
+        return None
+
+    def db_for_write(self, model, **hints):
+        if not is_enabled():
+            return None
+        if not is_sharded(model):
+            return DEFAULT_DB_ALIAS
+        instance = hints.get("instance")
+        if instance is not None and is_sharded(type(instance)):
+            if instance._state.db:
+                return instance._state.db
+            if instance._meta.label_lower == "projects.project":
+                return shard_for_project(instance.pk)
+        return get_current_shard()
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not is_enabled():
+            return None
+        if is_sharded(type(obj1)) and is_sharded(type(obj2)):
+            return obj1._state.db == obj2._state.db
+        # Users exist on every shard
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Every shard has the full schema; users are copied to each of them
+        return None
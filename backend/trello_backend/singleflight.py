@@ -0,0 +1,110 @@
+"""
+Request coalescing: concurrent callers asking for the same key wait for a
+single computation and share its result.
+
+``SingleFlight`` coalesces the threads of one process. ``cached_single_flight``
+adds a lock in the shared cache so that only one worker process computes a
+missing entry while the others wait for it to appear.
+"""
+
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+from . import metrics
+
+DEFAULT_LOCK_TIMEOUT = 30
+DEFAULT_WAIT = 10
+POLL_INTERVAL = 0.05
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Run at most one call per key at a time within the process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            metrics.incr("singleflight.shared")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+group = SingleFlight()
+
+
+def cached_single_flight(cache, key, build, timeout):
+    """
+    Return ``cache[key]``, computing it with ``build`` at most once across
+    threads and worker processes.
+
+    The worker that takes the lock builds and stores the value; the others
+    poll the cache until it appears. If the lock holder dies or the wait
+    exceeds ``SINGLE_FLIGHT_WAIT`` seconds, the caller builds the value itself.
+    """
+
+    def load():
+        value = cache.get(key)
+        if value is not None:
+            return value
+        return _build_with_lock(cache, key, build, timeout)
+
+    return group.do(key, load)
+
+
+def _build_with_lock(cache, key, build, timeout):
+    lock_key = f"{key}:lock"
+    token = uuid.uuid4().hex
+    lock_timeout = getattr(settings, "SINGLE_FLIGHT_LOCK_TIMEOUT", DEFAULT_LOCK_TIMEOUT)
+    if cache.add(lock_key, token, lock_timeout):
+        try:
+            value = build()
+            cache.set(key, value, timeout)
+            return value
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    metrics.incr("singleflight.waited")
+    deadline = time.monotonic() + getattr(settings, "SINGLE_FLIGHT_WAIT", DEFAULT_WAIT)
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+        if cache.get(lock_key) is None:
+            break
+
+    value = build()
+    cache.set(key, value, timeout)
+    return value
@@ -96,6 +96,21 @@ else:
         }
     }
 
+# Stand-in read replica; tests enable it with override_settings(DATABASE_REPLICAS=...)
+DATABASES["replica"] = {**DATABASES["default"], "TEST": {"MIRROR": "default"}}
+DATABASE_REPLICAS = []
+
+# Second shard; tests enable sharding with override_settings(DATABASE_SHARDS=...)
+DATABASES["shard_1"] = dict(DATABASES["default"])
+if os.environ.get("CI"):
+    DATABASES["shard_1"]["TEST"] = {"NAME": "test_trello_db_shard_1"}
+DATABASE_SHARDS = []
+
+DATABASE_ROUTERS = [
+    "trello_backend.sharding.ShardRouter",
+    "trello_backend.routers.ReplicaRouter",
+]
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -141,7 +156,7 @@ AUTH_USER_MODEL = "authentication.User"
 # REST Framework configuration
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "apps.authentication.authentication.StatelessJWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
@@ -152,6 +167,19 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 20,
     "TEST_REQUEST_DEFAULT_FORMAT": "json",
+    "DEFAULT_THROTTLE_CLASSES": [
+        "trello_backend.throttling.UserBucketThrottle",
+        "trello_backend.throttling.ProjectBucketThrottle",
+    ],
+    # High enough not to get in the way of the tests
+    "DEFAULT_THROTTLE_RATES": {
+        "auth": "1000/min",
+        "writes": "1000/min",
+        "search": "1000/min",
+        "bulk": "1000/min",
+        "project_writes": "1000/min",
+        "project_bulk": "1000/min",
+    },
 }
 
 # JWT Configuration
@@ -159,6 +187,8 @@ SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
     "ROTATE_REFRESH_TOKENS": True,
+    # Refuses refresh tokens revoked by a token version bump
+    "TOKEN_REFRESH_SERIALIZER": "apps.authentication.serializers.TokenRefreshSerializer",
     "BLACKLIST_AFTER_ROTATION": True,
     "UPDATE_LAST_LOGIN": True,
     "ALGORITHM": "HS256",
@@ -202,7 +232,15 @@ CACHES = {
     }
 }
 
+# Keep the token revocation filter in memory
+TOKEN_REVOCATION_REDIS_URL = None
+
+# Buffer activity timestamps in memory; tests flush explicitly
+ACTIVITY_REDIS_URL = None
+ACTIVITY_FLUSH_INTERVAL = 0
+
 # Celery Configuration for testing
+CELERY_BROKER_URL = "memory://"
 CELERY_TASK_ALWAYS_EAGER = True
 CELERY_TASK_EAGER_PROPAGATES = True
 
@@ -223,6 +261,9 @@ if not os.environ.get("CI"):
 
     MIGRATION_MODULES = DisableMigrations()
 
+# SQLite ignores the non-key columns of covering indexes
+SILENCED_SYSTEM_CHECKS = ["models.W040"]
+
 # Logging configuration - minimal for tests
 LOGGING = {
     "version": 1,
@@ -0,0 +1,238 @@
+"""
+Token bucket throttles for auth, write, search and bulk requests.
+
+Each client and each project has one bucket per endpoint class. A bucket holds
+up to N tokens and refills at N per period for a rate of ``"N/period"``; a
+request takes one token and is rejected with ``Retry-After`` when none is
+left. Short bursts are absorbed while the sustained rate stays bounded.
+
+The endpoint class of a request is, in order:
+
+- ``throttle_scopes[view.action]`` of the view, e.g. ``{"bulk_update": "bulk"}``
+- ``throttle_scope`` of the view, e.g. ``"auth"``
+- ``"writes"`` for unsafe methods
+- ``"search"`` for reads with a search term
+
+Other reads are not throttled. ``UserBucketThrottle`` limits each user, or
+each client address before login, with the ``DEFAULT_THROTTLE_RATES`` of the
+scope. ``ProjectBucketThrottle`` limits all users of one project together
+with the rate of ``project_<scope>``. A scope without a rate is unlimited.
+Plain async views, such as the async login, use ``throttle_async_view``.
+
+Buckets are kept per process unless ``THROTTLE_REDIS_URL`` is set, in which
+case every worker shares them in Redis. If Redis cannot be reached requests
+are let through.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.http import JsonResponse
+
+from asgiref.sync import sync_to_async
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from . import metrics
+
+MAX_BUCKETS = 100_000
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    """``(capacity, tokens per second)`` of a rate such as ``"120/min"``"""
+    if rate is None:
+        return None, None
+    count, period = rate.split("/")
+    capacity = int(count)
+    return capacity, capacity / PERIODS[period[0]]
+
+
+class MemoryBuckets:
+    """
+    Buckets kept in the memory of this process. Past ``MAX_BUCKETS`` the bucket
+    used least recently, the one most likely to have refilled, is dropped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def take(self, key, capacity, refill_rate):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            if tokens >= 1:
+                allowed, wait = True, 0.0
+                tokens -= 1
+            else:
+                allowed, wait = False, (1 - tokens) / refill_rate
+            if len(self._buckets) >= MAX_BUCKETS:
+                self._buckets.popitem(last=False)
+            self._buckets[key] = (tokens, now)
+        return allowed, wait
+
+
+# Refills and takes a token in one step; uses the Redis clock so that every
+# worker agrees on the time
+TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+    allowed = 1
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(wait)}
+"""
+
+
+class RedisBuckets:
+    """Buckets stored in Redis hashes shared by every worker"""
+
+    def __init__(self, url):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self._take = self._client.register_script(TAKE_SCRIPT)
+
+    def take(self, key, capacity, refill_rate):
+        import redis
+
+        try:
+            allowed, wait = self._take(
+                keys=[f"throttle:{key}"], args=[capacity, refill_rate]
+            )
+        except redis.RedisError:
+            metrics.incr("throttle.errors")
+            return True, 0.0
+        return bool(allowed), float(wait)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            url = getattr(settings, "THROTTLE_REDIS_URL", None)
+            _backend = RedisBuckets(url) if url else MemoryBuckets()
+        return _backend
+
+
+def get_scope(request, view):
+    """Endpoint class of the request, or None if it is not throttled"""
+    scopes = getattr(view, "throttle_scopes", {})
+    action = getattr(view, "action", None)
+    if action in scopes:
+        return scopes[action]
+    scope = getattr(view, "throttle_scope", None)
+    if scope:
+        return scope
+    if request.method not in SAFE_METHODS:
+        return "writes"
+    if request.query_params.get(api_settings.SEARCH_PARAM):
+        return "search"
+    return None
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Takes a token from the bucket returned by ``get_bucket``"""
+
+    rate_prefix = ""
+
+    def get_bucket(self, request, view):
+        """Key of the bucket the request draws from, or None to let it through"""
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        self.retry_after = None
+        scope = get_scope(request, view)
+        if scope is None:
+            return True
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.rate_prefix + scope)
+        capacity, refill_rate = parse_rate(rate)
+        if capacity is None:
+            return True
+        key = self.get_bucket(request, view)
+        if key is None:
+            return True
+
+        allowed, self.retry_after = get_backend().take(
+            f"{self.rate_prefix}{scope}:{key}", capacity, refill_rate
+        )
+        if not allowed:
+            metrics.incr(f"throttle.{self.rate_prefix}{scope}.throttled")
+        return allowed
+
+    def wait(self):
+        return self.retry_after
+
+
+class UserBucketThrottle(TokenBucketThrottle):
+    """One bucket per user, or per client address for anonymous requests"""
+
+    def get_bucket(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return f"user:{request.user.pk}"
+        return f"ip:{self.get_ident(request)}"
+
+
+class ProjectBucketThrottle(TokenBucketThrottle):
+    """One bucket per project, shared by every user working on it"""
+
+    rate_prefix = "project_"
+
+    def get_bucket(self, request, view):
+        get_project_id = getattr(view, "get_request_project_id", None)
+        project_id = get_project_id(request) if get_project_id else None
+        return f"project:{project_id}" if project_id else None
+
+
+def throttle_async_view(scope):
+    """
+    Apply the per-user ``scope`` bucket of ``UserBucketThrottle`` to a plain
+    async Django view, answering ``429`` with ``Retry-After`` when it is empty.
+    """
+    view_options = SimpleNamespace(throttle_scope=scope)
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            throttle = UserBucketThrottle()
+            allowed = await sync_to_async(throttle.allow_request)(
+                Request(request), view_options
+            )
+            if not allowed:
+                response = JsonResponse(
+                    {"detail": "Request was throttled."}, status=429
+                )
+                response["Retry-After"] = str(math.ceil(throttle.wait()))
+                return response
+            return await view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -20,11 +20,18 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from .views import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/auth/", include("apps.authentication.urls", namespace="authentication")),
     path("api/projects/", include("apps.projects.urls", namespace="projects")),
     path("api/tasks/", include("apps.tasks.urls")),
+    # Async (ASGI) versions of the hottest reads and of login
+    path("api/async/auth/", include("apps.authentication.async_urls")),
+    path("api/async/projects/", include("apps.projects.async_urls")),
+    path("api/async/tasks/", include("apps.tasks.async_urls")),
+    path("api/metrics/", metrics_view, name="metrics"),
 ]
 
 # Serve media files in development
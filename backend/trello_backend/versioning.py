@@ -0,0 +1,142 @@
+"""
+Optimistic concurrency for projects, lists and tasks.
+
+Every write to a ``VersionedModel`` increments its ``version``. Clients send
+the version they edited in an ``If-Match`` header (``"3"``, as returned in
+``ETag``) or a ``version`` body field. ``VersionCheckMixin`` refuses the
+write with ``409 Conflict`` when the row it loaded has another version, and
+marks the instance so that its save becomes
+``UPDATE ... SET version = n + 1 WHERE id = ... AND version = n``. A write
+racing another one therefore fails too, at no cost besides the update itself.
+
+Writes that do not name a version, such as position shifts, restores and
+edits of clients that send no ``If-Match``, are not checked and increment the
+version with ``version = version + 1``.
+"""
+
+from collections.abc import Mapping
+
+from django.db import models
+from django.db.models import F
+
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+HEADER = "If-Match"
+
+
+class StaleVersion(Exception):
+    """Raised by a checked save when the row no longer has the expected version"""
+
+
+class VersionConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "This item was changed by someone else. Reload it and try again."
+    default_code = "version_conflict"
+
+
+class VersionedModel(models.Model):
+    """Model whose ``version`` is incremented by every write"""
+
+    version = models.PositiveIntegerField(
+        default=1, editable=False, help_text="Incremented by every write"
+    )
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "version" not in update_fields:
+            kwargs["update_fields"] = [*update_fields, "version"]
+        expected = self.__dict__.pop("expected_version", None)
+        if expected is None:
+            version = self.version
+            self.version = F("version") + 1
+        else:
+            version, self._checked_version = expected, expected
+            self.version = expected + 1
+        try:
+            super().save(*args, **kwargs)
+        except Exception:
+            self.version = version
+            raise
+        finally:
+            self.__dict__.pop("_checked_version", None)
+        if expected is None:
+            # Other writes may have landed since the row was loaded
+            self.refresh_from_db(fields=["version"])
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        checked = self.__dict__.get("_checked_version")
+        if checked is None:
+            return super()._do_update(
+                base_qs, using, pk_val, values, update_fields, forced_update
+            )
+        base_qs = base_qs.filter(version=checked)
+        if super()._do_update(
+            base_qs, using, pk_val, values, update_fields, forced_update
+        ):
+            return True
+        raise StaleVersion()
+
+
+def update(instance, **fields):
+    """
+    Write ``fields`` of ``instance`` with one ``UPDATE``, incrementing its
+    version, without signals. Checked like a save if the instance is marked.
+    """
+    model = type(instance)
+    queryset = model._base_manager.using(instance._state.db).filter(pk=instance.pk)
+    expected = instance.__dict__.pop("expected_version", None)
+    if expected is not None:
+        queryset = queryset.filter(version=expected)
+    updated = queryset.update(**fields, version=F("version") + 1)
+    if not updated and expected is not None:
+        raise StaleVersion()
+    for name, value in fields.items():
+        setattr(instance, name, value)
+    if expected is None:
+        instance.refresh_from_db(fields=["version"])
+    else:
+        instance.version = expected + 1
+
+
+def parse_version(value):
+    """Version number of an ``If-Match`` value such as ``"3"`` or ``W/"3"``"""
+    value = str(value).strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    try:
+        version = int(value.strip('"'))
+    except ValueError:
+        version = -1
+    if version < 1:
+        raise ValidationError({"version": "Expected a positive version number."})
+    return version
+
+
+def expected_version(request):
+    """The version a write request was made against, or None if it names none"""
+    value = request.headers.get(HEADER)
+    if value and value.strip() != "*":
+        return parse_version(value)
+    if isinstance(request.data, Mapping) and request.data.get("version") is not None:
+        return parse_version(request.data["version"])
+    return None
+
+
+def check_version(request, obj):
+    """
+    Refuse a write to ``obj`` made against an older version, and check the
+    write itself against the version the client sent.
+    """
+    expected = expected_version(request)
+    if expected is None:
+        return
+    if expected != obj.version:
+        raise VersionConflict()
+    obj.expected_version = expected
@@ -0,0 +1,18 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from . import metrics
+from .db import pool_stats
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def metrics_view(request):
+    """Counters and connection pool figures of the worker process serving the
+    request"""
+    data = metrics.snapshot()
+    for alias, stats in pool_stats().items():
+        for name, value in stats.items():
+            data[f"db.pool.{alias}.{name}"] = value
+    return Response(data)
@@ -47,8 +47,8 @@ export const authService = {
       
       // Make a call to verify the token works correctly
       try {
-        await apiClient.get('/api/auth/me/');
-        console.log('Successfully verified token with /me endpoint');
+        await apiClient.get('/api/auth/session/');
+        console.log('Successfully verified token with /session endpoint');
       } catch (verifyErr) {
         console.error('Token verification failed:', verifyErr);
         // Continue anyway since we have valid tokens